@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事情報の抽出
+CSSセレクタごとに解析木を何度も走査する代わりに、木を1回だけたどって
+タイトル・日付・カテゴリー・タグ・本文・見出し・書籍情報・リンク・単語統計をまとめて集めます
+
+追加のフィールドは抽出プラグインとして登録します。プラグインは同じ走査結果（PageScan）を受け取り、
+解析木を走査し直さずにフィールドを組み立てます。
+"""
+
+import re
+from collections import Counter
+from urllib.parse import unquote, urljoin, urlparse
+
+from bs4 import CData, NavigableString, Tag
+
+from book_identifiers import scan_identifiers
+from text_tokenizer import frequent_words_json
+
+# カテゴリーを含む要素のクラス（この順に収集する）
+CATEGORY_CONTAINER_CLASSES = (
+    'post-categories',   # WordPress標準
+    'cat-links',         # テーマ固有
+    'entry-category',    # テーマ固有
+    'article-category',  # カスタム
+    'category',          # 一般的
+    'breadcrumb',        # パンくずリスト
+)
+
+# タグのリンクを含む要素のクラス
+TAG_CONTAINER_CLASSES = frozenset({
+    'tags-links', 'tag-links', 'entry-tags', 'post-tags',
+    'article-tags', 'tags', 'meta-tags',
+})
+
+# 除外するカテゴリ
+EXCLUDE_CATEGORIES = frozenset({'home', 'トップ', 'ホーム', 'index', '一覧'})
+
+# get_text() の既定と同じく、通常の文字列と CDATA だけを本文として扱う
+TEXT_STRING_TYPES = frozenset({NavigableString, CData})
+
+HEADING_TAGS = frozenset({'h2', 'h3', 'h4'})
+BOOK_TAGS = frozenset({'strong', 'b', 'h2', 'h3'})
+AUTHOR_SEPARATORS = ('著者：', '著：', '著者:', '著:', ' 著 ', '著')
+
+WORD_SEPARATORS = re.compile(r'[「」『』（）\(\)［］\[\]{}｛｝〈〉《》【】・、。,.]')
+
+# 抽出結果が変わる修正をしたら上げる。以前の版で抽出した記事は、次のクロールで取得し直して抽出する
+EXTRACTOR_VERSION = 2
+
+SITE_URL = 'https://set-ten.com/'
+SITE_DOMAIN = 'set-ten.com'  # このドメインを含むリンクを内部リンクとする
+OUTLINE_HEADING_TAGS = ('h2', 'h3')  # 見出し構造（heading_outline）に含める見出し
+
+# 抽出プラグイン: 名前 -> plugin(scan, url)。追加するフィールドの dict を返す
+EXTRACTORS = {}
+
+
+def clean_text(text):
+    """テキストのクリーニング"""
+    if text:
+        return ' '.join(text.strip().split())
+    return ''
+
+
+def normalize_url(url):
+    """URLを正規化する"""
+    # URLの正規化（末尾のスラッシュを統一、クエリパラメータを削除など）
+    parsed = urlparse(url)
+    path = parsed.path.rstrip('/')
+    return f"{parsed.scheme}://{parsed.netloc}{path}"
+
+
+def configure_site(base_url):
+    """内部リンク・外部リンクの判定に使うサイトを切り替える（ローカルの合成サイトなど）"""
+    global SITE_URL, SITE_DOMAIN
+    SITE_URL = base_url if base_url.endswith('/') else base_url + '/'
+    SITE_DOMAIN = urlparse(base_url).netloc
+
+
+class PageScan:
+    """解析木を1回走査して、抽出に必要な要素とテキストを集める"""
+
+    def __init__(self):
+        self.soup = None
+        self.title_elem = None
+        self.published_meta = None
+        self.modified_meta = None
+        self.category_elems = [[] for _ in CATEGORY_CONTAINER_CLASSES]
+        self.tag_elems = []
+        self.content = None
+        self.content_text = []
+        self.paragraphs = []      # 本文直下の <p> のテキスト
+        self.headings = []        # (タグ名, テキスト)
+        self.book_candidates = []  # strong / b / h2 / h3 のテキスト
+        self.links = []           # (href, テキスト)
+
+    def run(self, soup):
+        self.soup = soup
+        open_classes = Counter()  # 祖先要素のクラス
+        collectors = []           # テキストを集めている要素の (文字列の種類, バッファ)
+        content_depth = 0         # .entry-content の中にいる間は1以上
+
+        # (ノード, None) は要素に入るとき、(None, 戻す状態) は要素を出るときの処理
+        stack = [(child, None) for child in reversed(soup.contents)]
+        while stack:
+            node, leaving = stack.pop()
+            if leaving is not None:
+                buffer_count, classes, in_content = leaving
+                if buffer_count:
+                    del collectors[-buffer_count:]
+                if classes:
+                    open_classes.subtract(classes)
+                if in_content:
+                    content_depth -= 1
+                continue
+
+            if not isinstance(node, Tag):
+                if collectors:
+                    string_type = type(node)
+                    for types, buffer in collectors:
+                        if string_type in types:
+                            buffer.append(node)
+                continue
+
+            classes = node.get('class') or ()
+            buffers = self._visit(node, node.name, classes, open_classes, content_depth)
+            if self.content is node:
+                buffers.append(self.content_text)
+            in_content = content_depth > 0 or self.content is node
+
+            if not node.contents:
+                continue
+            if buffers:
+                # get_text() と同じく、要素ごとに対象とする文字列の種類を決める
+                types = node.interesting_string_types or TEXT_STRING_TYPES
+                collectors.extend((types, buffer) for buffer in buffers)
+            if classes:
+                open_classes.update(classes)
+            if in_content:
+                content_depth += 1
+            stack.append((None, (len(buffers), classes, in_content)))
+            stack.extend((child, None) for child in reversed(node.contents))
+        return self
+
+    def _visit(self, node, name, classes, open_classes, content_depth):
+        """要素を判定して記録し、テキストを集めるバッファのリストを返す"""
+        buffers = []
+
+        if name == 'h1' and self.title_elem is None and 'entry-title' in classes:
+            self.title_elem = node
+        elif name == 'meta':
+            prop = node.get('property')
+            if prop == 'article:published_time' and self.published_meta is None:
+                self.published_meta = node
+            elif prop == 'article:modified_time' and self.modified_meta is None:
+                self.modified_meta = node
+
+        if name == 'a':
+            for i, container in enumerate(CATEGORY_CONTAINER_CLASSES):
+                if open_classes[container] > 0:
+                    self.category_elems[i].append(node)
+
+        if (
+            (name == 'a' and any(open_classes[c] > 0 for c in TAG_CONTAINER_CLASSES))
+            or _joined(node.get('rel')) == 'tag'
+            or 'tag' in classes
+        ):
+            self.tag_elems.append(node)
+
+        if self.content is None and 'entry-content' in classes:
+            self.content = node
+        elif content_depth:
+            if name == 'p' and content_depth == 1:
+                buffers.append(self._record(self.paragraphs))
+            if name in HEADING_TAGS:
+                buffers.append(self._record(self.headings, name))
+            if name in BOOK_TAGS:
+                buffers.append(self._record(self.book_candidates))
+            if name == 'a' and node.get('href') is not None:
+                buffers.append(self._record(self.links, node.get('href')))
+        return buffers
+
+    @staticmethod
+    def _record(target, key=None):
+        """要素のテキストを集めるバッファを作り、出現順に target へ登録する"""
+        buffer = []
+        target.append((key, buffer) if key is not None else buffer)
+        return buffer
+
+
+def _joined(value):
+    """複数値の属性（rel など）をCSSセレクタと同じく空白区切りの文字列にする"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return ' '.join(value)
+
+
+def _text(buffer):
+    return ''.join(buffer)
+
+
+def _meta_date(meta):
+    if meta:
+        content = meta.get("content", "")
+        if content and isinstance(content, str):
+            return content.split("T")[0]
+    return ""
+
+
+def _category_path(scan, url):
+    category_list = []
+    for elems in scan.category_elems:
+        for cat in elems:
+            if cat.string:
+                cat_text = clean_text(cat.string)
+                if cat_text and cat_text.lower() not in EXCLUDE_CATEGORIES:
+                    if cat_text not in category_list:
+                        category_list.append(cat_text)
+
+    if not category_list:  # バックアップ: URLからカテゴリを推測
+        path_parts = urlparse(url).path.strip('/').split('/')
+        if len(path_parts) >= 2:  # 最低2階層のパスがある場合
+            for part in path_parts[:-1]:  # 最後のパス（記事ID）を除外
+                cat = clean_text(unquote(part).replace('-', ' '))
+                if cat and cat.lower() not in EXCLUDE_CATEGORIES:
+                    category_list.append(cat)
+
+    return " > ".join(category_list)
+
+
+def _tags(scan):
+    tags = set()
+    for tag in scan.tag_elems:
+        # href属性からタグを抽出する場合（最後のパス部分を使用）
+        href = tag.get('href', '')
+        if isinstance(href, str) and href:
+            path_parts = [p for p in href.split('/') if p]
+            if path_parts:
+                tag_from_url = clean_text(unquote(path_parts[-1]).replace('-', ' '))
+                if tag_from_url:
+                    tags.add(tag_from_url)
+
+        cleaned_tag = clean_text(tag.get_text(strip=True))
+        if cleaned_tag:
+            tags.add(cleaned_tag)
+    return ','.join(sorted(tags))
+
+
+def _book_title_author(candidates):
+    book_title = ""
+    book_author = ""
+    for buffer in candidates:
+        text = clean_text(_text(buffer))
+        # 「著」「著者」で分割を試みる
+        for separator in AUTHOR_SEPARATORS:
+            if separator in text:
+                parts = text.split(separator)
+                if len(parts) >= 2:
+                    book_title = parts[0].strip()
+                    book_author = parts[1].strip()
+                    break
+        if book_title and book_author:
+            break
+    return book_title, book_author
+
+
+def register_extractor(name):
+    """抽出プラグインを登録するデコレーター"""
+    def decorator(plugin):
+        EXTRACTORS[name] = plugin
+        return plugin
+    return decorator
+
+
+@register_extractor('external_links')
+def external_links(scan, url):
+    """本文中の外部サイトへのリンク（URLとリンクテキスト）"""
+    links = []
+    for href, buffer in scan.links:
+        if href.startswith('http') and not href.startswith(SITE_URL) and SITE_DOMAIN not in href:
+            links.append({'url': href, 'text': clean_text(_text(buffer)) or href})
+    return {'external_links': links}
+
+
+@register_extractor('heading_outline')
+def heading_outline(scan, url):
+    """本文の見出し構造（レベルとテキスト）。Article.get_headings が読み込める形式"""
+    return {
+        'heading_outline': [
+            {'level': name, 'text': clean_text(_text(buffer))}
+            for name, buffer in scan.headings if name in OUTLINE_HEADING_TAGS
+        ]
+    }
+
+
+DEFAULT_EXTRACTORS = tuple(EXTRACTORS)  # 既定で実行するプラグイン
+
+
+def extract_article(soup, url, extractors=DEFAULT_EXTRACTORS):
+    """解析済みのページから記事情報を抽出する
+
+    解析木は1回だけ走査し、各フィールドは走査中に集めた要素とテキストから組み立てる。
+    extractors に指定した抽出プラグインのフィールドも同じ走査結果から追加する。
+    """
+    scan = PageScan().run(soup)
+    content = scan.content
+
+    title = clean_text(scan.title_elem.get_text()) if scan.title_elem else ""
+
+    intro = ""
+    headings_str = ""
+    book_title = book_author = book_isbn = book_asin = ""
+    internal_links = []
+    broken_links = []
+    frequent_words_str = ""
+    word_count = 0
+
+    if content is not None:
+        for buffer in scan.paragraphs:
+            text = _text(buffer)
+            if text.strip():
+                intro = clean_text(text)
+                break
+
+        headings = []
+        for name, buffer in scan.headings:
+            heading_text = clean_text(_text(buffer))
+            if heading_text:
+                headings.append(f"{name}: {heading_text}")
+        headings_str = "\n".join(headings)
+
+        book_title, book_author = _book_title_author(scan.book_candidates)
+
+        # ISBN / ASIN は本文と本文中のリンク先URL（Amazonの商品ページなど）から探す
+        text_content = _text(scan.content_text)
+        identifiers = scan_identifiers(
+            '\n'.join([text_content] + [href for href, _ in scan.links if href])
+        )
+        book_isbn = identifiers['isbn'][0] if identifiers['isbn'] else ""
+        book_asin = identifiers['asin'][0] if identifiers['asin'] else ""
+
+        for href, buffer in scan.links:
+            if not href:
+                continue
+            try:
+                absolute_url = normalize_url(urljoin(url, href))
+                if SITE_DOMAIN in absolute_url:
+                    link_text = clean_text(_text(buffer))
+                    internal_links.append({
+                        'url': absolute_url,
+                        'title': link_text or '（リンクテキストなし）',
+                        'text': link_text or '（リンクテキストなし）'
+                    })
+            except Exception:
+                broken_links.append(href)
+
+        # 単語数（改行と記号で区切った2文字以上の単語の数）
+        word_count = sum(
+            1
+            for line in text_content.split('\n')
+            for word in WORD_SEPARATORS.sub(' ', line).split()
+            if len(word) >= 2
+        )
+        # 頻出語は形態素解析した内容語の出現回数（JSON）
+        frequent_words_str = frequent_words_json(text_content)
+
+    article = {
+        'title': title,
+        'url': url,
+        'post_date': _meta_date(scan.published_meta),
+        'updated_date': _meta_date(scan.modified_meta),
+        'category_path': _category_path(scan, url),
+        'tags': _tags(scan),
+        'content_intro': intro,
+        'headings': headings_str,
+        'book_title': book_title,
+        'book_author': book_author,
+        'book_isbn': book_isbn,
+        'book_asin': book_asin,
+        'word_count': word_count,
+        'internal_links': internal_links,
+        'frequent_words': frequent_words_str,
+        'broken_links': broken_links
+    }
+    for name in extractors:
+        article.update(EXTRACTORS[name](scan, url))
+    return article
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事の履歴（差分による版管理）
+記事を保存するたびに行全体を articles_history にコピーする代わりに、
+URLごとの版を article_versions に圧縮して保存します
+
+- 各URLの最初の版は全フィールドを保存する（full）
+- 以降の版は前の版から変わったフィールドだけを保存する（delta）。どのフィールドも変わっていなければ版を作らない
+- 差分をたどる数が増えすぎないよう、KEYFRAME_INTERVAL 版ごとに全フィールドを保存し直す
+- データは JSON を zlib で圧縮して BLOB に保存する
+
+任意の版は、直前の full の版に以降の delta を順に適用して復元します。
+
+使い方:
+    python article_history.py log URL           版の一覧（日時・変更されたフィールド・サイズ）
+    python article_history.py show URL [-v N]   版を復元して表示（省略時は最新の版）
+    python article_history.py stats             版の数と圧縮前後のサイズ
+    python article_history.py import-legacy     articles_history（行全体のコピー）を版に変換する
+                                                （migrate_categories.py などが読むため articles_history は残す）
+"""
+
+import argparse
+import json
+import sys
+import zlib
+
+import sqlite_profile
+
+DB_FILE = "setten_articles.db"
+
+FULL = 'full'
+DELTA = 'delta'
+
+KEYFRAME_INTERVAL = 30  # この版数ごとに全フィールドを保存する
+COMPRESSION_LEVEL = 6
+
+# 履歴に残すフィールド（url は版のキー、crawled_at は版の日時として別に持つ）
+HISTORY_FIELDS = (
+    'title', 'post_date', 'updated_date', 'category_path', 'tags', 'content_intro',
+    'headings', 'book_title', 'book_author', 'book_isbn', 'book_asin', 'word_count',
+    'internal_links', 'frequent_words', 'broken_links', 'external_links', 'heading_outline',
+)
+
+HISTORY_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS article_versions (
+        url TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        crawled_at TEXT,
+        kind TEXT NOT NULL,
+        changed_fields TEXT NOT NULL,
+        data BLOB NOT NULL,
+        PRIMARY KEY (url, version)
+    ) WITHOUT ROWID;
+"""
+
+# URLごとの最新の版番号（主キーの索引で引ける）
+_LATEST_VERSIONS_SQL = "SELECT url, MAX(version) FROM article_versions WHERE url IN ({}) GROUP BY url"
+_INSERT_VERSION_SQL = """
+    INSERT INTO article_versions (url, version, crawled_at, kind, changed_fields, data)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# SQLiteの1文あたりのパラメータ数の上限を超えないようにURLを区切る単位
+_URL_CHUNK = 500
+
+
+def compress(fields):
+    return zlib.compress(json.dumps(fields, ensure_ascii=False).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def keyframe_version(version):
+    """版を復元するときに起点となる全フィールドの版の番号"""
+    return (version - 1) // KEYFRAME_INTERVAL * KEYFRAME_INTERVAL + 1
+
+
+def snapshot(row):
+    """記事の dict から履歴に残すフィールドを取り出す"""
+    return {field: row.get(field) for field in HISTORY_FIELDS}
+
+
+def version_rows(articles, current, latest, crawl_time):
+    """保存する記事から article_versions に書き込む行を作る
+
+    Args:
+        articles (list): これから保存する記事（HISTORY_FIELDS と url を持つ dict）
+        current (dict): url -> 保存前の記事のフィールド（articles にある行）
+        latest (dict): url -> 最新の版番号
+        crawl_time (str): 版の日時
+
+    Returns:
+        list: _INSERT_VERSION_SQL のパラメータ
+    """
+    rows = []
+    for article in {article['url']: article for article in articles}.values():
+        url = article['url']
+        new = snapshot(article)
+        version = latest.get(url, 0) + 1
+        old = current.get(url)
+        if version > 1 and old is not None:
+            changed = {field: value for field, value in new.items() if old.get(field) != value}
+            if not changed:
+                continue
+        else:
+            # 最初の版（または版のない既存の記事）は全フィールドを保存する
+            changed = new
+        if keyframe_version(version) == version:
+            kind, data = FULL, new
+        else:
+            kind, data = DELTA, changed
+        rows.append((url, version, crawl_time, kind, ','.join(changed), compress(data)))
+    return rows
+
+
+def _placeholders(count):
+    return ', '.join('?' for _ in range(count))
+
+
+def _current_rows_sql(count):
+    return f"SELECT url, {', '.join(HISTORY_FIELDS)} FROM articles WHERE url IN ({_placeholders(count)})"
+
+
+def record_versions(conn, articles, crawl_time):
+    """sqlite3 接続で記事の版を書き込む（articles を更新する前に呼ぶ。コミットは呼び出し側で行う）
+
+    Returns:
+        int: 書き込んだ版の数
+    """
+    urls = list(dict.fromkeys(article['url'] for article in articles))
+    current, latest = {}, {}
+    for i in range(0, len(urls), _URL_CHUNK):
+        chunk = urls[i:i + _URL_CHUNK]
+        for row in conn.execute(_current_rows_sql(len(chunk)), chunk):
+            current[row[0]] = dict(zip(HISTORY_FIELDS, row[1:]))
+        latest.update(conn.execute(_LATEST_VERSIONS_SQL.format(_placeholders(len(chunk))), chunk).fetchall())
+    rows = version_rows(articles, current, latest, crawl_time)
+    conn.executemany(_INSERT_VERSION_SQL, rows)
+    return len(rows)
+
+
+async def record_versions_async(db, articles, crawl_time):
+    """aiosqlite 接続で記事の版を書き込む（articles を更新する前に呼ぶ。コミットは呼び出し側で行う）
+
+    Returns:
+        int: 書き込んだ版の数
+    """
+    urls = list(dict.fromkeys(article['url'] for article in articles))
+    current, latest = {}, {}
+    for i in range(0, len(urls), _URL_CHUNK):
+        chunk = urls[i:i + _URL_CHUNK]
+        async with db.execute(_current_rows_sql(len(chunk)), chunk) as cursor:
+            async for row in cursor:
+                current[row[0]] = dict(zip(HISTORY_FIELDS, row[1:]))
+        async with db.execute(_LATEST_VERSIONS_SQL.format(_placeholders(len(chunk))), chunk) as cursor:
+            latest.update(await cursor.fetchall())
+    rows = version_rows(articles, current, latest, crawl_time)
+    await db.executemany(_INSERT_VERSION_SQL, rows)
+    return len(rows)
+
+
+def list_versions(conn, url):
+    """URLの版の一覧 (version, crawled_at, kind, changed_fields, 圧縮後のバイト数)"""
+    return conn.execute("""
+        SELECT version, crawled_at, kind, changed_fields, length(data)
+        FROM article_versions WHERE url = ? ORDER BY version
+    """, (url,)).fetchall()
+
+
+def reconstruct(conn, url, version=None):
+    """URLの指定した版（省略時は最新の版）の記事を復元する
+
+    Returns:
+        dict: url・version・crawled_at と HISTORY_FIELDS。版がなければ None
+    """
+    if version is None:
+        version = conn.execute("SELECT MAX(version) FROM article_versions WHERE url = ?", (url,)).fetchone()[0]
+        if version is None:
+            return None
+    rows = conn.execute("""
+        SELECT version, crawled_at, kind, data FROM article_versions
+        WHERE url = ? AND version BETWEEN ? AND ?
+        ORDER BY version
+    """, (url, keyframe_version(version), version)).fetchall()
+    if not rows or rows[-1][0] != version or rows[0][2] != FULL:
+        return None
+
+    fields = {}
+    for _, _, kind, data in rows:
+        if kind == FULL:
+            fields = decompress(data)
+        else:
+            fields.update(decompress(data))
+    return {'url': url, 'version': version, 'crawled_at': rows[-1][1], **fields}
+
+
+def import_legacy_history(conn):
+    """articles_history（行全体のコピー）を古い順に版に変換する
+
+    Returns:
+        int: 書き込んだ版の数
+    """
+    conn.executescript(HISTORY_SCHEMA_SQL)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(articles_history)")]
+    if not columns:
+        return 0
+    # 古いスキーマでは category_path が category という名前だった
+    select = ', '.join(
+        column if column in columns else ('category AS category_path' if column == 'category_path' else f'NULL AS {column}')
+        for column in ('url', 'crawled_at', *HISTORY_FIELDS)
+    )
+    history = conn.execute(f"SELECT {select} FROM articles_history ORDER BY crawled_at, id").fetchall()
+
+    count = 0
+    current, latest = {}, dict(conn.execute("SELECT url, MAX(version) FROM article_versions GROUP BY url"))
+    for url, crawled_at, *values in history:
+        article = {'url': url, **dict(zip(HISTORY_FIELDS, values))}
+        rows = version_rows([article], current, latest, crawled_at)
+        conn.executemany(_INSERT_VERSION_SQL, rows)
+        current[url] = snapshot(article)
+        if rows:
+            latest[url] = rows[0][1]
+            count += 1
+    conn.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記事の履歴（差分による版管理）")
+    parser.add_argument("--db", default=DB_FILE, help=f"データベースファイル（デフォルト: {DB_FILE}）")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+
+    log_parser = subparsers.add_parser("log", help="版の一覧を表示")
+    log_parser.add_argument("url", help="記事のURL")
+
+    show_parser = subparsers.add_parser("show", help="版を復元して表示")
+    show_parser.add_argument("url", help="記事のURL")
+    show_parser.add_argument("-v", "--version", type=int, help="版の番号（省略時は最新の版）")
+
+    subparsers.add_parser("stats", help="版の数と圧縮前後のサイズを表示")
+
+    subparsers.add_parser("import-legacy", help="articles_history を版に変換する")
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    conn = sqlite_profile.connect(args.db)
+    try:
+        conn.executescript(HISTORY_SCHEMA_SQL)
+        if args.command == "log":
+            for version, crawled_at, kind, changed_fields, size in list_versions(conn, args.url):
+                print(f"{version:>4} {crawled_at or '':32s} {kind:5s} {size:>7}B  {changed_fields}")
+        elif args.command == "show":
+            article = reconstruct(conn, args.url, args.version)
+            if article is None:
+                print(f"エラー: 版が見つかりません: {args.url}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(article, ensure_ascii=False, indent=2))
+        elif args.command == "stats":
+            urls, versions, deltas, stored = conn.execute("""
+                SELECT COUNT(DISTINCT url), COUNT(*), COALESCE(SUM(kind = 'delta'), 0), COALESCE(SUM(length(data)), 0)
+                FROM article_versions
+            """).fetchone()
+            raw = sum(len(zlib.decompress(data)) for data, in conn.execute("SELECT data FROM article_versions"))
+            print(f"記事 {urls}件 / 版 {versions}件（うち差分 {deltas}件）")
+            print(f"保存サイズ {stored / 1024:.1f}KB（圧縮前 {raw / 1024:.1f}KB）")
+        elif args.command == "import-legacy":
+            count = import_legacy_history(conn)
+            print(f"articles_history から {count}件の版を作成しました")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
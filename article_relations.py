@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+タグと内部リンクの関連テーブル
+articles のカンマ区切りのタグと JSON の内部リンクを、正規化したテーブルにも書き込みます
+
+- tags: タグ名（一意）
+- article_tags: 記事とタグの対応。「タグXの記事」は (tag_id, article_id) の索引で引く
+- article_links: 記事の内部リンク。リンク先が記事なら target_id に記事の id を入れる。
+  「記事Yへのリンク元」は (target_id, source_id) の索引で引く
+
+リンク先の記事がまだ保存されていない場合は target_id を NULL のままにし、
+あとでその記事を保存したときに target_url の索引から埋めます。
+SQLite は既定で外部キー制約を有効にしないため、記事の削除はトリガーで関連テーブルに反映します。
+
+使い方:
+    python article_relations.py rebuild [--db setten_articles.db]
+        articles の tags / internal_links から関連テーブルを作り直す
+"""
+
+import argparse
+import json
+
+import sqlite_profile
+
+DB_FILE = "setten_articles.db"
+
+RELATIONS_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS article_tags (
+        article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+        tag_id INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+        PRIMARY KEY (article_id, tag_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_article_tags_tag ON article_tags (tag_id, article_id);
+    CREATE TABLE IF NOT EXISTS article_links (
+        source_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+        target_url TEXT NOT NULL,
+        target_id INTEGER REFERENCES articles(id) ON DELETE SET NULL,
+        PRIMARY KEY (source_id, target_url)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_article_links_target ON article_links (target_id, source_id);
+    CREATE INDEX IF NOT EXISTS idx_article_links_target_url ON article_links (target_url);
+    CREATE TRIGGER IF NOT EXISTS article_relations_ad AFTER DELETE ON articles BEGIN
+        DELETE FROM article_tags WHERE article_id = old.id;
+        DELETE FROM article_links WHERE source_id = old.id;
+        UPDATE article_links SET target_id = NULL WHERE target_id = old.id;
+    END;
+"""
+
+RELATIONS_EXISTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_links'"
+
+# 記事は url で指定する（保存直後の記事の id を読み返さずに済むように副問い合わせで引く）
+_INSERT_TAG = "INSERT OR IGNORE INTO tags (name) VALUES (?)"
+_DELETE_ARTICLE_TAGS = "DELETE FROM article_tags WHERE article_id = (SELECT id FROM articles WHERE url = ?)"
+_INSERT_ARTICLE_TAG = """
+    INSERT OR IGNORE INTO article_tags (article_id, tag_id)
+    SELECT a.id, t.id FROM articles a JOIN tags t ON t.name = ? WHERE a.url = ?
+"""
+_DELETE_ARTICLE_LINKS = "DELETE FROM article_links WHERE source_id = (SELECT id FROM articles WHERE url = ?)"
+_INSERT_ARTICLE_LINK = """
+    INSERT OR IGNORE INTO article_links (source_id, target_url, target_id)
+    SELECT a.id, ?, (SELECT id FROM articles WHERE url = ?) FROM articles a WHERE a.url = ?
+"""
+_RESOLVE_LINK_TARGETS = """
+    UPDATE article_links SET target_id = (SELECT id FROM articles WHERE url = ?)
+    WHERE target_url = ? AND target_id IS NULL
+"""
+
+
+def split_tags(tags):
+    """カンマ区切りのタグを重複のないリストにする（順序は保つ）"""
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip() for tag in tags.split(',') if tag.strip()))
+
+
+def link_urls(internal_links):
+    """内部リンク（dict のリストまたはその JSON）からリンク先のURLを重複なく取り出す"""
+    if isinstance(internal_links, str):
+        try:
+            internal_links = json.loads(internal_links or '[]')
+        except ValueError:
+            return []
+    urls = (link.get('url') if isinstance(link, dict) else link for link in internal_links or [])
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def relation_statements(articles):
+    """記事の関連テーブルを書き換える (SQL, パラメータのリスト) を順に返す
+
+    Args:
+        articles (list): url・tags（カンマ区切り）・internal_links を持つ記事の dict。
+            記事は articles テーブルに保存済みであること
+
+    Returns:
+        list: executemany で順に実行する (SQL, パラメータのリスト)
+    """
+    # 同じ記事はバッチ内で最後のものだけを使う（articles へのUPSERTと同じ）
+    articles = list({article['url']: article for article in articles}.values())
+    tag_rows = []
+    link_rows = []
+    for article in articles:
+        url = article['url']
+        tag_rows.extend((tag, url) for tag in split_tags(article.get('tags')))
+        link_rows.extend((target, target, url) for target in link_urls(article.get('internal_links')))
+    urls = [(article['url'],) for article in articles]
+    tag_names = list(dict.fromkeys((tag,) for tag, _ in tag_rows))
+    return [
+        (_INSERT_TAG, tag_names),
+        (_DELETE_ARTICLE_TAGS, urls),
+        (_INSERT_ARTICLE_TAG, tag_rows),
+        (_DELETE_ARTICLE_LINKS, urls),
+        (_INSERT_ARTICLE_LINK, link_rows),
+        (_RESOLVE_LINK_TARGETS, [(url, url) for url, in urls]),
+    ]
+
+
+def save_relations(conn, articles):
+    """sqlite3 接続で記事のタグとリンクを書き込む（コミットは呼び出し側で行う）"""
+    cursor = conn.cursor()
+    for sql, params in relation_statements(articles):
+        if params:
+            cursor.executemany(sql, params)
+
+
+async def save_relations_async(db, articles):
+    """aiosqlite 接続で記事のタグとリンクを書き込む（コミットは呼び出し側で行う）"""
+    for sql, params in relation_statements(articles):
+        if params:
+            await db.executemany(sql, params)
+
+
+def rebuild_relations(conn):
+    """articles の tags / internal_links から関連テーブルを作り直す
+
+    Returns:
+        int: 処理した記事数
+    """
+    conn.executescript(RELATIONS_SCHEMA_SQL)
+    conn.execute("DELETE FROM article_tags")
+    conn.execute("DELETE FROM article_links")
+    articles = [
+        {'url': url, 'tags': tags, 'internal_links': internal_links}
+        for url, tags, internal_links in conn.execute("SELECT url, tags, internal_links FROM articles")
+    ]
+    save_relations(conn, articles)
+    conn.execute("DELETE FROM tags WHERE id NOT IN (SELECT tag_id FROM article_tags)")
+    conn.commit()
+    return len(articles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="タグと内部リンクの関連テーブル")
+    parser.add_argument("--db", default=DB_FILE, help=f"データベースファイル（デフォルト: {DB_FILE}）")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+    subparsers.add_parser("rebuild", help="関連テーブルを作り直す")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        conn = sqlite_profile.connect(args.db)
+        try:
+            count = rebuild_relations(conn)
+            tags, links, resolved = conn.execute("""
+                SELECT (SELECT COUNT(*) FROM tags), (SELECT COUNT(*) FROM article_links),
+                       (SELECT COUNT(*) FROM article_links WHERE target_id IS NOT NULL)
+            """).fetchone()
+            print(f"{count}件の記事から タグ {tags}件・リンク {links}件（うち記事へのリンク {resolved}件）を作成しました")
+        finally:
+            conn.close()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事の全文検索インデックス
+setten_articles.db の articles を対象に、SQLite の FTS5（trigram トークナイザー）で
+タイトル・本文冒頭・見出し・タグ・書籍情報の全文検索インデックスを作ります
+
+- trigram は3文字ずつに区切って索引を作るため、分かち書きをしない日本語でも部分一致で検索できる
+- インデックスは articles を参照する外部コンテンツ表で、本文を二重に持たない
+- articles への INSERT / UPDATE / DELETE はトリガーでインデックスに反映される
+- 検索結果は BM25 の順位（タイトルとタグを重く評価）で並べ、snippet() で一致箇所を抜き出す
+- trigram で索引を引けない2文字以下の語を含む検索は、インデックスの各カラムへの LIKE で探す
+
+使い方:
+    python article_search.py rebuild [--db setten_articles.db]
+        インデックスを作り直す（既存のデータベースに初めて作る場合や、破損が疑われる場合）
+    python article_search.py search キーワード [--field title] [-n 20]
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+import sqlite_profile
+
+DB_FILE = "setten_articles.db"
+FTS_TABLE = "articles_fts"
+
+# インデックスに含めるカラムと BM25 の重み
+FTS_COLUMNS = {
+    'title': 10.0,
+    'content_intro': 1.0,
+    'headings': 3.0,
+    'tags': 5.0,
+    'book_title': 4.0,
+    'book_author': 4.0,
+    'book_isbn': 1.0,
+    'book_asin': 1.0,
+}
+
+# 検索フィールド名とインデックスのカラムの対応（all はすべてのカラム）
+SEARCH_FIELDS = {
+    'all': tuple(FTS_COLUMNS),
+    'title': ('title',),
+    'content': ('content_intro',),
+    'headings': ('headings',),
+    'tags': ('tags',),
+    'book': ('book_title', 'book_author', 'book_isbn', 'book_asin'),
+}
+
+TRIGRAM_LENGTH = 3  # trigram で索引を引ける語の最小の長さ
+SNIPPET_TOKENS = 24  # スニペットの長さ（trigram では文字数に相当）
+HIGHLIGHT = ('[', ']')  # スニペットで一致箇所を囲む文字列
+ELLIPSIS = '…'
+
+_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+# インデックスと同期用トリガー（何度実行してもよい）
+FTS_SCHEMA_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns},
+        content='articles', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {_columns}) VALUES (new.id, {_new_values});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON articles BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE} (rowid, {_columns}) VALUES (new.id, {_new_values});
+    END;
+"""
+
+FTS_EXISTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"
+OPTIMIZE_SQL = f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+
+_weights = ', '.join(str(weight) for weight in FTS_COLUMNS.values())
+
+# 検索結果のカラム（呼び出し側の表示に合わせて category_path は category として返す）
+RESULT_COLUMNS = """
+    a.id, a.title, a.url, a.post_date, a.category_path AS category, a.crawled_at
+"""
+
+
+def ensure_search_index(conn):
+    """インデックスとトリガーを作成する。新しく作った場合は既存の記事から索引を作る
+
+    Returns:
+        bool: インデックスを新しく作成したかどうか
+    """
+    created = conn.execute(FTS_EXISTS_SQL, (FTS_TABLE,)).fetchone() is None
+    conn.executescript(FTS_SCHEMA_SQL)
+    if created:
+        conn.execute(REBUILD_SQL)
+        conn.commit()
+    return created
+
+
+def rebuild_index(conn):
+    """articles の内容からインデックスを作り直して最適化する
+
+    Returns:
+        int: 索引を作った記事数
+    """
+    conn.executescript(FTS_SCHEMA_SQL)
+    conn.execute(REBUILD_SQL)
+    conn.execute(OPTIMIZE_SQL)
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+def split_terms(keyword):
+    """検索キーワードを空白で区切った語のリストにする"""
+    return [term for term in keyword.split() if term]
+
+
+def match_expression(terms, columns):
+    """語のリストを FTS5 の MATCH 式にする（すべての語を含む記事に一致）
+
+    語は引用符で囲んだフレーズとして扱い、FTS5 の演算子や記号は解釈させない。
+    """
+    phrases = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+    return '{' + ' '.join(columns) + '} : (' + phrases + ')'
+
+
+def search(conn, keyword, field='all', limit=20):
+    """全文検索インデックスで記事を検索する
+
+    Args:
+        conn (sqlite3.Connection): setten_articles.db への接続（row_factory は sqlite3.Row を想定）
+        keyword (str): 検索キーワード（空白区切りで複数の語をすべて含む記事を探す）
+        field (str): SEARCH_FIELDS のいずれか
+        limit (int): 最大件数
+
+    Returns:
+        list: 記事の dict のリスト。score（BM25。小さいほど一致度が高い）と snippet を含む
+    """
+    columns = SEARCH_FIELDS[field]
+    terms = split_terms(keyword)
+    if not terms:
+        return []
+
+    if all(len(term) >= TRIGRAM_LENGTH for term in terms):
+        rows = conn.execute(f"""
+            SELECT {RESULT_COLUMNS},
+                   bm25({FTS_TABLE}, {_weights}) AS score,
+                   snippet({FTS_TABLE}, -1, ?, ?, ?, ?) AS snippet
+            FROM {FTS_TABLE}
+            JOIN articles a ON a.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH ?
+            ORDER BY score
+            LIMIT ?
+        """, (*HIGHLIGHT, ELLIPSIS, SNIPPET_TOKENS, match_expression(terms, columns), limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    # 2文字以下の語は trigram の索引を引けないため、インデックスの各カラムを LIKE で調べる
+    conditions = []
+    params = []
+    for term in terms:
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions.append('(' + ' OR '.join(f"{FTS_TABLE}.{column} LIKE ? ESCAPE '\\'" for column in columns) + ')')
+        params.extend([pattern] * len(columns))
+    rows = conn.execute(f"""
+        SELECT {RESULT_COLUMNS}, NULL AS score, substr(a.content_intro, 1, 50) AS snippet
+        FROM {FTS_TABLE}
+        JOIN articles a ON a.id = {FTS_TABLE}.rowid
+        WHERE {' AND '.join(conditions)}
+        ORDER BY a.id DESC
+        LIMIT ?
+    """, (*params, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記事の全文検索インデックス")
+    parser.add_argument("--db", default=DB_FILE, help=f"データベースファイル（デフォルト: {DB_FILE}）")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+
+    subparsers.add_parser("rebuild", help="インデックスを作り直す")
+
+    search_parser = subparsers.add_parser("search", help="インデックスで記事を検索する")
+    search_parser.add_argument("keyword", help="検索キーワード（空白区切りで複数指定）")
+    search_parser.add_argument("--field", choices=SEARCH_FIELDS, default="all", help="検索するフィールド")
+    search_parser.add_argument("-n", "--limit", type=int, default=20, help="表示する最大件数 (デフォルト: 20)")
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    conn = sqlite_profile.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    try:
+        if args.command == "rebuild":
+            start = time.perf_counter()
+            count = rebuild_index(conn)
+            print(f"{count}件の記事のインデックスを作り直しました（{time.perf_counter() - start:.2f}秒）")
+        elif args.command == "search":
+            ensure_search_index(conn)
+            start = time.perf_counter()
+            results = search(conn, args.keyword, args.field, args.limit)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for row in results:
+                print(f"{row['id']:>6} {row['title']}")
+                print(f"       {row['snippet']}")
+            print(f"{len(results)}件（{elapsed_ms:.1f}ms）", file=sys.stderr)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
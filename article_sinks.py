@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事データの出力先（シンク）
+抽出した記事をメモリに溜め込まず、一定件数ごとにCSVとデータベースへ書き出します
+"""
+
+import csv
+import logging
+import time
+from collections import Counter
+
+import aiosqlite
+
+from sqlite_profile import apply_profile_async
+
+SINK_BATCH_SIZE = 50  # まとめて書き出す記事数
+
+
+class CsvSink:
+    """記事をCSVファイルに逐次書き出す"""
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._unflushed = 0
+
+    async def open(self):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+
+    async def write(self, article):
+        if self._writer is None:
+            # 列は最初の記事のキーに合わせる
+            self._writer = csv.DictWriter(self._file, fieldnames=article.keys())
+            self._writer.writeheader()
+        self._writer.writerow(article)
+        self.count += 1
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self._file is not None:
+            self._file.flush()
+        self._unflushed = 0
+
+    async def close(self):
+        if self._file is not None:
+            await self.flush()
+            self._file.close()
+            self._file = None
+
+
+class DbSink:
+    """記事をバッファリングし、一定件数ごとにデータベースへ保存する
+
+    Args:
+        db_file (str): SQLiteデータベースのパス
+        init_db: 接続直後にテーブルを準備するコルーチン関数 init_db(db)
+        save_batch: 記事のリストを保存するコルーチン関数 save_batch(db, articles)。
+            件数の dict（inserted / updated / unchanged など）を返すと stats に集計する
+        batch_size (int): 1回のトランザクションで保存する記事数
+        on_saved: 保存が完了した記事のリストを受け取るコールバック
+    """
+
+    def __init__(self, db_file, init_db, save_batch, batch_size=SINK_BATCH_SIZE, on_saved=None):
+        self.db_file = db_file
+        self.init_db = init_db
+        self.save_batch = save_batch
+        self.batch_size = batch_size
+        self.on_saved = on_saved
+        self.count = 0
+        self.stats = Counter()
+        self.seconds = 0.0  # 保存にかかった時間の合計
+        self._db = None
+        self._buffer = []
+
+    async def open(self):
+        self._db = await aiosqlite.connect(self.db_file)
+        await apply_profile_async(self._db, 'crawler')
+        await self.init_db(self._db)
+        await self._db.commit()
+
+    async def write(self, article):
+        self._buffer.append(article)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """バッファの記事を1トランザクションで保存する"""
+        if self._db is None:
+            return
+        batch, self._buffer = self._buffer, []
+        start = time.perf_counter()
+        try:
+            result = await self.save_batch(self._db, batch)
+        except Exception:
+            # 失敗したバッチは次回の書き出しで再試行する
+            self._buffer[:0] = batch
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.count += len(batch)
+        if result:
+            self.stats.update(result)
+        if self.on_saved is not None and batch:
+            self.on_saved(batch)
+
+    async def close(self):
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+
+class ArticleSinks:
+    """複数のシンクに同じ記事を書き出す"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    async def __aenter__(self):
+        for sink in self.sinks:
+            await sink.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        for sink in self.sinks:
+            try:
+                await sink.close()
+            except Exception as e:
+                logging.error(f"出力先のクローズに失敗: {str(e)}")
+                if exc_type is None:
+                    raise
+
+    async def write(self, article):
+        for sink in self.sinks:
+            await sink.write(article)
+
+    async def flush(self):
+        for sink in self.sinks:
+            await sink.flush()
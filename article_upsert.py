@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事テーブルへの一括UPSERT
+INSERT OR REPLACE は既存行を削除して挿入し直すため id が変わってしまうので、
+INSERT ... ON CONFLICT(url) DO UPDATE を executemany でまとめて実行し、
+内容が変わった行だけを更新します
+"""
+
+
+def build_upsert_sql(table, columns, key='url', touch_columns=('crawled_at',)):
+    """UPSERT文を生成する
+
+    Args:
+        table (str): テーブル名
+        columns (list): 挿入するカラム（key を含む）
+        key (str): 一意制約のあるカラム
+        touch_columns (tuple): 更新時に書き換えるが、変更判定には使わないカラム
+
+    Returns:
+        str: 内容が変わっていない行は更新しないUPSERT文
+    """
+    compare_columns = [c for c in columns if c != key and c not in touch_columns]
+    update_columns = [c for c in columns if c != key]
+
+    set_clause = ",\n            ".join(f"{c} = excluded.{c}" for c in update_columns)
+    current = ", ".join(f"{table}.{c}" for c in compare_columns)
+    incoming = ", ".join(f"excluded.{c}" for c in compare_columns)
+
+    return f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join("?" for _ in columns)})
+        ON CONFLICT({key}) DO UPDATE SET
+            {set_clause}
+        WHERE ({current}) IS NOT ({incoming})
+    """
+
+
+def _dedupe_rows(columns, rows, key):
+    """同じキーの行はバッチ内で最後のものだけを残す"""
+    key_index = columns.index(key)
+    by_key = {}
+    for row in rows:
+        by_key[row[key_index]] = row
+    return list(by_key.values()), list(by_key.keys())
+
+
+def _existing_keys_sql(table, key, count):
+    return f"SELECT COUNT(*) FROM {table} WHERE {key} IN ({', '.join('?' for _ in range(count))})"
+
+
+def _summarize(total, existing, changes):
+    inserted = total - existing
+    updated = changes - inserted
+    return {'inserted': inserted, 'updated': updated, 'unchanged': existing - updated}
+
+
+# SQLiteの1文あたりのパラメータ数の上限を超えないように既存行を数える単位
+_KEY_CHUNK = 500
+
+
+def upsert_rows(conn, table, columns, rows, key='url', touch_columns=('crawled_at',)):
+    """sqlite3 接続で行を一括UPSERTする（コミットは呼び出し側で行う）
+
+    Returns:
+        dict: inserted（新規）, updated（更新）, unchanged（変更なし）の件数
+    """
+    rows, keys = _dedupe_rows(columns, rows, key)
+    if not rows:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    cursor = conn.cursor()
+    existing = 0
+    for i in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[i:i + _KEY_CHUNK]
+        cursor.execute(_existing_keys_sql(table, key, len(chunk)), chunk)
+        existing += cursor.fetchone()[0]
+
+    # rowcount はトリガー（全文検索インデックスの同期など）による変更を含まない
+    cursor.executemany(build_upsert_sql(table, columns, key, touch_columns), rows)
+    return _summarize(len(rows), existing, cursor.rowcount)
+
+
+async def upsert_rows_async(db, table, columns, rows, key='url', touch_columns=('crawled_at',)):
+    """aiosqlite 接続で行を一括UPSERTする（コミットは呼び出し側で行う）
+
+    Returns:
+        dict: inserted（新規）, updated（更新）, unchanged（変更なし）の件数
+    """
+    rows, keys = _dedupe_rows(columns, rows, key)
+    if not rows:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    existing = 0
+    for i in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[i:i + _KEY_CHUNK]
+        async with db.execute(_existing_keys_sql(table, key, len(chunk)), chunk) as cursor:
+            existing += (await cursor.fetchone())[0]
+
+    cursor = await db.executemany(build_upsert_sql(table, columns, key, touch_columns), rows)
+    return _summarize(len(rows), existing, cursor.rowcount)
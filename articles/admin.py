@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Article, Category
+from .models import Article, Category, Tag
 import json
 from django.utils.html import format_html
 
@@ -10,6 +10,11 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'category', 'post_date', 'updated_date', 'word_count', 'has_book_info', 'crawled_at')
@@ -49,7 +54,7 @@ class ArticleAdmin(admin.ModelAdmin):
     def headings_display(self, obj):
         """見出し情報を整形して表示"""
         try:
-            headings = json.loads(obj.headings or '[]')
+            headings = obj.get_headings()
             if not headings:
                 return '見出しがありません'
                 
@@ -86,17 +91,17 @@ class ArticleAdmin(admin.ModelAdmin):
     def frequent_words_display(self, obj):
         """頻出単語を整形して表示"""
         try:
-            words = json.loads(obj.frequent_words or '{}')
+            words = obj.get_frequent_words()
             if not words:
                 return '頻出単語がありません'
                 
-            # 単語をリスト化して出現頻度の高い順にソート
+            # 単語をリスト化して出現頻度の高い順にソート（以前の形式は出現回数がなく、保存順のまま）
             word_list = [(word, count) for word, count in words.items()]
-            word_list.sort(key=lambda x: x[1], reverse=True)
+            word_list.sort(key=lambda x: x[1] or 0, reverse=True)
             
             html = '<ul style="column-count: 3;">'
             for word, count in word_list:
-                html += f'<li>{word}: {count}回</li>'
+                html += f'<li>{word}: {count}回</li>' if count is not None else f'<li>{word}</li>'
             html += '</ul>'
             return format_html(html)
         except:
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ArticlesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "articles"
+
+    def ready(self):
+        # SQLite の接続に WAL などの設定を適用する（DATABASES の SQLITE_PROFILE）
+        from sqlite_profile import configure_connection
+
+        connection_created.connect(configure_connection, dispatch_uid="sqlite_profile")
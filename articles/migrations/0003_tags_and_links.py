@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_alter_article_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='タグ名')),
+            ],
+            options={
+                'verbose_name': 'タグ',
+                'verbose_name_plural': 'タグ',
+                'db_table': 'tags',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleTag',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_tags', to='articles.article', verbose_name='記事')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='article_tags', to='articles.tag', verbose_name='タグ')),
+            ],
+            options={
+                'verbose_name': '記事のタグ',
+                'verbose_name_plural': '記事のタグ',
+                'db_table': 'article_tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='articles', through='articles.ArticleTag', to='articles.tag', verbose_name='タグ（正規化）'),
+        ),
+        migrations.CreateModel(
+            name='ArticleLink',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('target_url', models.URLField(max_length=500, verbose_name='リンク先URL')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_links', to='articles.article', verbose_name='リンク元')),
+                ('target', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_links', to='articles.article', verbose_name='リンク先')),
+            ],
+            options={
+                'verbose_name': '内部リンク',
+                'verbose_name_plural': '内部リンク',
+                'db_table': 'article_links',
+                'indexes': [models.Index(fields=['target', 'source'], name='idx_article_links_target'), models.Index(fields=['target_url'], name='idx_article_links_target_url')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'target_url'), name='unique_article_link')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='articletag',
+            index=models.Index(fields=['tag', 'article'], name='idx_article_tags_tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='articletag',
+            constraint=models.UniqueConstraint(fields=('article', 'tag'), name='unique_article_tag'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_tags_and_links'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='同期名')),
+                ('watermark', models.CharField(blank=True, default='', max_length=64, verbose_name='同期済みの取得日時')),
+                ('last_id', models.IntegerField(default=0, verbose_name='同期済みの記事ID')),
+                ('synced_at', models.DateTimeField(auto_now=True, verbose_name='同期日時')),
+            ],
+            options={
+                'verbose_name': '同期状態',
+                'verbose_name_plural': '同期状態',
+                'db_table': 'sync_state',
+            },
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='crawled_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='取得日時'),
+        ),
+    ]
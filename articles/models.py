@@ -1,7 +1,29 @@
 from django.db import models
+from django.utils import timezone
 import json
 
 
+def parse_headings(value):
+    """見出しを [{'level': 'h2', 'text': ...}, ...] にする
+
+    JSON のほか、クローラーの headings の形式（1行に「h2: 見出し」）も読み込む。
+    """
+    if not value:
+        return []
+    try:
+        headings = json.loads(value)
+        if isinstance(headings, list):
+            return headings
+    except ValueError:
+        pass
+    headings = []
+    for line in value.splitlines():
+        level, sep, text = line.partition(': ')
+        if sep and level in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            headings.append({'level': level, 'text': text.strip()})
+    return headings
+
+
 class Category(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, verbose_name='カテゴリ名')
@@ -31,6 +53,20 @@ class Category(models.Model):
         return self.name
 
 
+class Tag(models.Model):
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True, verbose_name='タグ名')
+
+    class Meta:
+        db_table = 'tags'
+        verbose_name = 'タグ'
+        verbose_name_plural = 'タグ'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class Article(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=500, null=True, verbose_name='タイトル')
@@ -41,6 +77,8 @@ class Article(models.Model):
     category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL, 
                                 verbose_name='カテゴリ', related_name='articles')
     tags = models.CharField(max_length=500, blank=True, null=True, verbose_name='タグ')
+    tag_set = models.ManyToManyField(Tag, through='ArticleTag', blank=True, related_name='articles',
+                                     verbose_name='タグ（正規化）')
     headings = models.TextField(blank=True, null=True, verbose_name='見出し')
     book_title = models.CharField(max_length=500, blank=True, null=True, verbose_name='書籍タイトル')
     book_author = models.CharField(max_length=200, blank=True, null=True, verbose_name='著者')
@@ -50,7 +88,8 @@ class Article(models.Model):
     internal_links = models.TextField(blank=True, null=True, verbose_name='内部リンク')
     frequent_words = models.TextField(blank=True, null=True, verbose_name='頻出語')
     broken_links = models.TextField(blank=True, null=True, verbose_name='リンク切れ')
-    crawled_at = models.DateTimeField(auto_now_add=True, verbose_name='取得日時')
+    # クローラーのデータベースの取得日時を同期するため、auto_now_add ではなく既定値にする
+    crawled_at = models.DateTimeField(default=timezone.now, verbose_name='取得日時')
 
     class Meta:
         managed = True
@@ -70,12 +109,7 @@ class Article(models.Model):
         
     def get_headings(self):
         """見出しをリストとして取得"""
-        if not self.headings:
-            return []
-        try:
-            return json.loads(self.headings)
-        except:
-            return []
+        return parse_headings(self.headings)
             
     def get_internal_links(self):
         """内部リンクをリストとして取得"""
@@ -87,13 +121,20 @@ class Article(models.Model):
             return []
             
     def get_frequent_words(self):
-        """頻出語を辞書として取得"""
+        """頻出語を辞書として取得
+
+        以前のクローラーは頻出語をカンマ区切り（出現回数なし）で保存していたため、
+        その形式は出現回数を None として読み込む。
+        """
         if not self.frequent_words:
             return {}
         try:
-            return json.loads(self.frequent_words)
-        except:
-            return {}
+            words = json.loads(self.frequent_words)
+            if isinstance(words, dict):
+                return words
+        except ValueError:
+            pass
+        return {word.strip(): None for word in self.frequent_words.split(',') if word.strip()}
             
     def get_broken_links(self):
         """リンク切れをリストとして取得"""
@@ -106,22 +147,82 @@ class Article(models.Model):
             
     def get_related_articles(self):
         """内部リンク（同じドメイン内の記事）を取得"""
-        links = self.get_internal_links()
-        if not links:
-            return []
-        urls = [link['url'] for link in links]
-        return Article.objects.filter(url__in=urls)
+        return Article.objects.filter(incoming_links__source=self).distinct()
+
+    def get_linking_articles(self):
+        """この記事にリンクしている記事を取得"""
+        return Article.objects.filter(outgoing_links__target=self).distinct()
 
     @classmethod
     def get_link_structure(cls):
         """記事間のリンク構造を解析"""
-        articles = cls.objects.all()
-        structure = []
-        for article in articles:
-            related = article.get_related_articles()
-            if related:
-                structure.append({
-                    'source': article.id,
-                    'target_ids': [rel.id for rel in related]
-                })
-        return structure
+        structure = {}
+        links = ArticleLink.objects.filter(target__isnull=False).values_list('source_id', 'target_id')
+        for source_id, target_id in links.order_by('source_id', 'target_id'):
+            structure.setdefault(source_id, []).append(target_id)
+        return [{'source': source_id, 'target_ids': target_ids} for source_id, target_ids in structure.items()]
+
+
+class ArticleTag(models.Model):
+    """記事とタグの対応（タグで記事を絞り込むときは tag, article の索引を使う）"""
+    id = models.AutoField(primary_key=True)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='article_tags',
+                                verbose_name='記事')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='article_tags', db_index=False,
+                            verbose_name='タグ')
+
+    class Meta:
+        db_table = 'article_tags'
+        verbose_name = '記事のタグ'
+        verbose_name_plural = '記事のタグ'
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'tag'], name='unique_article_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'article'], name='idx_article_tags_tag'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.tag}"
+
+
+class ArticleLink(models.Model):
+    """記事の内部リンク（リンク先が記事の場合は target に記事を持つ）"""
+    id = models.AutoField(primary_key=True)
+    source = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='outgoing_links',
+                               verbose_name='リンク元')
+    target_url = models.URLField(max_length=500, verbose_name='リンク先URL')
+    target = models.ForeignKey(Article, null=True, blank=True, on_delete=models.SET_NULL,
+                               related_name='incoming_links', db_index=False, verbose_name='リンク先')
+
+    class Meta:
+        db_table = 'article_links'
+        verbose_name = '内部リンク'
+        verbose_name_plural = '内部リンク'
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'target_url'], name='unique_article_link'),
+        ]
+        indexes = [
+            models.Index(fields=['target', 'source'], name='idx_article_links_target'),
+            models.Index(fields=['target_url'], name='idx_article_links_target_url'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_url}"
+
+
+class SyncState(models.Model):
+    """クローラーのデータベースからの同期の進捗（同期済みの最後の記事の crawled_at と id）"""
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True, verbose_name='同期名')
+    watermark = models.CharField(max_length=64, blank=True, default='', verbose_name='同期済みの取得日時')
+    last_id = models.IntegerField(default=0, verbose_name='同期済みの記事ID')
+    synced_at = models.DateTimeField(auto_now=True, verbose_name='同期日時')
+
+    class Meta:
+        db_table = 'sync_state'
+        verbose_name = '同期状態'
+        verbose_name_plural = '同期状態'
+
+    def __str__(self):
+        return f"{self.name}: {self.watermark}"
@@ -1,3 +1,242 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+import aiosqlite
+
+import crawl_setten
+import sqlite_profile
+from migrate_articles import SOURCE_COLUMNS, build_article, migrate_articles
+from .admin import ArticleAdmin
+from .models import Article, ArticleLink, ArticleTag, SyncState
+
+BULK_ROWS = 20000
+
+
+def bulk_rows(count):
+    """クローラーの一括書き込みを模した記事の行"""
+    crawled_at = timezone.now().isoformat()
+    return [
+        (f"記事{i}", f"https://set-ten.com/bulk/{i}/", "本文" * 200, 400, crawled_at)
+        for i in range(count)
+    ]
+
+
+class SQLiteProfileTests(TransactionTestCase):
+    """クローラーの書き込み中もビューアーが読めること（WAL）"""
+
+    def setUp(self):
+        Article.objects.create(title='既存の記事', url='https://set-ten.com/existing/', word_count=0)
+        self.db_file = connection.settings_dict['NAME']
+
+    def test_viewer_connection_uses_profile(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], sqlite_profile.PROFILES['viewer']['busy_timeout'])
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_viewer_reads_during_bulk_write(self):
+        writer = sqlite_profile.connect(self.db_file, 'crawler')
+        try:
+            writer.execute("BEGIN IMMEDIATE")
+            writer.executemany(
+                "INSERT INTO articles (title, url, content_intro, word_count, crawled_at) VALUES (?, ?, ?, ?, ?)",
+                bulk_rows(BULK_ROWS),
+            )
+
+            # 書き込みのトランザクションが開いたままでも、コミット済みの記事を待たずに読める
+            start = time.perf_counter()
+            response = self.client.get(reverse('articles:article_list'))
+            elapsed = time.perf_counter() - start
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['total_count'], 1)
+            self.assertLess(elapsed, sqlite_profile.PROFILES['viewer']['busy_timeout'] / 1000)
+
+            writer.commit()
+        finally:
+            writer.close()
+
+        response = self.client.get(reverse('articles:article_list'))
+        self.assertEqual(response.context['total_count'], BULK_ROWS + 1)
+
+    def test_crawl_commits_while_viewer_is_reading(self):
+        reader = sqlite_profile.connect(self.db_file, 'viewer', isolation_level=None)
+        writer = sqlite_profile.connect(self.db_file, 'crawler')
+        try:
+            reader.execute("BEGIN")
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM articles").fetchone()[0], 1)
+
+            # 読み込みのトランザクションが開いたままでもコミットできる（ロールバックジャーナルでは待たされる）
+            writer.executemany(
+                "INSERT INTO articles (title, url, content_intro, word_count, crawled_at) VALUES (?, ?, ?, ?, ?)",
+                bulk_rows(1000),
+            )
+            writer.commit()
+
+            # 読み込み側は開始時点の内容を読み続ける
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM articles").fetchone()[0], 1)
+            reader.execute("COMMIT")
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM articles").fetchone()[0], 1001)
+        finally:
+            writer.close()
+            reader.close()
+
+
+class HeadingsTests(TestCase):
+    """クローラーの見出し（「h2: 見出し」の行）をビューアーの見出し構造として扱う"""
+
+    CRAWLED_HEADINGS = "h2: はじめに\nh3: 朝4時半に起きる\nh2: まとめ"
+    EXPECTED = [
+        {'level': 'h2', 'text': 'はじめに'},
+        {'level': 'h3', 'text': '朝4時半に起きる'},
+        {'level': 'h2', 'text': 'まとめ'},
+    ]
+
+    def test_build_article_converts_headings_to_json(self):
+        row = dict.fromkeys(SOURCE_COLUMNS)
+        row.update(url='https://set-ten.com/a/', title='記事', headings=self.CRAWLED_HEADINGS, word_count=0)
+        article = build_article(tuple(row[column] for column in SOURCE_COLUMNS), {})
+        self.assertEqual(json.loads(article.headings), self.EXPECTED)
+        self.assertEqual(article.get_headings(), self.EXPECTED)
+
+    def test_legacy_text_headings(self):
+        article = Article.objects.create(
+            title='記事', url='https://set-ten.com/a/', headings=self.CRAWLED_HEADINGS, crawled_at=timezone.now()
+        )
+        self.assertEqual(article.get_headings(), self.EXPECTED)
+        self.assertIn('(h3)', ArticleAdmin(Article, None).headings_display(article))
+
+        response = self.client.get(reverse('articles:article_detail', args=[article.id]))
+        self.assertContains(response, '<li class="heading-h3">朝4時半に起きる</li>', html=True)
+
+
+class FrequentWordsTests(TestCase):
+
+    def create(self, frequent_words):
+        return Article.objects.create(
+            title='記事', url='https://set-ten.com/a/', frequent_words=frequent_words, crawled_at=timezone.now()
+        )
+
+    def test_counts(self):
+        article = self.create('{"早起き": 5, "習慣": 3}')
+        self.assertEqual(article.get_frequent_words(), {'早起き': 5, '習慣': 3})
+        response = self.client.get(reverse('articles:article_detail', args=[article.id]))
+        self.assertContains(response, '<li>早起き <span class="count">5</span></li>', html=True)
+
+    def test_legacy_comma_separated(self):
+        # 以前のクローラーはカンマ区切りで保存していた
+        article = self.create('早起き, 習慣, エンジニア')
+        self.assertEqual(article.get_frequent_words(), {'早起き': None, '習慣': None, 'エンジニア': None})
+        self.assertIn('<li>習慣</li>', ArticleAdmin(Article, None).frequent_words_display(article))
+        response = self.client.get(reverse('articles:article_detail', args=[article.id]))
+        self.assertContains(response, '<li>エンジニア</li>', html=True)
+
+
+def crawled_article(i, **fields):
+    """クローラーが保存する形式の記事"""
+    return {
+        'title': f"記事{i}",
+        'url': f"https://set-ten.com/a/b/{i}/",
+        'post_date': '2025-05-24T10:00:00+09:00',
+        'tags': 'AI,キャリア',
+        'headings': 'h2: はじめに',
+        'word_count': 100,
+        'internal_links': [{'url': f"https://set-ten.com/a/b/{(i + 1) % 3}/"}],
+        **fields,
+    }
+
+
+class SyncTests(TestCase):
+    """クローラーのデータベースからの差分同期"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = os.path.join(tmp.name, 'setten_articles.db')
+
+    def crawl(self, articles):
+        """クローラーと同じ処理でクローラーのデータベースに記事を保存する"""
+        async def save():
+            async with aiosqlite.connect(self.source) as db:
+                await crawl_setten.init_db(db)
+                await db.commit()
+                await crawl_setten.save_to_db(db, articles)
+        asyncio.run(save())
+
+    def sync(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return migrate_articles(self.source)
+
+    def source_schema(self):
+        with sqlite_profile.connect(self.source) as conn:
+            return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+
+    def test_only_changed_rows_are_synced(self):
+        self.crawl([crawled_article(i) for i in range(3)])
+        self.assertEqual(self.sync(), 3)
+
+        ids = dict(Article.objects.values_list('url', 'id'))
+        tags = set(ArticleTag.objects.values_list('id', 'article_id', 'tag_id'))
+        links = set(ArticleLink.objects.values_list('id', 'source_id', 'target_id'))
+        self.assertEqual(len(tags), 6)
+        self.assertEqual(len(links), 3)
+        # リンク先の記事が後から同期されても target が埋まる
+        self.assertEqual(ArticleLink.objects.filter(target__isnull=True).count(), 0)
+        state = SyncState.objects.get()
+        first_watermark = state.watermark
+        self.assertEqual(state.last_id, 3)
+        unchanged_url = crawled_article(0)['url']
+        unchanged_crawled_at = Article.objects.get(url=unchanged_url).crawled_at
+        schema = self.source_schema()
+
+        # 1記事だけ内容を変えてクロールする
+        changed = crawled_article(1, title='記事1（改訂）')
+        self.crawl([changed])
+        self.assertEqual(self.sync(), 1)
+
+        self.assertEqual(dict(Article.objects.values_list('url', 'id')), ids)
+        self.assertEqual(Article.objects.get(url=changed['url']).title, '記事1（改訂）')
+        self.assertEqual(Article.objects.get(url=unchanged_url).crawled_at, unchanged_crawled_at)
+        # 変わっていない記事のタグとリンクは書き直さない（行の id が変わらない）
+        changed_id = ids[changed['url']]
+        self.assertEqual(
+            {row for row in ArticleTag.objects.values_list('id', 'article_id', 'tag_id') if row[1] != changed_id},
+            {row for row in tags if row[1] != changed_id},
+        )
+        self.assertEqual(
+            {row for row in ArticleLink.objects.values_list('id', 'source_id', 'target_id') if row[1] != changed_id},
+            {row for row in links if row[1] != changed_id},
+        )
+        self.assertEqual(ArticleTag.objects.count(), len(tags))
+        self.assertEqual(ArticleLink.objects.count(), len(links))
+
+        state.refresh_from_db()
+        self.assertGreater(state.watermark, first_watermark)
+        with sqlite_profile.connect(self.source) as conn:
+            source_id, = conn.execute("SELECT id FROM articles WHERE url = ?", (changed['url'],)).fetchone()
+        self.assertEqual(state.last_id, source_id)
+
+        # 変更がなければ何も同期しない
+        self.assertEqual(self.sync(), 0)
+        # 同期はクローラーのデータベースに書き込まない
+        self.assertEqual(self.source_schema(), schema)
+
+    def test_source_without_relations_is_not_modified(self):
+        with sqlite_profile.connect(self.source) as conn:
+            conn.execute(crawl_setten.ARTICLES_TABLE_SQL)
+        schema = self.source_schema()
+        with self.assertRaises(RuntimeError):
+            self.sync()
+        self.assertEqual(self.source_schema(), schema)
@@ -1,8 +1,8 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from django.db.models import Q, Max
+from django.db.models import Q, Max, Count
 from django.http import JsonResponse
-from .models import Article, Category
+from .models import Article, ArticleLink, Category
 
 def home(request):
     """ホームページ表示"""
@@ -29,6 +29,7 @@ def article_list(request):
     query = request.GET.get('q', '')
     category_id = request.GET.get('category', '')
     has_book_info = request.GET.get('has_book', '')
+    tag = request.GET.get('tag', '')
     
     articles = Article.objects.all().order_by('-post_date')
     
@@ -56,6 +57,10 @@ def article_list(request):
             # 子カテゴリが選択された場合は、その特定のカテゴリのみ
             articles = articles.filter(category=selected_category)
         
+    # タグフィルターがある場合（article_tags の索引で絞り込む）
+    if tag:
+        articles = articles.filter(tag_set__name=tag)
+
     # 書籍情報あり/なしのフィルター
     if has_book_info == '1':
         articles = articles.filter(
@@ -78,6 +83,7 @@ def article_list(request):
         'query': query,
         'selected_category': selected_category,
         'has_book_info': has_book_info,
+        'selected_tag': tag,
         'total_count': articles.count(),  # 検索結果の総数
     }
     
@@ -160,56 +166,38 @@ def api_article_network(request):
     nodes = []
     edges = []
     node_ids = set()  # 処理済みのノードを追跡
-    edge_counts = {}  # エッジの参照数を追跡
     
-    for article in articles:
-        # 記事自体をノードとして追加
-        node_data = {
+    def add_node(article):
+        if article.id in node_ids:
+            return
+        title = article.title or "無題"
+        nodes.append({
             'id': article.id,
-            'label': article.title[:30] + '...' if article.title and len(article.title) > 30 else (article.title or "無題"),
-            'title': article.title or "無題",  # ホバー時に表示する完全なタイトル
-            'group': article.category or 'その他',
+            'label': title[:30] + '...' if len(title) > 30 else title,
+            'title': title,  # ホバー時に表示する完全なタイトル
+            'group': str(article.category) if article.category else 'その他',
             'value': 1  # ノードの大きさ（後で更新）
-        }
-        
-        if article.id not in node_ids:
-            nodes.append(node_data)
-            node_ids.add(article.id)
-        
-        # 内部リンクからエッジを作成
-        if article.internal_links:
-            try:
-                links = eval(article.internal_links)
-                for link in links:
-                    try:
-                        # URLから記事IDを抽出
-                        target_id = int(link.split('/')[-2])
-                        # エッジの参照数をカウント
-                        edge_key = f"{article.id}-{target_id}"
-                        edge_counts[edge_key] = edge_counts.get(edge_key, 0) + 1
-                        
-                        # リンク先の記事が存在する場合、ノードを追加
-                        target_article = Article.objects.filter(id=target_id).first()
-                        if target_article:
-                            target_title = target_article.title if target_article.title else "無題"
-                            # リンク先の記事をノードとして追加
-                            if target_id not in node_ids:
-                                nodes.append({
-                                    'id': target_id,
-                                    'label': target_title[:30] + '...' if len(target_title) > 30 else target_title,
-                                    'title': target_title,
-                                    'group': target_article.category or 'その他',
-                                    'value': 1
-                                })
-                                node_ids.add(target_id)
-                    except (ValueError, IndexError):
-                        continue
-            except:
-                continue
+        })
+        node_ids.add(article.id)
+    
+    for article in articles.select_related('category'):
+        add_node(article)
+    
+    # 内部リンクのテーブルから記事間のエッジを作成（リンク先ごとの参照数を含める）
+    links = (
+        ArticleLink.objects.filter(source__in=articles, target__isnull=False)
+        .values('source_id', 'target_id')
+        .annotate(count=Count('id'))
+    )
+    edge_counts = {(link['source_id'], link['target_id']): link['count'] for link in links}
+    
+    # リンク先の記事がフィルターの対象外の場合もノードとして追加
+    missing_ids = {target_id for _, target_id in edge_counts} - node_ids
+    for article in Article.objects.filter(id__in=missing_ids).select_related('category'):
+        add_node(article)
     
     # エッジを作成（参照数を含める）
-    for edge_key, count in edge_counts.items():
-        source_id, target_id = map(int, edge_key.split('-'))
+    for (source_id, target_id), count in edge_counts.items():
         edges.append({
             'from': source_id,
             'to': target_id,
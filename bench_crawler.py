@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+クローラーのベンチマーク
+合成サイト（synthetic_site.py）をローカルで配信し、crawl_setten.py を別プロセスで最初から最後まで
+実行して、スループット・取得時間・解析時間・データベースの書き込み速度・最大メモリ使用量を測ります
+
+測定する指標:
+    pages_per_sec       1秒あたりの取得ページ数
+    articles_per_sec    1秒あたりの保存記事数
+    p50_fetch_ms        取得時間の中央値（ミリ秒）
+    p95_fetch_ms        取得時間の95パーセンタイル（ミリ秒）
+    parse_ms_per_page   1ページあたりの解析・抽出時間（ミリ秒）
+    db_rows_per_sec     データベースに書き込んだ1秒あたりの行数
+    peak_rss_mb         クローラー本体と解析ワーカーのうち、最もメモリを使ったプロセス1つの最大メモリ使用量（MB）
+    peak_total_rss_mb   クローラー本体と解析ワーカーの合計メモリ使用量の最大値（MB。psutil がなければ null）
+    missing_articles    合成サイトの記事のうち保存されなかった数
+
+結果はJSONに書き出し、閾値（--thresholds）や以前の結果（--baseline）と比べて
+悪化していれば終了コード1で終了します
+
+psutil がインストールされていれば、実行中のクローラーのプロセスツリーのメモリ使用量を
+RSS_SAMPLE_INTERVAL 秒ごとに合計して peak_total_rss_mb を求めます。
+
+使い方:
+    python bench_crawler.py [--articles 500] [--latency 0.01] [-o bench.json]
+    python bench_crawler.py --thresholds thresholds.json --baseline previous.json
+        thresholds.json の形式: {"pages_per_sec": {"min": 50}, "peak_rss_mb": {"max": 300}}
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+from html_parser_backend import DEFAULT_BACKEND, PARSER_BACKENDS
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CRAWLER_SCRIPT = os.path.join(HERE, 'crawl_setten.py')
+SITE_SCRIPT = os.path.join(HERE, 'synthetic_site.py')
+
+DEFAULT_ARTICLES = 500
+DEFAULT_MAX_RATE = 1000.0  # ローカルの合成サイトなのでレート制限は実質的に外す
+SERVER_START_TIMEOUT = 30  # 合成サイトの起動を待つ秒数
+BASELINE_TOLERANCE = 0.2  # 以前の結果からの悪化を許容する割合
+RSS_SAMPLE_INTERVAL = 0.1  # プロセスツリーのメモリ使用量を測る間隔（秒）
+
+# 既定の閾値（明らかな性能劣化と記事の取りこぼしを検出する程度の緩い値）
+DEFAULT_THRESHOLDS = {
+    'missing_articles': {'max': 0},
+    'pages_per_sec': {'min': 5},
+    'parse_ms_per_page': {'max': 200},
+    'peak_rss_mb': {'max': 1024},
+}
+
+# 値が大きいほど良い指標（それ以外は小さいほど良い）
+HIGHER_IS_BETTER = {'pages_per_sec', 'articles_per_sec', 'db_rows_per_sec'}
+
+
+def free_port():
+    """空いているポート番号を取得する"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_site(args, port):
+    """合成サイトを別プロセスで起動し、応答するまで待つ"""
+    command = [
+        sys.executable, SITE_SCRIPT, 'serve', '--port', str(port),
+        '--articles', str(args.articles), '--seed', str(args.seed),
+        '--latency', str(args.latency), '--error-rate', str(args.error_rate),
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"合成サイトの起動に失敗しました: {server.stderr.read().decode(errors='replace')}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/__stats__', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("合成サイトが時間内に起動しませんでした")
+
+
+def server_stats(port):
+    """合成サイトが返した応答の件数"""
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/__stats__', timeout=5) as response:
+        return json.load(response)
+
+
+def tree_rss(pid):
+    """プロセスとその子孫のメモリ使用量（RSS）の合計（バイト）"""
+    try:
+        root = psutil.Process(pid)
+        processes = [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return 0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass  # 測る間に終了したプロセス
+    return total
+
+
+def wait_sampling_rss(process):
+    """プロセスの終了を待ち、(stdout, stderr, 合計メモリ使用量の最大値（KB）) を返す
+
+    psutil がなければ合計メモリ使用量は測らず None を返す。
+    """
+    if not HAS_PSUTIL:
+        stdout, stderr = process.communicate()
+        return stdout, stderr, None
+    peak = 0
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=RSS_SAMPLE_INTERVAL)
+            return stdout, stderr, peak // 1024
+        except subprocess.TimeoutExpired:
+            peak = max(peak, tree_rss(process.pid))
+
+
+def run_crawler(args, base_url, workdir):
+    """クローラーを別プロセスで実行し、集計結果と最大メモリ使用量を返す
+
+    Returns:
+        tuple: (集計結果, 経過秒, 1プロセスの最大メモリ使用量（KB）, プロセスツリーの合計の最大値（KB または None）)
+    """
+    stats_file = os.path.join(workdir, 'crawl_stats.json')
+    os.makedirs(os.path.join(workdir, 'logs'), exist_ok=True)
+    command = [
+        sys.executable, CRAWLER_SCRIPT, '--base-url', base_url,
+        '--max-pages', str(args.max_pages), '--max-rate', str(args.max_rate),
+        '--initial-rate', str(args.max_rate), '--parser', args.parser,
+        '--stats-json', stats_file,
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    _, stderr, peak_total_rss_kb = wait_sampling_rss(process)
+    wall_seconds = time.perf_counter() - start
+    # RUSAGE_CHILDREN の ru_maxrss は合計ではなく、終了した子孫プロセス（クローラー本体と
+    # 解析ワーカー）のうち最大のもの1つの値
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if process.returncode != 0 or not os.path.exists(stats_file):
+        raise RuntimeError(f"クローラーが異常終了しました（終了コード {process.returncode}）\n{stderr[-2000:]}")
+    with open(stats_file, encoding='utf-8') as f:
+        summary = json.load(f)
+    return summary, wall_seconds, peak_rss_kb, peak_total_rss_kb
+
+
+def compute_metrics(summary, num_articles, peak_rss_kb, peak_total_rss_kb=None):
+    """クローラーの集計結果から指標を計算する"""
+    elapsed = summary['elapsed_seconds'] or float('nan')
+    db = summary['db']
+    return {
+        'pages_per_sec': round(summary['pages_fetched'] / elapsed, 2),
+        'articles_per_sec': round(summary['articles'] / elapsed, 2),
+        'p50_fetch_ms': summary['fetch'].get('p50_ms'),
+        'p95_fetch_ms': summary['fetch'].get('p95_ms'),
+        'parse_ms_per_page': summary['parse_ms_per_page'],
+        'db_rows_per_sec': round(db['rows'] / db['seconds'], 1) if db['seconds'] else None,
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+        'peak_total_rss_mb': round(peak_total_rss_kb / 1024, 1) if peak_total_rss_kb is not None else None,
+        'missing_articles': max(0, num_articles - summary['articles']),
+    }
+
+
+def check_thresholds(metrics, thresholds):
+    """閾値を超えた指標の一覧を返す"""
+    failures = []
+    for name, limits in thresholds.items():
+        value = metrics.get(name)
+        if value is None:
+            continue
+        if 'min' in limits and value < limits['min']:
+            failures.append(f"{name} = {value}（下限 {limits['min']}）")
+        if 'max' in limits and value > limits['max']:
+            failures.append(f"{name} = {value}（上限 {limits['max']}）")
+    return failures
+
+
+def compare_baseline(metrics, baseline, tolerance):
+    """以前の結果から tolerance を超えて悪化した指標の一覧を返す"""
+    failures = []
+    for name, previous in baseline.items():
+        value = metrics.get(name)
+        if value is None or previous is None or name == 'missing_articles':
+            continue
+        if name in HIGHER_IS_BETTER:
+            if value < previous * (1 - tolerance):
+                failures.append(f"{name} = {value}（以前の結果 {previous}）")
+        elif value > previous * (1 + tolerance):
+            failures.append(f"{name} = {value}（以前の結果 {previous}）")
+    return failures
+
+
+def load_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="クローラーのベンチマーク")
+    parser.add_argument("--articles", type=int, default=DEFAULT_ARTICLES,
+                        help=f"合成サイトの記事数（デフォルト: {DEFAULT_ARTICLES}）")
+    parser.add_argument("--seed", type=int, default=1, help="合成サイトの乱数のシード")
+    parser.add_argument("--latency", type=float, default=0.0, help="合成サイトの平均応答時間（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="合成サイトが5xxを返す割合")
+    parser.add_argument("--max-rate", type=float, default=DEFAULT_MAX_RATE,
+                        help=f"クローラーのリクエストレートの上限（件/秒。デフォルト: {DEFAULT_MAX_RATE}）")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="取得するページ数の上限（省略時は合成サイトの全ページ）")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"クローラーのHTMLパーサー（デフォルト: {DEFAULT_BACKEND}）")
+    parser.add_argument("-o", "--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--thresholds", help="閾値のJSONファイル（既定の閾値を上書きする）")
+    parser.add_argument("--baseline", help="比較する以前の結果のJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=BASELINE_TOLERANCE,
+                        help=f"以前の結果からの悪化を許容する割合（デフォルト: {BASELINE_TOLERANCE}）")
+    parser.add_argument("--keep", action="store_true", help="クローラーの作業ディレクトリを削除しない")
+    args = parser.parse_args()
+    if args.max_pages is None:
+        # 記事・一覧・タグのページを取りこぼさない程度の上限
+        args.max_pages = args.articles * 3 + 100
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if args.thresholds:
+        thresholds.update(load_json(args.thresholds))
+
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}/'
+    workdir = tempfile.mkdtemp(prefix='bench_crawler_')
+    server = start_site(args, port)
+    try:
+        summary, wall_seconds, peak_rss_kb, peak_total_rss_kb = run_crawler(args, base_url, workdir)
+        responses = server_stats(port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    metrics = compute_metrics(summary, args.articles, peak_rss_kb, peak_total_rss_kb)
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {
+            'articles': args.articles, 'seed': args.seed, 'latency': args.latency,
+            'error_rate': args.error_rate, 'max_rate': args.max_rate, 'max_pages': args.max_pages,
+            'parser': args.parser,
+        },
+        'metrics': metrics,
+        'wall_seconds': round(wall_seconds, 3),
+        'crawl': summary,
+        'server': responses,
+    }
+
+    print(f"合成サイト {args.articles}記事 / 経過時間 {summary['elapsed_seconds']:.2f}秒"
+          f"（プロセス全体 {wall_seconds:.2f}秒）")
+    for name, value in metrics.items():
+        print(f"  {name:18s} {value}")
+
+    failures = check_thresholds(metrics, thresholds)
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        failures += compare_baseline(metrics, baseline.get('metrics', baseline), args.tolerance)
+    result['failures'] = failures
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を {args.output} に書き出しました")
+    if args.keep:
+        print(f"作業ディレクトリ: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("性能の劣化を検出しました:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+記事抽出のマイクロベンチマーク
+CSSセレクタで何度も走査していた従来の抽出処理と、単一走査の extract_article を
+同じ解析済みページで実行し、出力が一致することと1記事あたりの抽出時間を確認します
+（ISBN / ASIN は検証付きの検出に、頻出語は形態素解析による集計に変えたため比較から除外する。
+タイトルは、従来の処理が最後の内部リンクのテキストで上書きしていた不具合を直したため比較から除外する）
+抽出プラグインのフィールドは、拡張版クローラーが使っていたCSSセレクタの抽出結果と比較します
+
+使い方:
+    python bench_extractor.py page1.html page2.html ... [-r 50] [--parser lxml]
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from urllib.parse import unquote, urljoin, urlparse
+
+from bs4 import Tag
+
+from article_extractor import DEFAULT_EXTRACTORS, clean_text, extract_article, normalize_url
+from html_parser_backend import DEFAULT_BACKEND, PARSER_BACKENDS, make_soup
+
+# 従来の抽出処理から意図的に結果を変えたフィールド
+CHANGED_FIELDS = {'title', 'book_isbn', 'book_asin', 'frequent_words'}
+
+
+def legacy_extract_article_info(soup, url):
+    """単一走査版に置き換える前の抽出処理（比較用にそのまま残している）"""
+    # タイトル
+    title_elem = soup.select_one('h1.entry-title')
+    title = clean_text(title_elem.get_text()) if title_elem else ""
+    
+    # 投稿日
+    date_meta = soup.select_one("meta[property='article:published_time']")
+    date = ""
+    if date_meta:
+        content = date_meta.get("content", "")
+        if content and isinstance(content, str):
+            date = content.split("T")[0]
+    
+    # 更新日
+    updated_meta = soup.select_one("meta[property='article:modified_time']")
+    updated_date = ""
+    if updated_meta:
+        content = updated_meta.get("content", "")
+        if content and isinstance(content, str):
+            updated_date = content.split("T")[0]
+    
+    # カテゴリー（階層構造を考慮）
+    category_path = ""
+    try:
+        # カテゴリの抽出方法を改善
+        cat_selectors = [
+            ".post-categories a",  # WordPress標準
+            ".cat-links a",       # テーマ固有
+            ".entry-category a",   # テーマ固有
+            ".article-category a", # カスタム
+            ".category a",        # 一般的
+            ".breadcrumb a"       # パンくずリスト
+        ]
+        
+        # 除外するカテゴリ
+        exclude_categories = {'home', 'トップ', 'ホーム', 'index', '一覧'}
+        
+        category_list = []
+        for selector in cat_selectors:
+            cat_elems = soup.select(selector)
+            for cat in cat_elems:
+                if isinstance(cat, Tag) and cat.string:
+                    cat_text = clean_text(cat.string)
+                    if cat_text and cat_text.lower() not in exclude_categories:
+                        if cat_text not in category_list:
+                            category_list.append(cat_text)
+                            
+        if not category_list:  # バックアップ: URLからカテゴリを推測
+            path_parts = urlparse(url).path.strip('/').split('/')
+            if len(path_parts) >= 2:  # 最低2階層のパスがある場合
+                # URLデコードとクリーニング
+                for part in path_parts[:-1]:  # 最後のパス（記事ID）を除外
+                    cat = clean_text(unquote(part).replace('-', ' '))
+                    if cat and cat.lower() not in exclude_categories:
+                        category_list.append(cat)
+        
+        # カテゴリパスの生成
+        if category_list:
+            category_path = " > ".join(category_list)
+    except Exception as e:
+        logging.warning(f"カテゴリの抽出でエラー: {str(e)}")
+
+    # タグ（重複を排除して正規化）
+    tags = set()
+    try:
+        # タグ抽出のセレクタを強化
+        tag_selectors = [
+            ".tags-links a",      # WordPress標準
+            ".tag-links a",       # テーマ固有
+            ".entry-tags a",      # テーマ固有
+            ".post-tags a",       # 一般的
+            ".article-tags a",    # カスタム
+            ".tags a",           # シンプルな形式
+            "[rel='tag']",       # HTMLのタグ関連属性
+            ".meta-tags a",      # メタ情報領域のタグ
+            ".tag"              # 単純なタグクラス
+        ]
+        
+        for selector in tag_selectors:
+            for tag in soup.select(selector):
+                if isinstance(tag, Tag):
+                    # href属性からタグを抽出する場合
+                    href = tag.get('href', '')
+                    if isinstance(href, str) and href:
+                        try:
+                            # URLからタグ名を抽出（最後のパス部分を使用）
+                            path_parts = [p for p in href.split('/') if p]
+                            if path_parts:
+                                tag_from_url = clean_text(unquote(path_parts[-1]).replace('-', ' '))
+                                if tag_from_url:
+                                    tags.add(tag_from_url)
+                        except Exception as e:
+                            logging.debug(f"タグURLの解析でエラー: {str(e)}")
+                    
+                    # タグのテキストを抽出
+                    tag_text = tag.get_text(strip=True)
+                    if tag_text:
+                        try:
+                            # テキストの正規化
+                            cleaned_tag = clean_text(tag_text)
+                            if cleaned_tag:
+                                tags.add(cleaned_tag)
+                        except Exception as e:
+                            logging.debug(f"タグテキストの処理でエラー: {str(e)}")
+                            
+    except Exception as e:
+        logging.warning(f"タグの抽出でエラー: {str(e)}")
+
+    tags_str = ','.join(sorted(tags)) if tags else ""
+
+    # 本文冒頭
+    intro = ""
+    content = soup.select_one('.entry-content')
+    if content:
+        paragraphs = content.find_all('p', recursive=False)
+        for p in paragraphs:
+            if p.text.strip():
+                intro = clean_text(p.text)
+                break
+
+    # 見出し
+    headings = []
+    if content:
+        for h in content.find_all(['h2', 'h3', 'h4']):
+            heading_text = clean_text(h.get_text())
+            if heading_text:
+                headings.append(f"{h.name}: {heading_text}")
+    headings_str = "\n".join(headings)
+
+    # 書籍情報の抽出
+    book_title = ""
+    book_author = ""
+    book_isbn = ""
+    book_asin = ""
+    
+    if content:
+        # 書籍のタイトルと著者を探す
+        for elem in content.select('strong, b, h2, h3'):
+            text = clean_text(elem.get_text())
+            # 「著」「著者」で分割を試みる
+            for separator in ['著者：', '著：', '著者:', '著:', ' 著 ', '著']:
+                if separator in text:
+                    parts = text.split(separator)
+                    if len(parts) >= 2:
+                        book_title = parts[0].strip()
+                        book_author = parts[1].strip()
+                        break
+            if book_title and book_author:
+                break
+        
+        # ISBN-13とISBN-10を探す
+        text_content = content.get_text()
+        isbn_patterns = [
+            r'ISBN[-]?13?\s*[:：]?\s*(978[-]?\d{10})',
+            r'ISBN[-]?10?\s*[:：]?\s*(\d{10})',
+            r'ISBN\s*[:：]?\s*(\d{13})',
+            r'978[-]?\d{10}',  # ISBN-13（プレフィックスのみ）
+            r'\d{9}[0-9X]'     # ISBN-10
+        ]
+        
+        for pattern in isbn_patterns:
+            match = re.search(pattern, text_content)
+            if match:
+                book_isbn = match.group(1 if '(' in pattern else 0).replace('-', '')
+                break
+
+        # ASINを探す（Amazonのリンクからも抽出）
+        asin_patterns = [
+            r'ASIN\s*[:：]?\s*([A-Z0-9]{10})',
+            r'amazon[.]co[.]jp/[^/]+/([A-Z0-9]{10})',
+            r'amazon[.]co[.]jp/dp/([A-Z0-9]{10})'
+        ]
+        
+        for pattern in asin_patterns:
+            match = re.search(pattern, text_content)
+            if match:
+                book_asin = match.group(1)
+                break
+
+    # 文章の長さを概算
+    word_count = len(''.join(content.stripped_strings)) if content else 0
+
+    # 内部リンクと解析
+    internal_links = []
+    broken_links = []
+    if content:
+        for link in content.find_all('a', href=True):
+            href = link.get('href', '')
+            if href:
+                try:
+                    absolute_url = normalize_url(urljoin(url, href))
+                    if 'set-ten.com' in absolute_url:
+                        title = clean_text(link.get_text())
+                        internal_links.append({
+                            'url': absolute_url,
+                            'title': title or '（リンクテキストなし）',
+                            'text': title or '（リンクテキストなし）'
+                        })
+                except Exception:
+                    broken_links.append(href)
+
+    # 頻出語の取得
+    frequent_words = []
+    if content:
+        # テキストの前処理
+        text = content.get_text()
+        # 単語の抽出（改行で区切って2文字以上の単語を抽出）
+        words = []
+        for line in text.split('\n'):
+            # 不要な記号を除去
+            line = re.sub(r'[「」『』（）\(\)［］\[\]{}｛｝〈〉《》【】・、。,.]', ' ', line)
+            # 単語に分割
+            for word in line.split():
+                if len(word) >= 2:  # 2文字以上の単語のみ
+                    words.append(word)
+        # 単語数をカウント
+        word_count = len(words)
+        # 頻出語の抽出（上位15個）
+        word_counter = Counter(words)
+        frequent_words = [word for word, _ in word_counter.most_common(15)]
+    
+    frequent_words_str = ", ".join(frequent_words)
+
+    article_info = {
+        'title': title,
+        'url': url,
+        'post_date': date,
+        'updated_date': updated_date,
+        'category_path': category_path,
+        'tags': tags_str,
+        'content_intro': intro,
+        'headings': headings_str,
+        'book_title': book_title,
+        'book_author': book_author,
+        'book_isbn': book_isbn,
+        'book_asin': book_asin,
+        'word_count': word_count,
+        'internal_links': internal_links,
+        'frequent_words': frequent_words_str,
+        'broken_links': broken_links
+    }
+    
+    return article_info
+
+
+def legacy_extended_fields(soup):
+    """拡張版クローラーの外部リンク・見出し構造の抽出処理（抽出プラグインとの比較用）
+
+    プラグインは他のフィールドと同じく最初の .entry-content だけを対象とするため、
+    本文の要素が複数あるページでは結果が異なる。
+    """
+    headings = [
+        {'level': h.name, 'text': clean_text(h.get_text())}
+        for h in soup.select(".entry-content h2, .entry-content h3")
+    ]
+    external_links = []
+    for a in soup.select(".entry-content a[href^='http']"):
+        href = a.get('href')
+        if href and not href.startswith("https://set-ten.com/") and "set-ten.com" not in href:
+            external_links.append({'url': href, 'text': clean_text(a.get_text()) or href})
+    return {'external_links': external_links, 'heading_outline': headings}
+
+
+def _time_per_article(extractor, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for soup, url in pages:
+            extractor(soup, url)
+    return (time.perf_counter() - start) / (repeat * len(pages)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記事抽出のマイクロベンチマーク")
+    parser.add_argument("files", nargs="+", help="HTMLファイル")
+    parser.add_argument("-r", "--repeat", type=int, default=50, help="繰り返し回数（デフォルト: 50）")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=DEFAULT_BACKEND, help="HTMLパーサー")
+    parser.add_argument(
+        "--url", default="https://set-ten.com/programming/python/12345/",
+        help="抽出時に使う記事URL（相対リンクの解決に使用）"
+    )
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            pages.append((make_soup(f.read(), args.parser), args.url))
+
+    mismatches = 0
+    for path, (soup, url) in zip(args.files, pages):
+        expected = {**legacy_extract_article_info(soup, url), **legacy_extended_fields(soup)}
+        actual = extract_article(soup, url)
+        diff = sorted(k for k in expected if k not in CHANGED_FIELDS and expected[k] != actual.get(k))
+        if diff or expected.keys() != actual.keys():
+            mismatches += 1
+            print(f"不一致: {path}: {', '.join(diff) or 'キー'}")
+
+    before = _time_per_article(legacy_extract_article_info, pages, args.repeat)
+    after = _time_per_article(lambda soup, url: extract_article(soup, url, extractors=()), pages, args.repeat)
+    with_plugins = _time_per_article(extract_article, pages, args.repeat)
+    print(f"{len(pages)}ページ × {args.repeat}回（不一致: {mismatches}件）")
+    print(f"従来の抽出処理  {before:8.3f} ms/記事")
+    print(f"単一走査        {after:8.3f} ms/記事（{before / after:.1f}倍）")
+    print(f"  + プラグイン  {with_plugins:8.3f} ms/記事（{', '.join(DEFAULT_EXTRACTORS)}）")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+書籍識別子（ISBN / ASIN）の検出
+1つの正規表現でテキストを1回だけ走査し、チェックディジットを検証したうえで
+ISBN は13桁に正規化して返します
+
+- ISBN-13 は 978 / 979 で始まりチェックディジットが正しいものだけを採用する
+- ISBN-10 は電話番号などの10桁の数字と区別するため、「ISBN」の表記が前にあるものだけを採用する
+- ASIN は「ASIN:」の表記か Amazon の商品URLから取り出す。
+  書籍のASINはISBN-10と同じ値なので、有効なISBN-10であればISBN-13も合わせて返す
+"""
+
+import re
+
+_SEP = r'[-‐－]?'  # ISBNの区切り（半角・全角ハイフン）
+
+IDENTIFIER_PATTERN = re.compile(
+    # ASIN: B0XXXXXXXX
+    r'(?i:ASIN)\s*[:：]?\s*(?P<asin>[A-Z0-9]{10})(?![A-Za-z0-9])'
+    # https://www.amazon.co.jp/書名/dp/XXXXXXXXXX, /gp/product/XXXXXXXXXX など
+    r'|amazon\.(?:co\.jp|com)/(?:[^\s/"\'<>]+/)*?(?:dp|product|ASIN)/(?P<url_asin>[A-Z0-9]{10})(?![A-Za-z0-9])'
+    # ISBN-13 / ISBN-10（「ISBN」「ISBN-13:」などの表記は任意）
+    r'|(?P<isbn_label>(?i:ISBN)(?:-?1[03])?\s*[:：]?\s*)?'
+    r'(?<![\d\-‐－])'
+    rf'(?P<isbn>97[89](?:{_SEP}\d){{10}}|\d(?:{_SEP}\d){{8}}{_SEP}[\dXx])'
+    r'(?![\-‐－]?[\dXx])'
+)
+
+_NON_ISBN_CHARS = re.compile(r'[^\dXx]')
+
+
+def is_valid_isbn10(isbn):
+    """ISBN-10（区切りなし）のチェックディジットを検証する"""
+    if len(isbn) != 10 or not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] in 'Xx'):
+        return False
+    total = sum((10 - i) * int(d) for i, d in enumerate(isbn[:9]))
+    total += 10 if isbn[9] in 'Xx' else int(isbn[9])
+    return total % 11 == 0
+
+
+def is_valid_isbn13(isbn):
+    """ISBN-13（区切りなし）のチェックディジットを検証する"""
+    if len(isbn) != 13 or not isbn.isdigit() or not isbn.startswith(('978', '979')):
+        return False
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(isbn))
+    return total % 10 == 0
+
+
+def isbn10_to_isbn13(isbn):
+    """ISBN-10 を 978 で始まる ISBN-13 に変換する"""
+    body = '978' + isbn[:9]
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+    return body + str(check)
+
+
+def normalize_isbn(value):
+    """ISBN（区切りあり・10桁も可）を検証して13桁に正規化する
+
+    Returns:
+        str: 13桁のISBN。有効なISBNでなければ None
+    """
+    if not value:
+        return None
+    isbn = _NON_ISBN_CHARS.sub('', value)
+    if is_valid_isbn13(isbn):
+        return isbn
+    if is_valid_isbn10(isbn):
+        return isbn10_to_isbn13(isbn)
+    return None
+
+
+def _is_valid_asin(asin):
+    # 書籍以外のASINは B で始まる。書籍のASINはISBN-10と同じ
+    return asin.startswith('B') or is_valid_isbn10(asin)
+
+
+def scan_identifiers(text):
+    """テキストに含まれるISBNとASINをすべて取り出す
+
+    Args:
+        text (str): 記事本文やURLなどのテキスト
+
+    Returns:
+        dict: 'isbn'（13桁に正規化したISBN）と 'asin' のリスト。いずれも出現順で重複なし
+    """
+    isbns = {}
+    asins = {}
+    if not text:
+        return {'isbn': [], 'asin': []}
+
+    for match in IDENTIFIER_PATTERN.finditer(text):
+        asin = match.group('asin') or match.group('url_asin')
+        if asin:
+            if _is_valid_asin(asin):
+                asins[asin] = None
+                if is_valid_isbn10(asin):
+                    isbns[isbn10_to_isbn13(asin)] = None
+            continue
+
+        isbn = _NON_ISBN_CHARS.sub('', match.group('isbn'))
+        if len(isbn) == 10 and not match.group('isbn_label'):
+            continue
+        normalized = normalize_isbn(isbn)
+        if normalized:
+            isbns[normalized] = None
+
+    return {'isbn': list(isbns), 'asin': list(asins)}
@@ -7,23 +7,40 @@ set-ten.comのウェブスクレイピングスクリプト
 """
 
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup, Tag
-import csv
 import time
-import re
 import os
 import json
-import sqlite3
-from urllib.parse import urljoin, urlparse, unquote
+import hashlib
+from collections import Counter, namedtuple
+from urllib.parse import urljoin, urlparse
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 from aiohttp import ClientTimeout
 import logging
-from tqdm import tqdm
+import argparse
 import aiosqlite
 import pytz
 
+from sitemap_parser import SITEMAP_MAX_SIZE, SITEMAP_PATHS, parse_sitemap, is_newer
+from crawl_state import CrawlState
+from article_sinks import SINK_BATCH_SIZE, ArticleSinks, CsvSink, DbSink
+from article_upsert import upsert_rows_async
+from article_search import FTS_EXISTS_SQL, FTS_SCHEMA_SQL, FTS_TABLE, REBUILD_SQL
+from article_relations import RELATIONS_EXISTS_SQL, RELATIONS_SCHEMA_SQL, save_relations_async
+from article_history import HISTORY_SCHEMA_SQL, record_versions_async
+from sqlite_profile import apply_profile_async
+import article_extractor
+from article_extractor import EXTRACTOR_VERSION, clean_text, extract_article, normalize_url
+from text_tokenizer import get_tagger
+from link_harvester import LinkHarvester
+from politeness import PolitenessScheduler
+from html_parser_backend import DEFAULT_BACKEND, PARSER_BACKENDS, make_soup
+from http_transport import (
+    HTML_CONTENT_TYPES, MAX_BODY_SIZE, MAX_RETRIES, RETRY_EXCEPTIONS, RETRY_STATUSES,
+    RequestTimings, create_session, read_body, rejection_reason, retry_delay,
+)
+from url_rules import ARTICLE, classify, is_skipped
+
 # 基本設定
 BASE_URL = "https://set-ten.com/"
 OUTPUT_FILE = f"setten_articles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -31,24 +48,142 @@ DB_FILE = "setten_articles.db"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
 }
-REQUEST_DELAY = 1  # サーバーに負荷をかけないよう1秒間の間隔を設ける
-MAX_PAGES = 60    # 予想される記事数に基づいて制限
-MAX_CONCURRENT_REQUESTS = 3  # 同時リクエスト数を制限
-TIMEOUT = ClientTimeout(total=30)
+REQUEST_DELAY = 1  # 同一ホストへの開始時のリクエスト間隔（秒）。以降は応答を見て調整する
+INITIAL_RATE = 1 / REQUEST_DELAY  # 同一ホストへの開始時のリクエストレート（件/秒）
+MAX_RATE = 10.0  # 同一ホストへのリクエストレートの上限（件/秒。robots.txt の Crawl-delay が優先）
+MAX_PAGES = 3000  # 1回のクロールで取得するページ数の上限
+MAX_CONCURRENT_REQUESTS = 8  # 同一ホストへの同時リクエスト数の上限（クロールワーカー数）
+PARSE_WORKERS = os.cpu_count() or 1  # HTML解析を行うプロセス数
+PARSE_QUEUE_SIZE = 20  # 解析待ちページ数の上限（超えると取得を待機させる）
+CHECKPOINT_INTERVAL = 30  # クロール状態を保存する間隔（秒）
+TIMEOUT = ClientTimeout(total=30, sock_connect=10)
 
 # タイムゾーン設定
 JST = pytz.timezone('Asia/Tokyo')
 
+# HTTPレスポンスの取得結果（304の場合 body は None）
+FetchResult = namedtuple('FetchResult', ['status', 'body', 'etag', 'last_modified', 'charset'])
+
+# 記事を保存するテーブル
+ARTICLES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        url TEXT UNIQUE NOT NULL,
+        post_date TEXT,
+        updated_date TEXT,
+        category_path TEXT,
+        tags TEXT,
+        content_intro TEXT,
+        headings TEXT,
+        book_title TEXT,
+        book_author TEXT,
+        book_isbn TEXT,
+        book_asin TEXT,
+        word_count INTEGER,
+        internal_links TEXT,
+        frequent_words TEXT,
+        broken_links TEXT,
+        crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        external_links TEXT,
+        heading_outline TEXT
+    )
+"""
+
+# ビューアーへの同期（migrate_articles.py）が前回の続きから (crawled_at, id) の順に読むための索引
+CRAWLED_AT_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_articles_crawled_at ON articles (crawled_at, id)"
+
+# 古いスキーマ（拡張版クローラーで作成したものを含む）の articles に不足しうるカラム
+ARTICLE_EXTRA_COLUMNS = {
+    'category_path': 'TEXT',
+    'internal_links': 'TEXT',
+    'external_links': 'TEXT',
+    'heading_outline': 'TEXT',
+}
+
+# articlesテーブルに書き込むカラム
+ARTICLE_COLUMNS = [
+    'title', 'url', 'post_date', 'category_path', 'content_intro',
+    'crawled_at', 'updated_date', 'tags', 'headings', 'book_title',
+    'book_author', 'book_isbn', 'book_asin', 'word_count',
+    'internal_links', 'frequent_words', 'broken_links',
+    'external_links', 'heading_outline'
+]
+
+# 条件付きリクエスト用の検証子（ETag / Last-Modified）を保存するテーブル
+VALIDATORS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS http_validators (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        modified_time TEXT,
+        sitemap_lastmod TEXT,
+        content_hash TEXT,
+        outlinks TEXT,
+        last_seen_at TIMESTAMP
+    )
+"""
+
+# 古いスキーマの http_validators に後から追加したカラム
+VALIDATOR_EXTRA_COLUMNS = {
+    'sitemap_lastmod': 'TEXT',
+    'content_hash': 'TEXT',
+    'outlinks': 'TEXT',
+}
+
+# 内容の指紋に含めるhead内のmetaタグ（property / name）
+FINGERPRINT_META_PREFIXES = ('article:', 'og:title', 'og:description')
+# 内容の指紋に含める本文外の要素（タイトル・カテゴリ・タグ）
+FINGERPRINT_SELECTORS = 'h1.entry-title, .post-categories, .cat-links, .entry-category, .tags-links, .entry-tags, .post-tags, [rel="tag"]'
+# 内容の指紋の先頭に付ける抽出処理の版
+FINGERPRINT_PREFIX = f"v{EXTRACTOR_VERSION}:"
+
 # グローバル変数
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+# ホストごとのレート・同時リクエスト数の制御（robots.txt の Crawl-delay に従い、応答を見て調整する）
+# asyncio の待機はイベントループに結び付くため、クロールごとに作り直す（get_scheduler を参照）
+scheduler = None
 visited_urls = set()
-articles_data = []
+# ページ内リンクの正規化（LRUキャッシュ付き）。画像・フィードなど取得しないURLはここで捨てる
+link_harvester = LinkHarvester(urlparse(BASE_URL).hostname, skip=is_skipped)
+fetch_counts = Counter()  # URLごとのHTTP取得回数（重複取得の検出用。再試行は含めない）
+retry_counts = Counter()  # URLごとの再試行の回数
+rejected_responses = Counter()  # 本文を読まなかった応答の理由ごとの件数（content_type / too_large）
+request_timings = RequestTimings()  # リクエストごとの所要時間
+http_validators = {}  # URL -> 前回クロール時の (etag, last_modified)
+content_hashes = {}  # URL -> 前回クロール時の内容の指紋
+article_outlinks = {}  # URL -> 前回クロール時のページ内リンク（正規化済みURLのリストのJSON）
+# URL -> 今回取得した (etag, last_modified, modified_time, sitemap_lastmod, content_hash, outlinks)
+updated_validators = {}
+unchanged_urls = []  # 取得したが内容の指紋が前回と同じだった記事URL
+sitemap_lastmods = {}  # URL -> サイトマップに記載された lastmod
+crawl_state = CrawlState()  # 中断からの再開用のチェックポイント
+not_modified_urls = []  # 304 Not Modified が返された記事URL
 
-def clean_text(text):
-    """テキストのクリーニング"""
-    if text:
-        return ' '.join(text.strip().split())
-    return ''
+def configure_site(base_url):
+    """クロール対象のサイトを切り替える（合成サイトなどのローカルサーバーに対して実行する場合）"""
+    global BASE_URL, link_harvester
+    BASE_URL = base_url if base_url.endswith('/') else base_url + '/'
+    link_harvester = LinkHarvester(urlparse(BASE_URL).hostname, skip=is_skipped)
+    article_extractor.configure_site(BASE_URL)
+
+def get_scheduler():
+    """実行中のクロールのスケジューラーを返す（なければ INITIAL_RATE と MAX_RATE で作る）
+
+    サイトマップの探索からクロールの終了までは同じスケジューラーを使い、
+    robots.txt の読み込みと調整したレートを引き継ぐ。crawl() の終了時に破棄する。
+    """
+    global scheduler
+    if scheduler is None:
+        scheduler = PolitenessScheduler(
+            HEADERS['User-Agent'], initial_rate=min(INITIAL_RATE, MAX_RATE), max_rate=MAX_RATE,
+            max_concurrency=MAX_CONCURRENT_REQUESTS
+        )
+    return scheduler
+
+def init_parse_worker(base_url):
+    """解析ワーカープロセスの初期化（対象サイトの設定と Tagger の生成）"""
+    article_extractor.configure_site(base_url)
+    get_tagger()
 
 def is_valid_url(url):
     """URLの妥当性チェック"""
@@ -59,458 +194,753 @@ def is_valid_url(url):
         return False
 
 def is_article_page(url):
-    """記事ページかどうかの判定"""
-    if not url:
-        return False
-        
-    parsed_url = urlparse(url)
-    path = parsed_url.path.strip('/')
-    path_parts = path.split('/')
-
-    # 以下のパターンを除外
-    exclude_patterns = {
-        'privacy-policy', 'profile', 'contact', 
-        'page', 'author', 'category', 'tag', 'date',
-        'feed', 'wp-content', 'wp-admin', 'wp-includes',
-        'comments', 'trackback', 'login', 'register',
-        'admin', 'search', 'archive'
-    }
-    
-    for part in path_parts:
-        if part in exclude_patterns:
-            return False
-            
-    # セッテンの記事URLは通常3階層（例: set-ten.com/programming/python/12345/）
-    if len(path_parts) < 3:
-        return False
-        
-    # 最後のパスが数字を含むことを確認（記事IDを含む）
-    last_part = path_parts[-1]
-    has_number = any(char.isdigit() for char in last_part)
-    
-    return has_number and not any(pattern in url for pattern in exclude_patterns)
-
-def normalize_url(url):
-    """URLを正規化する"""
-    # URLの正規化（末尾のスラッシュを統一、クエリパラメータを削除など）
-    parsed = urlparse(url)
-    path = parsed.path.rstrip('/')
-    return f"{parsed.scheme}://{parsed.netloc}{path}"
-
-async def fetch_page(session, url):
-    """非同期でページを取得"""
-    async with semaphore:
-        try:
-            async with session.get(url, headers=HEADERS, timeout=TIMEOUT) as response:
-                if response.status == 200:
-                    return await response.text()
-                logging.warning(f"Failed to fetch {url}: Status {response.status}")
+    """記事ページかどうかの判定（url_rules の分類が article のもの）"""
+    return classify(url) == ARTICLE
+
+async def fetch_page(session, url, validator=None, content_types=HTML_CONTENT_TYPES, max_size=MAX_BODY_SIZE):
+    """非同期でページを取得
+
+    validator に前回の (etag, last_modified) を渡すと条件付きリクエストを送信し、
+    変更がなければ status=304 の FetchResult を返す。
+    429 / 5xx とタイムアウト・接続エラーは指数バックオフ（Retry-After があればそれに従う）で
+    MAX_RETRIES 回まで再試行する。User-Agent とタイムアウトはセッションの既定値を使う。
+    Content-Type が content_types にない応答や max_size を超える本文は読まずに None を返す。
+    """
+    headers = {}
+    if validator:
+        etag, last_modified = validator
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        async with get_scheduler().request(url) as slot:
+            if attempt == 0:
+                fetch_counts[url] += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    slot.status = response.status
+                    if response.status in (200, 304):
+                        body = None
+                        if response.status == 200:
+                            reason = rejection_reason(response, content_types, max_size)
+                            body = await read_body(response, max_size) if reason is None else None
+                            if body is None:
+                                # 読み残した本文を受け取らないよう接続を閉じる
+                                reason = reason or 'too_large'
+                                rejected_responses[reason] += 1
+                                logging.info(f"本文を読まずにスキップ: {url}（{reason}）")
+                                response.close()
+                                return None
+                        return FetchResult(
+                            response.status, body,
+                            response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                            response.charset
+                        )
+                    if response.status not in RETRY_STATUSES:
+                        logging.warning(f"Failed to fetch {url}: Status {response.status}")
+                        return None
+                    retry_after = response.headers.get('Retry-After')
+                    error = f"Status {response.status}"
+            except RETRY_EXCEPTIONS as e:
+                slot.failed = True
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                slot.failed = True
+                logging.error(f"Error fetching {url}: {str(e)}")
                 return None
-        except Exception as e:
-            logging.error(f"Error fetching {url}: {str(e)}")
+
+        delay = retry_delay(attempt, retry_after)
+        if delay is None:
+            logging.warning(f"Failed to fetch {url}: {error}（{attempt + 1}回試行）")
             return None
+        if retry_after is not None:
+            # Retry-After はホスト全体への指示なので、他のワーカーのリクエストも待たせる
+            get_scheduler().defer(url, delay)
+        retry_counts[url] += 1
+        logging.info(f"{delay:.1f}秒後に再試行します: {url}（{error}）")
+        await asyncio.sleep(delay)
 
-async def extract_article_info_async(session, url):
-    """非同期で記事情報を抽出"""
-    html = await fetch_page(session, url)
-    if not html:
-        return None
-        
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # タイトル
-    title_elem = soup.select_one('h1.entry-title')
-    title = clean_text(title_elem.get_text()) if title_elem else ""
-    
-    # 投稿日
-    date_meta = soup.select_one("meta[property='article:published_time']")
-    date = ""
-    if date_meta:
-        content = date_meta.get("content", "")
-        if content and isinstance(content, str):
-            date = content.split("T")[0]
-    
-    # 更新日
-    updated_meta = soup.select_one("meta[property='article:modified_time']")
-    updated_date = ""
-    if updated_meta:
-        content = updated_meta.get("content", "")
-        if content and isinstance(content, str):
-            updated_date = content.split("T")[0]
-    
-    # カテゴリー（階層構造を考慮）
-    category_path = ""
-    try:
-        # カテゴリの抽出方法を改善
-        cat_selectors = [
-            ".post-categories a",  # WordPress標準
-            ".cat-links a",       # テーマ固有
-            ".entry-category a",   # テーマ固有
-            ".article-category a", # カスタム
-            ".category a",        # 一般的
-            ".breadcrumb a"       # パンくずリスト
-        ]
-        
-        # 除外するカテゴリ
-        exclude_categories = {'home', 'トップ', 'ホーム', 'index', '一覧'}
-        
-        category_list = []
-        for selector in cat_selectors:
-            cat_elems = soup.select(selector)
-            for cat in cat_elems:
-                if isinstance(cat, Tag) and cat.string:
-                    cat_text = clean_text(cat.string)
-                    if cat_text and cat_text.lower() not in exclude_categories:
-                        if cat_text not in category_list:
-                            category_list.append(cat_text)
-                            
-        if not category_list:  # バックアップ: URLからカテゴリを推測
-            path_parts = urlparse(url).path.strip('/').split('/')
-            if len(path_parts) >= 2:  # 最低2階層のパスがある場合
-                # URLデコードとクリーニング
-                from urllib.parse import unquote
-                for part in path_parts[:-1]:  # 最後のパス（記事ID）を除外
-                    cat = clean_text(unquote(part).replace('-', ' '))
-                    if cat and cat.lower() not in exclude_categories:
-                        category_list.append(cat)
-        
-        # カテゴリパスの生成
-        if category_list:
-            category_path = " > ".join(category_list)
-    except Exception as e:
-        logging.warning(f"カテゴリの抽出でエラー: {str(e)}")
+def extract_article_info(soup, url):
+    """解析済みのページから記事情報を抽出"""
+    return extract_article(soup, url)
 
-    # タグ（重複を排除して正規化）
-    tags = set()
-    try:
-        # タグ抽出のセレクタを強化
-        tag_selectors = [
-            ".tags-links a",      # WordPress標準
-            ".tag-links a",       # テーマ固有
-            ".entry-tags a",      # テーマ固有
-            ".post-tags a",       # 一般的
-            ".article-tags a",    # カスタム
-            ".tags a",           # シンプルな形式
-            "[rel='tag']",       # HTMLのタグ関連属性
-            ".meta-tags a",      # メタ情報領域のタグ
-            ".tag"              # 単純なタグクラス
-        ]
-        
-        for selector in tag_selectors:
-            for tag in soup.select(selector):
-                if isinstance(tag, Tag):
-                    # href属性からタグを抽出する場合
-                    href = tag.get('href', '')
-                    if isinstance(href, str) and href:
-                        try:
-                            # URLからタグ名を抽出（最後のパス部分を使用）
-                            path_parts = [p for p in href.split('/') if p]
-                            if path_parts:
-                                tag_from_url = clean_text(unquote(path_parts[-1]).replace('-', ' '))
-                                if tag_from_url:
-                                    tags.add(tag_from_url)
-                        except Exception as e:
-                            logging.debug(f"タグURLの解析でエラー: {str(e)}")
-                    
-                    # タグのテキストを抽出
-                    tag_text = tag.get_text(strip=True)
-                    if tag_text:
-                        try:
-                            # テキストの正規化
-                            cleaned_tag = clean_text(tag_text)
-                            if cleaned_tag:
-                                tags.add(cleaned_tag)
-                        except Exception as e:
-                            logging.debug(f"タグテキストの処理でエラー: {str(e)}")
-                            
-    except Exception as e:
-        logging.warning(f"タグの抽出でエラー: {str(e)}")
+def content_fingerprint(soup):
+    """正規化した本文とhead内のメタデータから記事内容の指紋を計算する
+
+    空白の違いだけの変更では値が変わらないよう、テキストは空白を畳んでから使う。
+    先頭に抽出処理の版（FINGERPRINT_PREFIX）を付け、抽出処理が変わったら前回の指紋と一致しないようにする。
+    """
+    parts = []
+
+    title = soup.find('title')
+    if title:
+        parts.append(clean_text(title.get_text()))
 
-    tags_str = ','.join(sorted(tags)) if tags else ""
+    meta_values = []
+    for meta in soup.find_all('meta'):
+        key = meta.get('property') or meta.get('name') or ''
+        if isinstance(key, str) and key.startswith(FINGERPRINT_META_PREFIXES):
+            meta_values.append(f"{key}={meta.get('content', '')}")
+    parts.extend(sorted(meta_values))
+
+    for elem in soup.select(FINGERPRINT_SELECTORS):
+        parts.append(clean_text(elem.get_text(' ')))
+        if elem.name == 'a':
+            parts.append(elem.get('href', ''))
 
-    # 本文冒頭
-    intro = ""
     content = soup.select_one('.entry-content')
     if content:
-        paragraphs = content.find_all('p', recursive=False)
-        for p in paragraphs:
-            if p.text.strip():
-                intro = clean_text(p.text)
-                break
-
-    # 見出し
-    headings = []
-    if content:
-        for h in content.find_all(['h2', 'h3', 'h4']):
-            heading_text = clean_text(h.get_text())
-            if heading_text:
-                headings.append(f"{h.name}: {heading_text}")
-    headings_str = "\n".join(headings)
-
-    # 書籍情報の抽出
-    book_title = ""
-    book_author = ""
-    book_isbn = ""
-    book_asin = ""
-    
-    if content:
-        # 書籍のタイトルと著者を探す
-        for elem in content.select('strong, b, h2, h3'):
-            text = clean_text(elem.get_text())
-            # 「著」「著者」で分割を試みる
-            for separator in ['著者：', '著：', '著者:', '著:', ' 著 ', '著']:
-                if separator in text:
-                    parts = text.split(separator)
-                    if len(parts) >= 2:
-                        book_title = parts[0].strip()
-                        book_author = parts[1].strip()
-                        break
-            if book_title and book_author:
-                break
-        
-        # ISBN-13とISBN-10を探す
-        text_content = content.get_text()
-        isbn_patterns = [
-            r'ISBN[-]?13?\s*[:：]?\s*(978[-]?\d{10})',
-            r'ISBN[-]?10?\s*[:：]?\s*(\d{10})',
-            r'ISBN\s*[:：]?\s*(\d{13})',
-            r'978[-]?\d{10}',  # ISBN-13（プレフィックスのみ）
-            r'\d{9}[0-9X]'     # ISBN-10
-        ]
-        
-        for pattern in isbn_patterns:
-            match = re.search(pattern, text_content)
-            if match:
-                book_isbn = match.group(1 if '(' in pattern else 0).replace('-', '')
-                break
-
-        # ASINを探す（Amazonのリンクからも抽出）
-        asin_patterns = [
-            r'ASIN\s*[:：]?\s*([A-Z0-9]{10})',
-            r'amazon[.]co[.]jp/[^/]+/([A-Z0-9]{10})',
-            r'amazon[.]co[.]jp/dp/([A-Z0-9]{10})'
-        ]
-        
-        for pattern in asin_patterns:
-            match = re.search(pattern, text_content)
-            if match:
-                book_asin = match.group(1)
-                break
-
-    # 文章の長さを概算
-    word_count = len(''.join(content.stripped_strings)) if content else 0
-
-    # 内部リンクと解析
-    internal_links = []
-    broken_links = []
-    if content:
-        for link in content.find_all('a', href=True):
-            href = link.get('href', '')
-            if href:
-                try:
-                    absolute_url = normalize_url(urljoin(url, href))
-                    if 'set-ten.com' in absolute_url:
-                        title = clean_text(link.get_text())
-                        internal_links.append({
-                            'url': absolute_url,
-                            'title': title or '（リンクテキストなし）',
-                            'text': title or '（リンクテキストなし）'
-                        })
-                except Exception as e:
-                    broken_links.append(href)
-
-    # 頻出語の取得
-    frequent_words = []
-    if content:
-        # テキストの前処理
-        text = content.get_text()
-        # 単語の抽出（改行で区切って2文字以上の単語を抽出）
-        words = []
-        for line in text.split('\n'):
-            # 不要な記号を除去
-            line = re.sub(r'[「」『』（）\(\)［］\[\]{}｛｝〈〉《》【】・、。,.]', ' ', line)
-            # 単語に分割
-            for word in line.split():
-                if len(word) >= 2:  # 2文字以上の単語のみ
-                    words.append(word)
-        # 単語数をカウント
-        word_count = len(words)
-        # 頻出語の抽出（上位15個）
-        from collections import Counter
-        word_counter = Counter(words)
-        frequent_words = [word for word, _ in word_counter.most_common(15)]
-    
-    frequent_words_str = ", ".join(frequent_words)
-
-    article_info = {
-        'title': title,
-        'url': url,
-        'post_date': date,
-        'updated_date': updated_date,
-        'category_path': category_path,
-        'tags': tags_str,
-        'content_intro': intro,
-        'headings': headings_str,
-        'book_title': book_title,
-        'book_author': book_author,
-        'book_isbn': book_isbn,
-        'book_asin': book_asin,
-        'word_count': word_count,
-        'internal_links': internal_links,
-        'frequent_words': frequent_words_str,
-        'broken_links': broken_links
-    }
-    
-    return article_info
+        parts.append(clean_text(content.get_text(' ')))
+        # リンク先だけが変わった場合も検出する
+        parts.extend(a.get('href', '') for a in content.find_all('a', href=True))
 
-async def crawl_page(session, url, page_count):
-    """ページをクロールして記事情報を収集"""
-    global visited_urls, articles_data
-    
-    normalized_url = normalize_url(url)
-    if normalized_url in visited_urls:
-        return
-    
-    logging.info(f"処理中: {normalized_url}")
-    visited_urls.add(normalized_url)
-    
-    if page_count >= MAX_PAGES:
-        logging.warning(f"最大ページ数（{MAX_PAGES}）に到達しました")
-        return
-        
-    html = await fetch_page(session, normalized_url)
-    if not html:
-        return
-    
-    soup = BeautifulSoup(html, 'html.parser')
+    return FINGERPRINT_PREFIX + hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+def parse_page(url, body, known_hash=None, charset=None, backend=DEFAULT_BACKEND):
+    """取得したページを解析し、記事情報・ページ内のリンク・内容の指紋を返す
+
+    ProcessPoolExecutor のワーカープロセスで実行されるため、
+    戻り値はピクル化可能な dict と list のみとする。リンクはページ内で重複を除いた href のまま返す。
+    内容の指紋が known_hash と一致した記事は抽出を省略し、記事情報を None とする。
+    最後の要素は解析と抽出にかかった秒数。
+    """
+    start = time.perf_counter()
+    soup = make_soup(body, backend, charset)
     
     # 記事ページの場合は情報を抽出
-    if is_article_page(normalized_url):
-        article_info = await extract_article_info_async(session, normalized_url)
-        if article_info and article_info['title'] and article_info['post_date']:
-            logging.info(f"記事を発見: {article_info['title']}")
-            articles_data.append(article_info)
-        else:
-            logging.warning(f"記事情報の抽出に失敗: {normalized_url}")
+    article_info = None
+    fingerprint = None
+    if is_article_page(url):
+        fingerprint = content_fingerprint(soup)
+        if fingerprint != known_hash:
+            article_info = extract_article_info(soup, url)
     
-    # 次のページと記事へのリンクを収集
-    for link in soup.find_all('a', href=True):
-        href = link.get('href', '').strip()
-        if not href or href.startswith('#'):
-            continue
-            
+    # 次のページと記事へのリンクを収集（正規化と訪問済みの判定は親プロセスの LinkHarvester で行う）
+    hrefs = list(dict.fromkeys(link.get('href', '').strip() for link in soup.find_all('a', href=True)))
+
+    return article_info, hrefs, fingerprint, time.perf_counter() - start
+
+def enqueue_links(url_queue, links):
+    """正規化済みのURLのうち未訪問のものをキューに追加する"""
+    for link in links:
+        if link not in visited_urls:
+            visited_urls.add(link)
+            crawl_state.add_url(link)
+            url_queue.put_nowait(link)
+
+async def fetch_worker(session, url_queue, parse_queue, stats, max_pages, follow_links=True):
+    """URLキューからページを取得して解析キューに渡すワーカー"""
+    while True:
+        url = await url_queue.get()
+        handed_off = False
         try:
-            absolute_url = normalize_url(urljoin(url, href))
-            
-            # 無効なURLまたは外部URLはスキップ
-            if not is_valid_url(absolute_url) or 'set-ten.com' not in absolute_url:
+            # ページ数の上限に達した後はキューを空にするだけ
+            if stats['pages_fetched'] >= max_pages:
                 continue
-                
-            if absolute_url not in visited_urls:
-                await asyncio.sleep(REQUEST_DELAY)
-                await crawl_page(session, absolute_url, page_count + 1)
-                
+            # robots.txt で禁止されたURLは取得しない
+            if not await get_scheduler().allowed(session, url):
+                stats['disallowed'] += 1
+                logging.info(f"robots.txt により除外: {url}")
+                continue
+            stats['pages_fetched'] += 1
+            if stats['pages_fetched'] == max_pages:
+                logging.warning(f"最大ページ数（{max_pages}）に到達しました")
+
+            logging.info(f"処理中: {url}")
+            # 記事ページは前回の検証子で条件付きリクエストを送る
+            # （一覧ページはリンク発見のため常に取得する）
+            validator = http_validators.get(url) if is_article_page(url) else None
+            result = await fetch_page(session, url, validator)
+            if result is None:
+                continue
+            if result.status == 304:
+                # 未変更の記事は解析もDB書き込みも行わない。ページ内リンクは前回保存したものを辿る
+                # （タグの一覧や記事間のリンクなど、記事からしかリンクされていないページを取りこぼさないため）
+                stats['not_modified'] += 1
+                not_modified_urls.append(url)
+                if follow_links:
+                    enqueue_links(url_queue, json.loads(article_outlinks.get(url) or '[]'))
+                continue
+            if result.body:
+                # 解析キューが満杯の間はここで待機する（バックプレッシャー）
+                await parse_queue.put((url, result.body, result.charset, (result.etag, result.last_modified)))
+                handed_off = True
         except Exception as e:
-            logging.error(f"リンク処理エラー {href}: {str(e)}")
+            logging.error(f"クロールエラー {url}: {str(e)}")
+        finally:
+            # 解析キューに渡したURLは解析ワーカー側で完了とする
+            if not handed_off:
+                crawl_state.mark_done(url)
+                url_queue.task_done()
 
-async def save_to_db(articles):
-    """データベースに記事情報を保存"""
-    async with aiosqlite.connect(DB_FILE) as db:
-        # トランザクション開始
-        await db.execute("BEGIN TRANSACTION")
+async def parse_worker(executor, url_queue, parse_queue, sinks, stats, follow_links=True,
+                       backend=DEFAULT_BACKEND):
+    """取得済みページをプロセスプールで解析し、新しいURLをキューに追加するワーカー"""
+    loop = asyncio.get_running_loop()
+    while True:
+        url, body, charset, (etag, last_modified) = await parse_queue.get()
         try:
-            # articlesテーブルを作成
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS articles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    url TEXT UNIQUE NOT NULL,
-                    post_date TEXT,
-                    updated_date TEXT,
-                    category_path TEXT,
-                    tags TEXT,
-                    content_intro TEXT,
-                    headings TEXT,
-                    book_title TEXT,
-                    book_author TEXT,
-                    book_isbn TEXT,
-                    book_asin TEXT,
-                    word_count INTEGER,
-                    internal_links TEXT,
-                    frequent_words TEXT,
-                    broken_links TEXT,
-                    crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 現在の最新のcrawled_at時刻を取得（日本時間）
-            current_crawl_time = datetime.now(JST).isoformat()
-
-            # 新しい記事データを保存
-            for article in articles:
-                await db.execute("""
-                    INSERT OR REPLACE INTO articles (
-                        title, url, post_date, category_path, content_intro,
-                        crawled_at, updated_date, tags, headings, book_title,
-                        book_author, book_isbn, book_asin, word_count,
-                        internal_links, frequent_words, broken_links
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    article['title'], article['url'], article['post_date'],
-                    article.get('category_path', ''), article.get('content_intro', ''),
-                    current_crawl_time, article.get('updated_date', ''),
-                    article.get('tags', ''), article.get('headings', ''),
-                    article.get('book_title', ''), article.get('book_author', ''),
-                    article.get('book_isbn', ''), article.get('book_asin', ''),
-                    article.get('word_count', 0),
-                    json.dumps(article.get('internal_links', []), ensure_ascii=False),
-                    article.get('frequent_words', ''),
-                    json.dumps(article.get('broken_links', []), ensure_ascii=False)
-                ))
-
-            # コミット
-            await db.commit()
-            logging.info(f"{len(articles)}件の記事をデータベースに保存しました")
-            
+            known_hash = content_hashes.get(url)
+            article_info, hrefs, fingerprint, parse_seconds = await loop.run_in_executor(
+                executor, parse_page, url, body, known_hash, charset, backend
+            )
+            stats['pages_parsed'] += 1
+            stats['parse_seconds'] += parse_seconds
+            lastmod = sitemap_lastmods.get(url)
+            # 対象ドメインのリンク（訪問済みも含む）。記事は 304 のときに辿れるよう検証子と一緒に保存する
+            links = link_harvester.harvest(url, hrefs, ())
+            outlinks = json.dumps(links, ensure_ascii=False) if fingerprint is not None else None
+
+            if fingerprint is not None and fingerprint == known_hash:
+                # 内容が前回と同じ記事は抽出もDB書き込みも行わない
+                stats['unchanged'] += 1
+                updated_validators[url] = (etag, last_modified, None, lastmod, fingerprint, outlinks)
+                crawl_state.add_validator(url, updated_validators[url])
+                unchanged_urls.append(url)
+            elif article_info is not None:
+                if article_info['title'] and article_info['post_date']:
+                    logging.info(f"記事を発見: {article_info['title']}")
+                    stats['articles'] += 1
+                    updated_validators[url] = (
+                        etag, last_modified, article_info['updated_date'], lastmod, fingerprint, outlinks
+                    )
+                    crawl_state.add_validator(url, updated_validators[url])
+                    crawl_state.add_article(article_info)
+                    await sinks.write(article_info)
+                else:
+                    logging.warning(f"記事情報の抽出に失敗: {url}")
+
+            if not follow_links:
+                continue
+
+            # 未訪問のURLだけがキューに入る
+            enqueue_links(url_queue, links)
+        except Exception as e:
+            logging.error(f"解析エラー {url}: {str(e)}")
+        finally:
+            crawl_state.mark_done(url)
+            parse_queue.task_done()
+            url_queue.task_done()
+
+async def checkpoint_loop(stats, interval):
+    """一定間隔でクロール状態を保存する"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await crawl_state.checkpoint(stats)
         except Exception as e:
-            await db.execute("ROLLBACK")
-            logging.error(f"Database error: {str(e)}")
-            raise
+            logging.error(f"チェックポイントの保存に失敗: {str(e)}")
+
+async def crawl(session, start_urls, sinks, max_pages=MAX_PAGES, num_workers=MAX_CONCURRENT_REQUESTS,
+                parse_workers=PARSE_WORKERS, parse_queue_size=PARSE_QUEUE_SIZE, follow_links=True,
+                stats=None, checkpoint_interval=CHECKPOINT_INTERVAL, parser_backend=DEFAULT_BACKEND):
+    """取得ワーカーと解析プロセスプールをパイプラインでつないでサイトをクロール
+
+    抽出した記事は sinks に逐次書き出す。
+    follow_links が False の場合は start_urls のみを取得し、ページ内のリンクは辿らない。
+    stats にはチェックポイントから再開する場合の前回までの集計を渡す。
+    parser_backend で HTML の解析に使うパーサー（html.parser / lxml / auto）を指定する。
+    ホストごとのスケジューラーはこのクロールのイベントループで作り、終了時に破棄する。
+    """
+    global scheduler
+    crawl_scheduler = get_scheduler()
+    url_queue = asyncio.Queue()
+    parse_queue = asyncio.Queue(maxsize=parse_queue_size)
+    stats = {
+        'pages_fetched': 0, 'not_modified': 0, 'unchanged': 0, 'articles': 0, 'disallowed': 0,
+        'pages_parsed': 0, 'parse_seconds': 0.0,
+        **(stats or {})
+    }
+
+    # 再開時は訪問済みに含まれる未処理URLもキューに戻す
+    queued = set()
+    for start_url in start_urls:
+        start_url = normalize_url(start_url)
+        if start_url not in queued:
+            queued.add(start_url)
+            if start_url not in visited_urls:
+                visited_urls.add(start_url)
+                crawl_state.add_url(start_url)
+            url_queue.put_nowait(start_url)
+
+    # 形態素解析の Tagger は解析ワーカーの起動時に1回だけ生成する
+    with ProcessPoolExecutor(max_workers=parse_workers, initializer=init_parse_worker,
+                             initargs=(BASE_URL,)) as executor:
+        workers = [
+            asyncio.create_task(fetch_worker(session, url_queue, parse_queue, stats, max_pages, follow_links))
+            for _ in range(num_workers)
+        ]
+        workers += [
+            asyncio.create_task(
+                parse_worker(executor, url_queue, parse_queue, sinks, stats, follow_links, parser_backend)
+            )
+            for _ in range(parse_workers)
+        ]
+        workers.append(asyncio.create_task(checkpoint_loop(stats, checkpoint_interval)))
+        try:
+            await url_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            stats['politeness'] = crawl_scheduler.summary()
+            scheduler = None
+            # 中断された場合もそこまでの進捗を残す
+            await crawl_state.checkpoint(stats)
+
+    return stats
+
+async def discover_sitemap_urls(session, base_url=None):
+    """サイトマップから記事URLと lastmod を収集する
+
+    入れ子のサイトマップインデックスとgzip圧縮されたサイトマップも辿る。
+    """
+    base_url = base_url or BASE_URL
+    for path in SITEMAP_PATHS:
+        pending = [urljoin(base_url, path)]
+        seen_sitemaps = set()
+        articles = {}
+
+        while pending:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            # robots.txt はここで読み込まれ、続くクロールでも同じスケジューラーが使う
+            if not await get_scheduler().allowed(session, sitemap_url):
+                logging.info(f"robots.txt により除外: {sitemap_url}")
+                continue
+
+            result = await fetch_page(session, sitemap_url, content_types=None, max_size=SITEMAP_MAX_SIZE)
+            if result is None or not result.body:
+                continue
+
+            kind, entries = parse_sitemap(result.body)
+            for loc, lastmod in entries:
+                if kind == 'index':
+                    pending.append(loc)
+                    continue
+                url = normalize_url(loc)
+                if is_article_page(url):
+                    articles[url] = lastmod
+
+        if articles:
+            logging.info(f"サイトマップ {path} から{len(articles)}件の記事URLを取得しました")
+            return articles
+
+    logging.warning("サイトマップが見つかりませんでした")
+    return {}
+
+async def load_known_lastmods():
+    """保存済み記事の最終更新日時を読み込む（サイトマップの lastmod を優先）"""
+    if not os.path.exists(DB_FILE):
+        return {}
+
+    known = {}
+    async with aiosqlite.connect(DB_FILE) as db:
+        await apply_profile_async(db, 'crawler')
+        await ensure_validators_table(db)
+        async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'articles'") as cursor:
+            has_articles = await cursor.fetchone() is not None
+        if has_articles:
+            async with db.execute("SELECT url, updated_date FROM articles") as cursor:
+                async for url, updated_date in cursor:
+                    known[url] = updated_date
+        async with db.execute(
+            "SELECT url, sitemap_lastmod FROM http_validators WHERE sitemap_lastmod IS NOT NULL"
+        ) as cursor:
+            async for url, lastmod in cursor:
+                known[url] = lastmod
+    return known
+
+async def ensure_columns(db, table, extra_columns):
+    """古いスキーマのテーブルに不足しているカラムを追加する"""
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        columns = {row[1] async for row in cursor}
+    for column, column_type in extra_columns.items():
+        if column not in columns:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+async def ensure_validators_table(db):
+    """検証子テーブルを作成し、古いスキーマには不足カラムを追加する"""
+    await db.execute(VALIDATORS_TABLE_SQL)
+    await ensure_columns(db, 'http_validators', VALIDATOR_EXTRA_COLUMNS)
+
+async def load_validators():
+    """前回クロール時に保存した検証子・内容の指紋・ページ内リンクを読み込む
+
+    Returns:
+        tuple: (URL -> (etag, last_modified), URL -> content_hash, URL -> outlinks)
+    """
+    validators = {}
+    hashes = {}
+    outlinks = {}
+    if not os.path.exists(DB_FILE):
+        return validators, hashes, outlinks
+
+    async with aiosqlite.connect(DB_FILE) as db:
+        await apply_profile_async(db, 'crawler')
+        await ensure_validators_table(db)
+        await db.commit()
+        async with db.execute(
+            "SELECT url, etag, last_modified, content_hash, outlinks FROM http_validators"
+        ) as cursor:
+            async for url, etag, last_modified, content_hash, links in cursor:
+                if content_hash and not content_hash.startswith(FINGERPRINT_PREFIX):
+                    # 以前の版の抽出処理で保存した記事は、304 を受けずに取得し直して抽出する
+                    continue
+                if links is None:
+                    # ページ内リンクを保存していない記事は、304 ではリンクを辿れないため取得し直す
+                    continue
+                validators[url] = (etag, last_modified)
+                outlinks[url] = links
+                if content_hash:
+                    hashes[url] = content_hash
+    return validators, hashes, outlinks
+
+async def save_validators(db, crawl_time, urls):
+    """保存した記事と内容が変わらなかった記事の検証子を書き込み、304の記事を確認済みとして記録"""
+    unchanged = list(unchanged_urls)
+    validator_rows = [
+        (url, *updated_validators[url], crawl_time)
+        for url in [*urls, *unchanged] if url in updated_validators
+    ]
+    seen_urls = list(not_modified_urls)
+    await db.executemany("""
+        INSERT INTO http_validators (
+            url, etag, last_modified, modified_time, sitemap_lastmod, content_hash, outlinks, last_seen_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            modified_time = COALESCE(excluded.modified_time, http_validators.modified_time),
+            sitemap_lastmod = COALESCE(excluded.sitemap_lastmod, http_validators.sitemap_lastmod),
+            content_hash = excluded.content_hash,
+            outlinks = excluded.outlinks,
+            last_seen_at = excluded.last_seen_at
+    """, validator_rows)
+    await db.executemany(
+        "UPDATE http_validators SET last_seen_at = ?, sitemap_lastmod = COALESCE(?, sitemap_lastmod) WHERE url = ?",
+        [(crawl_time, sitemap_lastmods.get(url), url) for url in seen_urls]
+    )
+    return [row[0] for row in validator_rows], seen_urls, len(unchanged)
+
+async def ensure_search_index(db):
+    """全文検索インデックスと同期用トリガーを作成（新しく作った場合は既存の記事から索引を作る）"""
+    async with db.execute(FTS_EXISTS_SQL, (FTS_TABLE,)) as cursor:
+        created = await cursor.fetchone() is None
+    await db.executescript(FTS_SCHEMA_SQL)
+    if created:
+        await db.execute(REBUILD_SQL)
+        await db.commit()
+
+async def ensure_relation_tables(db):
+    """タグと内部リンクの関連テーブルを作成（新しく作った場合は既存の記事から書き込む）"""
+    async with db.execute(RELATIONS_EXISTS_SQL) as cursor:
+        created = await cursor.fetchone() is None
+    await db.executescript(RELATIONS_SCHEMA_SQL)
+    if created:
+        async with db.execute("SELECT url, tags, internal_links FROM articles") as cursor:
+            articles = [
+                {'url': url, 'tags': tags, 'internal_links': internal_links}
+                async for url, tags, internal_links in cursor
+            ]
+        await save_relations_async(db, articles)
+        await db.commit()
+
+async def init_db(db):
+    """記事テーブルと検証子テーブル、全文検索インデックス、タグとリンクの関連テーブル、履歴を準備
 
-async def main():
-    """メイン処理"""
-    global visited_urls, articles_data
+    ビューアーへの同期はクローラーのデータベースを読み込み専用で開くため、同期に使う索引と関連テーブルもここで作る。
+    """
+    await db.execute(ARTICLES_TABLE_SQL)
+    await ensure_columns(db, 'articles', ARTICLE_EXTRA_COLUMNS)
+    await db.execute(CRAWLED_AT_INDEX_SQL)
+    await ensure_validators_table(db)
+    await db.executescript(HISTORY_SCHEMA_SQL)
+    await ensure_search_index(db)
+    await ensure_relation_tables(db)
+
+async def save_to_db(db, articles):
+    """データベースに記事情報を一括保存
+
+    既存の記事は id を保ったまま、内容が変わったカラムがある場合のみ更新する。
+    更新前の記事と比べて変わったフィールドを履歴（article_versions）に版として残す。
+
+    Returns:
+        dict: inserted（新規）, updated（更新）, unchanged（変更なし）, versions（作成した版）の件数
+    """
+    # トランザクション開始
+    await db.execute("BEGIN TRANSACTION")
+    try:
+        # 現在の最新のcrawled_at時刻を取得（日本時間）
+        current_crawl_time = datetime.now(JST).isoformat()
+
+        # 新しい記事データを保存
+        rows = [
+            (
+                article['title'], article['url'], article['post_date'],
+                article.get('category_path', ''), article.get('content_intro', ''),
+                current_crawl_time, article.get('updated_date', ''),
+                article.get('tags', ''), article.get('headings', ''),
+                article.get('book_title', ''), article.get('book_author', ''),
+                article.get('book_isbn', ''), article.get('book_asin', ''),
+                article.get('word_count', 0),
+                json.dumps(article.get('internal_links', []), ensure_ascii=False),
+                article.get('frequent_words', ''),
+                json.dumps(article.get('broken_links', []), ensure_ascii=False),
+                json.dumps(article.get('external_links', []), ensure_ascii=False),
+                json.dumps(article.get('heading_outline', []), ensure_ascii=False)
+            )
+            for article in articles
+        ]
+        # 更新前の記事と比べるため、履歴は記事より先に書き込む
+        versions = await record_versions_async(
+            db, [dict(zip(ARTICLE_COLUMNS, row)) for row in rows], current_crawl_time
+        )
+        result = await upsert_rows_async(db, 'articles', ARTICLE_COLUMNS, rows)
+        result['versions'] = versions
+        await save_relations_async(db, articles)
+
+        # 記事と同じトランザクションで検証子を保存する
+        # （記事の保存に失敗した場合に次回304で取りこぼさないため）
+        saved_validator_urls, seen_urls, unchanged_count = await save_validators(
+            db, current_crawl_time, [article['url'] for article in articles]
+        )
+
+        # コミット
+        await db.commit()
+        logging.info(
+            f"{len(articles)}件の記事をデータベースに保存しました"
+            f"（新規: {result['inserted']}, 更新: {result['updated']}, 変更なし: {result['unchanged']}, "
+            f"履歴の版: {versions}）"
+        )
+        
+    except Exception as e:
+        await db.execute("ROLLBACK")
+        logging.error(f"Database error: {str(e)}")
+        raise
+
+    # コミット済みの検証子はメモリとチェックポイントから解放する
+    # （再開時に復元した検証子は、同じURLを取得し直すと2回数えられるため pop で外す）
+    for url in saved_validator_urls:
+        updated_validators.pop(url, None)
+    crawl_state.mark_validators_saved(saved_validator_urls)
+    del not_modified_urls[:len(seen_urls)]
+    del unchanged_urls[:unchanged_count]
+
+    return result
+
+async def main(mode='crawl', resume=False, batch_size=SINK_BATCH_SIZE, parser_backend=DEFAULT_BACKEND,
+               extra_sinks=(), max_pages=MAX_PAGES, parse_workers=PARSE_WORKERS):
+    """メイン処理
+
+    mode が 'crawl' の場合はトップページからリンクを辿ってクロールし、
+    'sitemap' の場合はサイトマップの lastmod が更新された記事のみを取得する。
+    resume が True の場合は前回中断したクロールをチェックポイントから再開する。
+    記事は batch_size 件ごとにCSVとデータベースへ書き出す。
+    parser_backend で HTML の解析に使うパーサーを指定する。
+    extra_sinks には同じ記事を書き出す追加のCSV出力先（別スキーマのCsvSinkなど）を渡す。
+    max_pages は1回のクロールで取得するページ数の上限。
+    parse_workers は HTML の解析を行うプロセス数。
+
+    Returns:
+        dict: 実行結果の集計（run_summary を参照）
+    """
+    global http_validators, content_hashes, article_outlinks
     
-    print(f"スクレイピングを開始します: {BASE_URL}")
+    state = None
+    if resume:
+        state = await crawl_state.load()
+        if state is None:
+            print("再開できるチェックポイントがないため、新しくクロールを開始します")
+        else:
+            mode = state['mode']
+
+    print(f"スクレイピングを開始します: {BASE_URL}（モード: {mode}）")
     start_time = time.time()
+
+    # 前回クロール時の検証子を読み込む
+    http_validators, content_hashes, article_outlinks = await load_validators()
     
+    # 記事はCSVとデータベースにバッチ単位で逐次書き出す
+    csv_sink = CsvSink(OUTPUT_FILE, batch_size)
+    db_sink = DbSink(DB_FILE, init_db, save_to_db, batch_size, on_saved=crawl_state.mark_saved)
+
     # HTTPセッションを開始
-    async with aiohttp.ClientSession() as session:
-        # クロール開始
-        await crawl_page(session, BASE_URL, 0)
-    
-    print(f"クロール完了。処理したページ数: {len(visited_urls)}, 収集した記事数: {len(articles_data)}")
-    
-    # CSVファイルに保存
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-        if articles_data:
-            writer = csv.DictWriter(f, fieldnames=articles_data[0].keys())
-            writer.writeheader()
-            for article in articles_data:
-                writer.writerow(article)
-    
-    print(f"データを {OUTPUT_FILE} に保存しました。")
+    session = create_session(HEADERS, TIMEOUT, MAX_CONCURRENT_REQUESTS, request_timings)
+    async with session, ArticleSinks(csv_sink, db_sink, *extra_sinks) as sinks:
+        if state is not None:
+            # チェックポイントの訪問済みURL・未保存の記事と検証子・サイトマップの lastmod を復元して
+            # 残りのフロンティアを処理する
+            visited_urls.update(state['visited'])
+            sitemap_lastmods.update(state['sitemap_lastmods'])
+            updated_validators.update(state['validators'])
+            # 記事を伴わない検証子は内容の指紋が一致した記事のもの（次の保存で書き込む）
+            pending_urls = {article['url'] for article in state['articles']}
+            unchanged_urls.extend(url for url in state['validators'] if url not in pending_urls)
+            print(f"チェックポイントから再開します（未処理URL: {len(state['frontier'])}, 未保存の記事: {len(state['articles'])}）")
+            for article in state['articles']:
+                await sinks.write(article)
+            crawl_stats = await crawl(
+                session, state['frontier'], sinks, max_pages=max_pages, follow_links=(mode != 'sitemap'),
+                stats=state['stats'], parse_workers=parse_workers, parser_backend=parser_backend
+            )
+        elif mode == 'sitemap':
+            # サイトマップから更新された記事のみを選ぶ
+            sitemap_lastmods.update(await discover_sitemap_urls(session))
+            await crawl_state.reset(mode, sitemap_lastmods)
+            known_lastmods = await load_known_lastmods()
+            changed_urls = [
+                url for url, lastmod in sitemap_lastmods.items()
+                if is_newer(lastmod, known_lastmods.get(url))
+            ]
+            print(f"サイトマップの記事数: {len(sitemap_lastmods)}, 更新された記事数: {len(changed_urls)}")
+            crawl_stats = await crawl(
+                session, changed_urls, sinks, max_pages=max_pages, follow_links=False,
+                parse_workers=parse_workers, parser_backend=parser_backend
+            )
+        else:
+            # クロール開始
+            await crawl_state.reset(mode)
+            crawl_stats = await crawl(
+                session, [BASE_URL], sinks, max_pages=max_pages, parse_workers=parse_workers,
+                parser_backend=parser_backend
+            )
     
-    # データベースに保存
-    await save_to_db(articles_data)
+    print(f"クロール完了。処理したページ数: {crawl_stats['pages_fetched']}, 収集した記事数: {crawl_stats['articles']}")
+    print(f"記事の変更状況: 変更あり {crawl_stats['articles']}件 / 変更なし "
+          f"{crawl_stats['not_modified'] + crawl_stats['unchanged']}件"
+          f"（304応答: {crawl_stats['not_modified']}件, 内容の指紋が一致: {crawl_stats['unchanged']}件）")
+    for sink in (csv_sink, *extra_sinks):
+        print(f"データを {sink.path} に保存しました（{sink.count}件）。")
+    print(f"データベースに{db_sink.count}件の記事を保存しました"
+          f"（新規: {db_sink.stats['inserted']}, 更新: {db_sink.stats['updated']}, 変更なし: {db_sink.stats['unchanged']}, "
+          f"履歴の版: {db_sink.stats['versions']}）。")
+
+    # 保存が完了したのでチェックポイントは不要
+    await crawl_state.clear()
     
     # 処理時間とサマリーを表示
     elapsed_time = time.time() - start_time
     print(f"処理完了！経過時間: {elapsed_time:.2f}秒")
-    print(f"処理したURL数: {len(visited_urls)}")
-    print(f"収集した記事数: {len(articles_data)}")
+    print(f"処理したURL数: {crawl_stats['pages_fetched']}（発見したURL数: {len(visited_urls)}）")
+    print(f"収集した記事数: {crawl_stats['articles']}")
+    duplicate_fetches = sum(count - 1 for count in fetch_counts.values())
+    print(f"HTTPリクエスト数: {sum(fetch_counts.values())}（重複取得: {duplicate_fetches}件, "
+          f"再試行: {sum(retry_counts.values())}回）")
+    timings = request_timings.summary()
+    print(f"応答時間: p50 {timings['p50_ms']}ms, p95 {timings['p95_ms']}ms"
+          f"（接続の使い回し率 {timings['reuse_ratio']}, 新規接続 {timings['connections_created']}件）")
+    if crawl_stats['disallowed']:
+        print(f"robots.txt により除外したURL数: {crawl_stats['disallowed']}")
+    if link_harvester.skipped or rejected_responses:
+        print(f"取得対象外のURL数: {link_harvester.skipped}"
+              f"（本文を読まなかった応答: HTML以外 {rejected_responses['content_type']}件, "
+              f"サイズ超過 {rejected_responses['too_large']}件）")
+    for host in crawl_stats.get('politeness', []):
+        print(f"{host['host']}: 実効レート {host['effective_rate']}件/秒"
+              f"（最終レート {host['rate']}件/秒, 最大 {host['peak_rate']}件/秒, 上限 {host['max_rate']}件/秒, "
+              f"同時リクエスト数 {host['concurrency']}, 429/503・タイムアウト {host['throttled']}件）")
+
+    return run_summary(crawl_stats, db_sink, elapsed_time)
+
+def run_summary(crawl_stats, db_sink, elapsed_time):
+    """クロールの実行結果をJSONに書き出せる dict にまとめる（ベンチマークや定期実行の記録用）"""
+    pages_parsed = crawl_stats.get('pages_parsed', 0)
+    return {
+        'elapsed_seconds': round(elapsed_time, 3),
+        'pages_fetched': crawl_stats['pages_fetched'],
+        'pages_parsed': pages_parsed,
+        'articles': crawl_stats['articles'],
+        'not_modified': crawl_stats['not_modified'],
+        'unchanged': crawl_stats['unchanged'],
+        'disallowed': crawl_stats['disallowed'],
+        'requests': sum(fetch_counts.values()),
+        'duplicate_fetches': sum(count - 1 for count in fetch_counts.values()),
+        'retries': sum(retry_counts.values()),
+        'skipped_urls': link_harvester.skipped,
+        'rejected_responses': dict(rejected_responses),
+        'fetch': request_timings.summary(),
+        'parse_ms_per_page': (
+            round(crawl_stats.get('parse_seconds', 0.0) / pages_parsed * 1000, 3) if pages_parsed else None
+        ),
+        'db': {
+            'rows': db_sink.count,
+            'seconds': round(db_sink.seconds, 3),
+            **db_sink.stats,
+        },
+        'politeness': crawl_stats.get('politeness', []),
+    }
+
+def parse_args():
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="set-ten.com 記事クローラー")
+    parser.add_argument(
+        "--mode",
+        choices=["crawl", "sitemap"],
+        default="crawl",
+        help="crawl: トップページからリンクを辿る / sitemap: サイトマップで更新された記事のみ取得（デフォルト: crawl）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="前回中断したクロールをチェックポイントから再開する",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=SINK_BATCH_SIZE,
+        help=f"CSVとデータベースにまとめて書き出す記事数（デフォルト: {SINK_BATCH_SIZE}）",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=PARSE_WORKERS,
+        help=f"HTMLの解析を行うプロセス数（デフォルト: CPUのコア数 {PARSE_WORKERS}）",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=BASE_URL,
+        help=f"クロール対象のサイト（合成サイトなどのローカルサーバーを指定できる。デフォルト: {BASE_URL}）",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=MAX_PAGES,
+        help=f"1回のクロールで取得するページ数の上限（デフォルト: {MAX_PAGES}）",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=MAX_RATE,
+        help=f"同一ホストへのリクエストレートの上限（件/秒。robots.txt の Crawl-delay が優先。デフォルト: {MAX_RATE}）",
+    )
+    parser.add_argument(
+        "--initial-rate",
+        type=float,
+        default=INITIAL_RATE,
+        help=f"同一ホストへの開始時のリクエストレート（件/秒。デフォルト: {INITIAL_RATE}）",
+    )
+    parser.add_argument(
+        "--stats-json",
+        help="実行結果の集計をJSONで書き出すファイル",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default=DEFAULT_BACKEND,
+        help=f"HTMLパーサー（auto: lxml があれば lxml、なければ html.parser。デフォルト: {DEFAULT_BACKEND}）",
+    )
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
+
     # ロギング設定
     logging.basicConfig(
         level=logging.INFO,
@@ -526,4 +956,11 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Error creating logs directory: {str(e)}")
     
-    asyncio.run(main())
+    configure_site(args.base_url)
+    MAX_RATE = args.max_rate
+    INITIAL_RATE = args.initial_rate
+    summary = asyncio.run(main(args.mode, args.resume, args.batch_size, args.parser, max_pages=args.max_pages,
+                               parse_workers=args.parse_workers))
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+クロール状態の永続化
+フロンティア（未処理のURL）、訪問済みURL、DB未保存の記事と検証子、サイトマップの lastmod を
+SQLiteに定期保存し、プロセスが中断されても --resume で途中から再開できるようにします
+"""
+
+import json
+import logging
+import os
+
+import aiosqlite
+
+from sqlite_profile import apply_profile_async
+
+STATE_FILE = "crawl_state.db"
+
+STATE_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS crawl_urls (
+        url TEXT PRIMARY KEY,
+        done INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS crawl_articles (
+        url TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS crawl_validators (
+        url TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS crawl_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+
+class CrawlState:
+    """クロールの進捗を差分でチェックポイントに書き出す"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._new_urls = []
+        self._done_urls = []
+        self._new_articles = []
+        self._saved_urls = []
+        self._new_validators = {}
+        self._saved_validator_urls = []
+
+    def add_url(self, url):
+        """フロンティアに追加したURLを記録"""
+        self._new_urls.append(url)
+
+    def mark_done(self, url):
+        """処理が完了したURLを記録"""
+        self._done_urls.append(url)
+
+    def add_article(self, article):
+        """抽出したがDBに未保存の記事を記録"""
+        self._new_articles.append(article)
+
+    def mark_saved(self, articles):
+        """DBへの保存が完了した記事をチェックポイントから外す"""
+        self._saved_urls.extend(article['url'] for article in articles)
+
+    def add_validator(self, url, validator):
+        """今回取得したがDBに未保存の検証子（updated_validators の値）を記録"""
+        self._new_validators[url] = validator
+
+    def mark_validators_saved(self, urls):
+        """DBへの保存が完了した検証子をチェックポイントから外す"""
+        self._saved_validator_urls.extend(urls)
+
+    async def _connect(self):
+        db = await aiosqlite.connect(self.path)
+        await apply_profile_async(db, 'crawler')
+        await db.executescript(STATE_SCHEMA_SQL)
+        return db
+
+    async def reset(self, mode, sitemap_lastmods=None):
+        """前回の状態を破棄して新しいクロールを開始する
+
+        sitemap_lastmods にはサイトマップモードで読み込んだ URL -> lastmod を渡す。
+        """
+        self._new_urls.clear()
+        self._done_urls.clear()
+        self._new_articles.clear()
+        self._saved_urls.clear()
+        self._new_validators.clear()
+        self._saved_validator_urls.clear()
+        db = await self._connect()
+        try:
+            await db.execute("DELETE FROM crawl_urls")
+            await db.execute("DELETE FROM crawl_articles")
+            await db.execute("DELETE FROM crawl_validators")
+            await db.execute("DELETE FROM crawl_meta")
+            await db.execute("INSERT INTO crawl_meta (key, value) VALUES ('mode', ?)", (mode,))
+            await db.execute(
+                "INSERT INTO crawl_meta (key, value) VALUES ('sitemap_lastmods', ?)",
+                (json.dumps(sitemap_lastmods or {}, ensure_ascii=False),)
+            )
+            await db.commit()
+        finally:
+            await db.close()
+
+    async def checkpoint(self, stats):
+        """前回のチェックポイント以降の差分を1トランザクションで保存する"""
+        # 書き込み中に追加された分は次回に回すため、先にリストを入れ替える
+        new_urls, self._new_urls = self._new_urls, []
+        done_urls, self._done_urls = self._done_urls, []
+        new_articles, self._new_articles = self._new_articles, []
+        saved_urls, self._saved_urls = self._saved_urls, []
+        new_validators, self._new_validators = self._new_validators, {}
+        saved_validator_urls, self._saved_validator_urls = self._saved_validator_urls, []
+
+        db = await self._connect()
+        try:
+            await db.executemany(
+                "INSERT OR IGNORE INTO crawl_urls (url) VALUES (?)",
+                [(url,) for url in new_urls]
+            )
+            await db.executemany(
+                "INSERT OR REPLACE INTO crawl_articles (url, data) VALUES (?, ?)",
+                [(article['url'], json.dumps(article, ensure_ascii=False)) for article in new_articles]
+            )
+            await db.executemany(
+                "DELETE FROM crawl_articles WHERE url = ?",
+                [(url,) for url in saved_urls]
+            )
+            await db.executemany(
+                "INSERT OR REPLACE INTO crawl_validators (url, data) VALUES (?, ?)",
+                [(url, json.dumps(validator, ensure_ascii=False)) for url, validator in new_validators.items()]
+            )
+            await db.executemany(
+                "DELETE FROM crawl_validators WHERE url = ?",
+                [(url,) for url in saved_validator_urls]
+            )
+            await db.executemany(
+                "UPDATE crawl_urls SET done = 1 WHERE url = ?",
+                [(url,) for url in done_urls]
+            )
+            await db.execute(
+                "INSERT OR REPLACE INTO crawl_meta (key, value) VALUES ('stats', ?)",
+                (json.dumps(stats),)
+            )
+            await db.commit()
+        except Exception:
+            # 失敗した差分は次回のチェックポイントで再送する
+            self._new_urls[:0] = new_urls
+            self._done_urls[:0] = done_urls
+            self._new_articles[:0] = new_articles
+            self._saved_urls[:0] = saved_urls
+            self._new_validators = {**new_validators, **self._new_validators}
+            self._saved_validator_urls[:0] = saved_validator_urls
+            raise
+        finally:
+            await db.close()
+
+        logging.info(
+            f"チェックポイントを保存しました（URL: +{len(new_urls)}, 完了: +{len(done_urls)}, "
+            f"記事: +{len(new_articles)}, 保存済み: {len(saved_urls)}, 検証子: +{len(new_validators)}）"
+        )
+
+    async def load(self):
+        """保存済みの状態を読み込む
+
+        Returns:
+            dict: mode, visited（訪問済みURL）, frontier（未処理URL）, articles,
+                  validators（URL -> 未保存の検証子のタプル）, sitemap_lastmods, stats。
+                  状態が保存されていなければ None。
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        db = await self._connect()
+        try:
+            async with db.execute("SELECT key, value FROM crawl_meta") as cursor:
+                meta = {key: value async for key, value in cursor}
+            if 'mode' not in meta:
+                return None
+
+            visited = set()
+            frontier = []
+            async with db.execute("SELECT url, done FROM crawl_urls ORDER BY rowid") as cursor:
+                async for url, done in cursor:
+                    visited.add(url)
+                    if not done:
+                        frontier.append(url)
+
+            async with db.execute("SELECT data FROM crawl_articles ORDER BY rowid") as cursor:
+                articles = [json.loads(data) async for (data,) in cursor]
+
+            async with db.execute("SELECT url, data FROM crawl_validators ORDER BY rowid") as cursor:
+                validators = {url: tuple(json.loads(data)) async for url, data in cursor}
+
+            return {
+                'mode': meta['mode'],
+                'visited': visited,
+                'frontier': frontier,
+                'articles': articles,
+                'validators': validators,
+                'sitemap_lastmods': json.loads(meta.get('sitemap_lastmods') or '{}'),
+                'stats': json.loads(meta.get('stats') or '{}'),
+            }
+        finally:
+            await db.close()
+
+    async def clear(self):
+        """クロールが正常に完了した後に状態ファイルを削除する"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
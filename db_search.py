@@ -4,6 +4,9 @@
 """
 データベース検索CLI
 set-ten.comから収集した記事データベースを検索・閲覧するためのCLIです
+
+タイトル・本文・見出し・タグ・書籍情報の検索は全文検索インデックス（article_search）を使い、
+一致度の高い順に一致箇所を [ ] で囲んだ抜粋を表示します
 """
 
 import sqlite3
@@ -11,9 +14,11 @@ import os
 import sys
 import json
 import argparse
-from datetime import datetime
 from tabulate import tabulate
 
+import article_search
+import sqlite_profile
+
 DB_FILE = "setten_articles.db"
 
 
@@ -26,7 +31,7 @@ def connect_db():
         return None
 
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = sqlite_profile.connect(DB_FILE)
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.Error as e:
@@ -101,45 +106,47 @@ def list_articles(limit=10, json_output=False):
         conn.close()
 
 
+# 全文検索インデックスを使わない（インデックスに含まれない）検索フィールド
+LIKE_FIELDS = {
+    "category": "category_path",
+    "date": "post_date",
+}
+
+SEARCH_FIELDS = [*article_search.SEARCH_FIELDS, *LIKE_FIELDS]
+
+
 def search_articles(field, keyword, limit=20, json_output=False):
     """記事を検索"""
     conn = connect_db()
     if not conn:
         return
 
-    field_map = {
-        "title": "title",
-        "content": "content_intro",
-        "category": "category",
-        "date": "post_date",
-    }
-
-    if field not in field_map:
+    if field not in SEARCH_FIELDS:
         print(f"エラー: 無効な検索フィールド '{field}'", file=sys.stderr)
         return
 
     try:
-        cursor = conn.cursor()
-        query = f"""
-            SELECT id, title, url, post_date, category, substr(content_intro, 1, 50) as intro
-            FROM articles
-            WHERE {field_map[field]} LIKE ?
-            ORDER BY id DESC
-            LIMIT ?
-        """
-
-        cursor.execute(query, (f"%{keyword}%", limit))
-        rows = cursor.fetchall()
+        if field in LIKE_FIELDS:
+            cursor = conn.cursor()
+            query = f"""
+                SELECT id, title, url, post_date, category_path as category,
+                       substr(content_intro, 1, 50) as intro
+                FROM articles
+                WHERE {LIKE_FIELDS[field]} LIKE ?
+                ORDER BY id DESC
+                LIMIT ?
+            """
+            cursor.execute(query, (f"%{keyword}%", limit))
+            rows = [dict(row) for row in cursor.fetchall()]
+        else:
+            article_search.ensure_search_index(conn)
+            rows = article_search.search(conn, keyword, field, limit)
+            for row in rows:
+                row["intro"] = row.pop("snippet")
 
         if json_output:
             # JSON形式で出力
-            results = []
-            for row in rows:
-                item = {}
-                for key in row.keys():
-                    item[key] = row[key]
-                results.append(item)
-            print(json.dumps(results, ensure_ascii=False, indent=2))
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
         else:
             # テーブル形式で出力
             print(f"\n== '{keyword}'の検索結果 ({field}) ==")
@@ -160,13 +167,13 @@ def search_articles(field, keyword, limit=20, json_output=False):
                 intro = row["intro"] or ""
 
                 table_data.append(
-                    [row["id"], title, row["post_date"] or "", category, intro + "..."]
+                    [row["id"], title, row["post_date"] or "", category, intro]
                 )
 
             print(
                 tabulate(
                     table_data,
-                    headers=["ID", "タイトル", "投稿日", "カテゴリ", "内容"],
+                    headers=["ID", "タイトル", "投稿日", "カテゴリ", "一致箇所"],
                     tablefmt="grid",
                 )
             )
@@ -178,6 +185,22 @@ def search_articles(field, keyword, limit=20, json_output=False):
         conn.close()
 
 
+def rebuild_search_index():
+    """全文検索インデックスを作り直す"""
+    conn = connect_db()
+    if not conn:
+        return
+
+    try:
+        count = article_search.rebuild_index(conn)
+        print(f"{count}件の記事の検索インデックスを作り直しました")
+    except sqlite3.Error as e:
+        print(f"インデックス作成エラー: {e}", file=sys.stderr)
+
+    finally:
+        conn.close()
+
+
 def show_stats():
     """統計情報を表示"""
     conn = connect_db()
@@ -301,10 +324,10 @@ def main():
     search_parser = subparsers.add_parser("search", help="記事を検索")
     search_parser.add_argument(
         "field",
-        choices=["title", "content", "category", "date"],
-        help="検索するフィールド",
+        choices=SEARCH_FIELDS,
+        help="検索するフィールド（all はタイトル・本文・見出し・タグ・書籍情報のすべて）",
     )
-    search_parser.add_argument("keyword", help="検索キーワード")
+    search_parser.add_argument("keyword", help="検索キーワード（空白区切りですべてを含む記事を検索）")
     search_parser.add_argument(
         "-n", "--limit", type=int, default=20, help="表示する最大件数 (デフォルト: 20)"
     )
@@ -313,6 +336,9 @@ def main():
     # stats コマンド
     subparsers.add_parser("stats", help="データベース統計情報を表示")
 
+    # rebuild-index コマンド
+    subparsers.add_parser("rebuild-index", help="全文検索インデックスを作り直す")
+
     # show コマンド
     show_parser = subparsers.add_parser("show", help="記事の詳細を表示")
     show_parser.add_argument("id", type=int, help="表示する記事のID")
@@ -327,6 +353,8 @@ def main():
         search_articles(args.field, args.keyword, args.limit, args.json)
     elif args.command == "stats":
         show_stats()
+    elif args.command == "rebuild-index":
+        rebuild_search_index()
     elif args.command == "show":
         show_article(args.id)
     else:
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTMLパーサーのバックエンド切り替え
+既定では従来どおり html.parser で解析し、lxml は指定したときだけ使います。
+レスポンスのバイト列をそのまま渡し、文字コードの判定は1回だけ行います
+
+閉じタグの省略された <p> など壊れたHTMLはパーサーごとに木の組み立て方が異なり、
+lxml では抽出結果（本文の冒頭など）が変わることがあります。
+整ったページで抽出結果が一致することは tests/test_html_parser_backend.py で確認しています
+
+使い方:
+    python html_parser_backend.py bench page1.html page2.html ... [-r 20]
+        バックエンドごとの1ページあたりの解析時間を計測する
+"""
+
+import argparse
+import codecs
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# 'auto' は lxml があれば lxml、なければ html.parser を使う（明示したときだけ）
+PARSER_BACKENDS = ('html.parser', 'lxml', 'auto')
+DEFAULT_BACKEND = 'html.parser'
+
+# 文字コード宣言を探す範囲。HTML仕様の事前走査は先頭1024バイトだが、ブラウザーはその後ろの
+# <meta charset> でも読み直して従うため、head に長いスクリプトや style があるページ向けに広めに探す
+_CHARSET_SCAN_BYTES = 4096
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+# BOM と文字コード（WHATWG Encoding の BOM sniffing と同じ3種類）
+_BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+
+def resolve_backend(backend=DEFAULT_BACKEND):
+    """バックエンド名を BeautifulSoup に渡すパーサー名に解決する"""
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if backend == 'auto':
+        return 'lxml' if HAS_LXML else 'html.parser'
+    if backend == 'lxml' and not HAS_LXML:
+        raise ValueError("lxml がインストールされていません")
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"不明なパーサー: {backend}")
+    return backend
+
+
+def charset_from_content_type(content_type):
+    """Content-Type ヘッダーから charset パラメータを取り出す（なければ None）"""
+    if not content_type:
+        return None
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def detect_charset(body, declared=None):
+    """レスポンスの文字コードを判定する
+
+    HTML仕様（WHATWG）の判定順と同じく、BOM、Content-Type ヘッダーの charset、
+    <meta charset> の順に確認し、いずれもなければ UTF-8 とみなす。
+    """
+    for bom, charset in _BOMS:
+        if body.startswith(bom):
+            return charset
+    candidates = [declared]
+    match = _META_CHARSET.search(body[:_CHARSET_SCAN_BYTES])
+    if match:
+        candidates.append(match.group(1).decode('ascii', 'ignore'))
+    candidates.append('utf-8')
+
+    for charset in candidates:
+        if not charset:
+            continue
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def make_soup(body, backend=DEFAULT_BACKEND, charset=None):
+    """HTMLを解析して BeautifulSoup オブジェクトを返す
+
+    Args:
+        body (bytes | str): HTML。バイト列の場合は文字コードを判定して解析する
+        backend (str): 'html.parser' / 'lxml' / 'auto'
+        charset (str): Content-Type ヘッダーで宣言された文字コード
+
+    BeautifulSoup にバイト列だけを渡すと文字コードの推測を何度も試みるため、
+    判定済みの文字コードを from_encoding で渡す。
+    """
+    parser = resolve_backend(backend)
+    if isinstance(body, bytes):
+        return BeautifulSoup(body, parser, from_encoding=detect_charset(body, charset))
+    return BeautifulSoup(body, parser)
+
+
+def _available_backends():
+    return ['lxml', 'html.parser'] if HAS_LXML else ['html.parser']
+
+
+def benchmark_backends(paths, repeat):
+    """バックエンドごとに1ページあたりの解析時間を計測する"""
+    bodies = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            bodies.append(f.read())
+
+    print(f"{len(bodies)}ページ × {repeat}回")
+    for backend in _available_backends():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for body in bodies:
+                make_soup(body, backend)
+        elapsed = time.perf_counter() - start
+        per_page = elapsed / (repeat * len(bodies)) * 1000
+        print(f"{backend:12s} {per_page:8.3f} ms/ページ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTMLパーサーのバックエンド比較ツール")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+
+    bench_parser = subparsers.add_parser("bench", help="バックエンドごとの解析時間を計測")
+    bench_parser.add_argument("files", nargs="+", help="HTMLファイル")
+    bench_parser.add_argument("-r", "--repeat", type=int, default=20, help="繰り返し回数（デフォルト: 20）")
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        benchmark_backends(args.files, args.repeat)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTTP通信の設定と再試行
+接続を使い回す TCPConnector（ホストごとの接続数の上限・keep-alive・DNSキャッシュ）と
+圧縮転送を設定した ClientSession を作り、一時的なエラーを指数バックオフで再試行します
+
+- 再試行するのは冪等な GET の 429 / 5xx とタイムアウト・接続エラーのみ
+- 待ち時間は上限付きの指数バックオフにジッターを掛けたもの（Retry-After があればそれに従う）
+- リクエストごとの所要時間（DNS解決・接続・応答ヘッダーまで）を TraceConfig で記録する
+- 本文を読む前に Content-Type と Content-Length を確認し、本文は上限サイズまで分割して読む
+
+brotli（Brotli または brotlicffi パッケージ）がインストールされていれば Accept-Encoding に br を含めます。
+"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+import aiohttp
+
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+CONNECTION_LIMIT = 100          # 全体の同時接続数の上限
+CONNECTION_LIMIT_PER_HOST = 8   # ホストごとの同時接続数の上限
+KEEPALIVE_TIMEOUT = 30          # 使い終わった接続を保持する秒数
+DNS_CACHE_TTL = 300             # DNSの解決結果をキャッシュする秒数
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, sock_connect=10)
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+MAX_RETRIES = 3                 # 1リクエストあたりの再試行回数の上限
+BACKOFF_BASE = 0.5              # 1回目の再試行までの最大待ち時間（秒）。以降2倍ずつ増やす
+BACKOFF_MAX = 30.0              # 再試行までの待ち時間の上限（秒）
+RETRY_AFTER_MAX = 120.0         # これより長い Retry-After は待たずに諦める（秒）
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+MAX_BODY_SIZE = 5 * 1024 * 1024  # 読み込む本文の上限（展開後のバイト数）
+READ_CHUNK_SIZE = 64 * 1024      # 本文を読み込む単位
+HTML_CONTENT_TYPES = frozenset({'text/html', 'application/xhtml+xml'})
+
+
+def create_session(headers=None, timeout=DEFAULT_TIMEOUT, limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                   timings=None):
+    """接続を使い回す設定の ClientSession を作る
+
+    Args:
+        headers (dict): すべてのリクエストに付けるヘッダー
+        timeout (ClientTimeout): リクエストごとのタイムアウト
+        limit_per_host (int): ホストごとの同時接続数の上限
+        timings (RequestTimings): リクエストごとの所要時間を記録する場合に指定
+    """
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={'Accept-Encoding': ACCEPT_ENCODING, **(headers or {})},
+        timeout=timeout,
+        trace_configs=[timings.trace_config()] if timings is not None else None,
+    )
+
+
+def parse_retry_after(value):
+    """Retry-After ヘッダー（秒数または HTTP-date）を待つ秒数に変換する（解釈できなければ None）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """attempt 回目（0始まり）の再試行までの待ち時間（フルジッター付きの指数バックオフ）"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_delay(attempt, retry_after=None, max_retries=MAX_RETRIES):
+    """再試行までの待ち時間を返す。再試行しない場合は None
+
+    Args:
+        attempt (int): 失敗した試行の番号（0始まり）
+        retry_after (str): 応答の Retry-After ヘッダー
+    """
+    if attempt >= max_retries:
+        return None
+    delay = parse_retry_after(retry_after)
+    if delay is None:
+        return backoff_delay(attempt)
+    if delay > RETRY_AFTER_MAX:
+        return None
+    # 同じ時刻に再試行が集中しないよう少しずらす
+    return delay + random.uniform(0, BACKOFF_BASE)
+
+
+def rejection_reason(response, content_types=HTML_CONTENT_TYPES, max_size=MAX_BODY_SIZE):
+    """本文を読む前にヘッダーで判定し、読まない理由を返す（読む場合は None）
+
+    Content-Type がない応答は本文を見ないと判断できないため読む。
+    content_types が None の場合は Content-Type を確認しない。
+    """
+    content_type = response.headers.get('Content-Type')
+    if content_types is not None and content_type:
+        mime_type = content_type.split(';', 1)[0].strip().lower()
+        if mime_type not in content_types:
+            return 'content_type'
+    if response.content_length is not None and response.content_length > max_size:
+        return 'too_large'
+    return None
+
+
+async def read_body(response, max_size=MAX_BODY_SIZE):
+    """本文を分割して読み込む。max_size を超えたら読むのをやめて None を返す"""
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _percentile(values, ratio):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class RequestTimings:
+    """TraceConfig でリクエストごとの所要時間を記録する
+
+    応答ヘッダーを受け取るまでの時間（elapsed）と、そのうちのDNS解決・接続確立の時間、
+    keep-alive の接続を使い回したかを記録する。add_hook() で登録した関数には
+    リクエストが終わるたびに記録（dict）が渡される。
+    """
+
+    def __init__(self):
+        self.records = []
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """リクエストごとの記録を受け取る関数 hook(record) を登録する"""
+        self._hooks.append(hook)
+
+    def trace_config(self):
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(
+            start=None, dns=0.0, connect=0.0, reused=False, dns_start=None, connect_start=None
+        ))
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_dns_resolvehost_start.append(self._on_dns_start)
+        trace.on_dns_resolvehost_end.append(self._on_dns_end)
+        trace.on_connection_create_start.append(self._on_connect_start)
+        trace.on_connection_create_end.append(self._on_connect_end)
+        trace.on_connection_reuseconn.append(self._on_reuse)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        return trace
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def _on_dns_start(self, session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def _on_dns_end(self, session, ctx, params):
+        ctx.dns += time.perf_counter() - ctx.dns_start
+
+    async def _on_connect_start(self, session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def _on_connect_end(self, session, ctx, params):
+        ctx.connect += time.perf_counter() - ctx.connect_start
+        self.connections_created += 1
+
+    async def _on_reuse(self, session, ctx, params):
+        ctx.reused = True
+        self.connections_reused += 1
+
+    async def _on_request_end(self, session, ctx, params):
+        self._record(ctx, str(params.url), params.response.status)
+
+    async def _on_request_exception(self, session, ctx, params):
+        self.errors += 1
+        self._record(ctx, str(params.url), None)
+
+    def _record(self, ctx, url, status):
+        record = {
+            'url': url,
+            'status': status,
+            'elapsed': time.perf_counter() - ctx.start,
+            'dns': ctx.dns,
+            'connect': ctx.connect,
+            'reused': ctx.reused,
+        }
+        self.records.append(record)
+        for hook in self._hooks:
+            hook(record)
+
+    def summary(self):
+        """所要時間の分布と接続の使い回しの状況をまとめる"""
+        elapsed = [record['elapsed'] for record in self.records]
+        connections = self.connections_created + self.connections_reused
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'requests': len(self.records),
+            'errors': self.errors,
+            'p50_ms': ms(_percentile(elapsed, 0.5)),
+            'p95_ms': ms(_percentile(elapsed, 0.95)),
+            'max_ms': ms(max(elapsed) if elapsed else None),
+            'connections_created': self.connections_created,
+            'reuse_ratio': round(self.connections_reused / connections, 3) if connections else None,
+        }
+
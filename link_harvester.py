@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ページ内リンクの収集
+サイト共通のナビゲーションなど、同じ href はほぼすべてのページに現れるため、
+URLの正規化結果をLRUキャッシュに保持し、訪問済みのURLは解析し直さずに捨てます
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
+
+URL_CACHE_SIZE = 4096  # 正規化結果をキャッシュする href の数
+
+# ベースURLに依存しない絶対URL（キャッシュのキーを href だけにできる）
+_ABSOLUTE_URL = re.compile(r'^https?://', re.IGNORECASE)
+
+
+def _origin(url):
+    """URLの「スキーム://ホスト」の部分を返す"""
+    host_start = url.find('//') + 2
+    path_start = url.find('/', host_start)
+    return url if path_start < 0 else url[:path_start]
+
+
+class LinkHarvester:
+    """ページ内の href から、クロール対象のドメインで未訪問のURLだけを取り出す
+
+    Args:
+        domain (str): クロール対象のホスト名（サブドメインも対象に含める）
+        cache_size (int): 正規化結果を保持する件数の上限
+        skip: 取得しないURLを判定する関数 skip(url)。クエリを含む正規化前の絶対URLを渡す
+    """
+
+    def __init__(self, domain, cache_size=URL_CACHE_SIZE, skip=None):
+        self.domain = domain.lower()
+        self.skip = skip
+        self.skipped = 0  # skip で除外したURLの数（キャッシュされた href は数えない）
+        self._canonicalize_cached = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def _in_scope(self, netloc):
+        host = netloc.rsplit('@', 1)[-1].split(':', 1)[0].lower()
+        return host == self.domain or host.endswith('.' + self.domain)
+
+    def _canonicalize(self, base_url, href):
+        try:
+            parsed = urlparse(urljoin(base_url, href) if base_url else href)
+        except ValueError:
+            return None  # 不正なIPv6アドレスなど
+        if parsed.scheme not in ('http', 'https') or not self._in_scope(parsed.netloc):
+            return None
+        if self.skip is not None and self.skip(parsed.geturl()):
+            self.skipped += 1
+            return None
+        # 末尾のスラッシュ・クエリ・フラグメントを除いた形に揃える（normalize_url と同じ）
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
+
+    def canonicalize(self, base_url, href):
+        """href を正規化した絶対URLを返す（対象外のURLは None）"""
+        if _ABSOLUTE_URL.match(href):
+            base_url = None
+        elif href[0] == '/' and not href.startswith('//'):
+            # ルート相対パスはページのオリジン（スキーム + ホスト）だけに依存する
+            base_url = _origin(base_url)
+        return self._canonicalize_cached(base_url, href)
+
+    def harvest(self, base_url, hrefs, visited):
+        """ページ内の href から未訪問の対象URLを出現順に返す
+
+        Args:
+            base_url (str): リンクのあったページのURL
+            hrefs (iterable): ページ内の href
+            visited (set): 訪問済み（キュー投入済み）のURL。このメソッドでは更新しない
+        """
+        new_urls = []
+        found = set()
+        for href in dict.fromkeys(hrefs):  # ページ内の重複を先に除く
+            if not href or href[0] == '#':
+                continue
+            url = self.canonicalize(base_url, href)
+            if url is None or url in visited or url in found:
+                continue
+            found.add(url)
+            new_urls.append(url)
+        return new_urls
+
+    def cache_info(self):
+        return self._canonicalize_cached.cache_info()
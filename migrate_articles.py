@@ -1,124 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+クローラーのデータベース（setten_articles.db）からビューアーのデータベースへの記事の同期
+前回の同期以降に crawled_at が更新された記事だけを、url をキーにまとめてUPSERTします
+
+- 同期済みの最後の記事の (crawled_at, id)（ウォーターマーク）を SyncState に保存し、次回はそれ以降の記事だけを読む。
+  クローラーは内容が変わった記事だけ crawled_at を更新するため、変更のない記事は読まない
+- 記事は bulk_create(update_conflicts=True) で batch_size 件ずつ書き込む。既存の記事は行を更新するので
+  Article の id（ビューアーのURL）は変わらない
+- カテゴリは最初に1回だけ読み込んだ名前 -> id の対応表で解決する
+- タグと内部リンクは同期した記事の分だけ関連テーブルから書き直す
+- バッチごとにコミットしてウォーターマークを進めるため、中断しても次回は続きから同期する
+- クローラーのデータベースは読み込み専用で開く。読み込みに使う索引と関連テーブルはクローラーが作る
+
+使い方:
+    python migrate_articles.py [--full] [--batch-size 500] [--source setten_articles.db]
+"""
+
+import argparse
+import json
 import os
+import time
+from datetime import datetime
+
 import django
-import sqlite3
 from django.utils import timezone
-from datetime import datetime
 
 # Django設定を設定
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setten_viewer.settings')
 django.setup()
 
-from articles.models import Article, Category
+from django.db import transaction
+
+from articles.models import Article, ArticleLink, ArticleTag, Category, SyncState, Tag, parse_headings
+from article_relations import RELATIONS_EXISTS_SQL
+import sqlite_profile
+
+SOURCE_DB = 'setten_articles.db'
+SYNC_NAME = 'setten_articles'
+SYNC_BATCH_SIZE = 500
+
+# クローラーのデータベースから読むカラム
+SOURCE_COLUMNS = (
+    'id', 'url', 'title', 'post_date', 'updated_date', 'category_path', 'content_intro', 'tags', 'headings',
+    'book_title', 'book_author', 'book_isbn', 'book_asin', 'word_count', 'internal_links',
+    'frequent_words', 'broken_links', 'crawled_at',
+)
+
+# 既存の記事を更新するフィールド（id と url 以外）
+UPDATE_FIELDS = [
+    'title', 'post_date', 'updated_date', 'content_intro', 'category', 'tags', 'headings',
+    'book_title', 'book_author', 'book_isbn', 'book_asin', 'word_count', 'internal_links',
+    'frequent_words', 'broken_links', 'crawled_at',
+]
+
 
 def parse_date(date_str):
     """日付文字列をパースしてdatetimeオブジェクトを返す"""
     if not date_str:
         return None
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except ValueError:
+        pass
     try:
         # タイムゾーン情報を削除
         date_str = date_str.split('+')[0].strip()
         return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-    except:
+    except ValueError:
         try:
             return datetime.strptime(date_str, '%Y-%m-%d')
-        except:
-            print(f"日付のパースに失敗: {date_str}")
+        except ValueError:
             return None
 
-def migrate_articles():
-    """既存の記事データを移行"""
-    print("記事データの移行を開始...")
-    
-    # 古いデータベースに接続
-    old_conn = sqlite3.connect('setten_articles.db')
-    old_cursor = old_conn.cursor()
-    
-    # 最新の記事データを取得
-    old_cursor.execute('''
-        SELECT h.*
-        FROM articles_history h
-        WHERE h.archived_at = (
-            SELECT MAX(archived_at) 
-            FROM articles_history h2 
-            WHERE h2.url = h.url
-        )
-    ''')
-    
-    # カラム名を取得
-    columns = [description[0] for description in old_cursor.description]
-    print(f"カラム: {columns}")
-    
-    # 記事データを取得
-    articles_data = old_cursor.fetchall()
-    print(f"移行する記事数: {len(articles_data)}")
-    
-    if not articles_data:
-        print("記事データが見つかりません")
-        return
-    
-    # カテゴリマッピングを作成
-    categories = {}  # name -> Category オブジェクト
-    for category in Category.objects.all():
-        categories[category.name] = category
-    print(f"カテゴリ: {list(categories.keys())}")
-    
-    # 既存の記事を削除
-    Article.objects.all().delete()
-    print("既存の記事を削除しました")
-    
-    # 記事を作成
-    created_count = 0
-    error_count = 0
-    for article_data in articles_data:
-        # 辞書にデータを変換
-        article_dict = dict(zip(columns, article_data))
-        try:
-            title = article_dict.get('title')
-            url = article_dict.get('url')
-            category_path = article_dict.get('category')
-            
-            if not title or not url:
-                continue
-            
-            # カテゴリの解決
-            category = None
-            if category_path:
-                parts = [p.strip() for p in category_path.split('>')]
-                if len(parts) > 0:
-                    subcategory_name = parts[0]
-                    category = categories.get(subcategory_name)
-            
-            print(f"記事を作成: {title} ({category_path if category_path else 'カテゴリなし'})")
-            
-            article = Article.objects.create(
-                title=title,
-                url=url,
-                post_date=parse_date(article_dict.get('post_date')),
-                updated_date=parse_date(article_dict.get('updated_date')),
-                content_intro=article_dict.get('content_intro'),
-                tags=article_dict.get('tags'),
-                headings=article_dict.get('headings'),
-                book_title=article_dict.get('book_title'),
-                book_author=article_dict.get('book_author'),
-                book_isbn=article_dict.get('book_isbn'),
-                book_asin=article_dict.get('book_asin'),
-                word_count=int(article_dict.get('word_count', 0) or 0),
-                internal_links=article_dict.get('internal_links'),
-                frequent_words=article_dict.get('frequent_words'),
-                broken_links=article_dict.get('broken_links'),
-                crawled_at=parse_date(article_dict.get('crawled_at')) or timezone.now(),
-                category=category
+
+def parse_datetime(date_str):
+    """日時文字列をタイムゾーン付きの datetime にする（タイムゾーンのないものは TIME_ZONE とみなす）"""
+    value = parse_date(date_str)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def category_map():
+    """カテゴリ名（および「親 > 子」の形式の名前）から Category の id への対応表"""
+    categories = {}
+    for category_id, name, parent_name in Category.objects.values_list('id', 'name', 'parent__name'):
+        categories.setdefault(name, category_id)
+        if parent_name:
+            categories[f"{parent_name} > {name}"] = category_id
+    return categories
+
+
+def resolve_category(categories, category_path):
+    """カテゴリパス（例: 「副業・キャリア戦略 > キャリア・働き方」）から Category の id を求める"""
+    if not category_path:
+        return None
+    if category_path in categories:
+        return categories[category_path]
+    # 従来の移行処理と同じく先頭の名前を優先し、見つからなければ残りの名前を順に探す
+    for name in (part.strip() for part in category_path.split('>')):
+        if name in categories:
+            return categories[name]
+    return None
+
+
+def build_article(row, categories):
+    """クローラーのデータベースの行から Article を作る（保存はしない）"""
+    data = dict(zip(SOURCE_COLUMNS, row))
+    post_date = parse_date(data['post_date'])
+    updated_date = parse_date(data['updated_date'])
+    return Article(
+        url=data['url'],
+        title=data['title'],
+        post_date=post_date.date() if post_date else None,
+        updated_date=updated_date.date() if updated_date else None,
+        content_intro=data['content_intro'],
+        category_id=resolve_category(categories, data['category_path']),
+        tags=data['tags'],
+        # クローラーは「h2: 見出し」の行で保存しているため、ビューアーが読む JSON にする
+        headings=json.dumps(parse_headings(data['headings']), ensure_ascii=False),
+        book_title=data['book_title'],
+        book_author=data['book_author'],
+        book_isbn=data['book_isbn'],
+        book_asin=data['book_asin'],
+        word_count=int(data['word_count'] or 0),
+        internal_links=data['internal_links'],
+        frequent_words=data['frequent_words'],
+        broken_links=data['broken_links'],
+        crawled_at=parse_datetime(data['crawled_at']) or timezone.now(),
+    )
+
+
+def sync_relations(old_conn, urls):
+    """同期した記事のタグと内部リンクを書き直す（記事の id はデータベースごとに異なるため url で対応づける）"""
+    article_ids = dict(Article.objects.filter(url__in=urls).values_list('url', 'id'))
+    placeholders = ', '.join('?' for _ in urls)
+
+    tag_rows = old_conn.execute(f"""
+        SELECT a.url, t.name
+        FROM articles a
+        JOIN article_tags at ON at.article_id = a.id
+        JOIN tags t ON t.id = at.tag_id
+        WHERE a.url IN ({placeholders})
+    """, urls).fetchall()
+    tag_names = {name for _, name in tag_rows}
+    Tag.objects.bulk_create([Tag(name=name) for name in tag_names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.filter(name__in=tag_names).values_list('name', 'id'))
+
+    ArticleTag.objects.filter(article_id__in=article_ids.values()).delete()
+    ArticleTag.objects.bulk_create([
+        ArticleTag(article_id=article_ids[url], tag_id=tag_ids[name])
+        for url, name in tag_rows if url in article_ids
+    ])
+
+    link_rows = old_conn.execute(f"""
+        SELECT a.url, l.target_url
+        FROM articles a
+        JOIN article_links l ON l.source_id = a.id
+        WHERE a.url IN ({placeholders})
+    """, urls).fetchall()
+    target_ids = dict(
+        Article.objects.filter(url__in={target_url for _, target_url in link_rows}).values_list('url', 'id')
+    )
+    ArticleLink.objects.filter(source_id__in=article_ids.values()).delete()
+    ArticleLink.objects.bulk_create([
+        ArticleLink(source_id=article_ids[url], target_url=target_url, target_id=target_ids.get(target_url))
+        for url, target_url in link_rows if url in article_ids
+    ])
+
+    # 先に同期した記事から、今回同期した記事へのリンクを埋める
+    dangling = list(
+        ArticleLink.objects.filter(target__isnull=True, target_url__in=list(article_ids)).only('id', 'target_url')
+    )
+    for link in dangling:
+        link.target_id = article_ids[link.target_url]
+    ArticleLink.objects.bulk_update(dangling, ['target'])
+    return len(tag_rows), len(link_rows)
+
+
+def migrate_articles(source=SOURCE_DB, full=False, batch_size=SYNC_BATCH_SIZE):
+    """前回の同期以降に更新された記事をビューアーのデータベースに同期する
+
+    Args:
+        source (str): クローラーのデータベースファイル
+        full (bool): ウォーターマークを無視してすべての記事を同期する
+        batch_size (int): 1回の bulk_create で書き込む記事数
+
+    Returns:
+        int: 同期した記事数
+    """
+    start_time = time.time()
+    old_conn = sqlite_profile.connect(source, read_only=True)
+    try:
+        if old_conn.execute(RELATIONS_EXISTS_SQL).fetchone() is None:
+            raise RuntimeError(
+                f"{source} にタグとリンクの関連テーブルがありません。"
+                f"クローラーを実行するか python article_relations.py rebuild --db {source} で作成してください"
             )
-            created_count += 1
-            if created_count % 10 == 0:
-                print(f"{created_count}件の記事を作成しました")
-        except Exception as e:
-            print(f"記事の作成に失敗: {title} - {str(e)}")
-            error_count += 1
-    
-    print(f"合計 {created_count} 件の記事を作成しました（エラー: {error_count}件）")
-    
-    old_conn.close()
+
+        state, _ = SyncState.objects.get_or_create(name=SYNC_NAME)
+        if full:
+            state.watermark, state.last_id = '', 0
+        categories = category_map()
+
+        # 同じ crawled_at の記事（クローラーの同じバッチ）がこちらのバッチの途中で区切られても
+        # 取りこぼさないよう、(crawled_at, id) の順に続きから読む
+        cursor = old_conn.execute(f"""
+            SELECT {', '.join(SOURCE_COLUMNS)}
+            FROM articles
+            WHERE (crawled_at > ? OR (crawled_at = ? AND id > ?))
+              AND title IS NOT NULL AND title != '' AND url IS NOT NULL
+            ORDER BY crawled_at, id
+        """, (state.watermark, state.watermark, state.last_id))
+
+        synced = tags = links = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            articles = [build_article(row, categories) for row in rows]
+            with transaction.atomic():
+                Article.objects.bulk_create(
+                    articles,
+                    update_conflicts=True,
+                    unique_fields=['url'],
+                    update_fields=UPDATE_FIELDS,
+                )
+                tag_count, link_count = sync_relations(old_conn, [article.url for article in articles])
+                last = dict(zip(SOURCE_COLUMNS, rows[-1]))
+                state.watermark, state.last_id = last['crawled_at'], last['id']
+                state.save(update_fields=['watermark', 'last_id', 'synced_at'])
+            synced += len(rows)
+            tags += tag_count
+            links += link_count
+    finally:
+        old_conn.close()
+
+    elapsed_time = time.time() - start_time
+    print(f"{synced}件の記事を同期しました（タグ {tags}件・内部リンク {links}件、{elapsed_time:.2f}秒）")
+    print(f"同期済みの取得日時: {state.watermark or 'なし'}")
+    return synced
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="クローラーのデータベースからビューアーへ記事を同期")
+    parser.add_argument("--source", default=SOURCE_DB, help=f"クローラーのデータベース（デフォルト: {SOURCE_DB}）")
+    parser.add_argument("--full", action="store_true", help="前回の同期位置を無視してすべての記事を同期する")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE,
+                        help=f"まとめて書き込む記事数（デフォルト: {SYNC_BATCH_SIZE}）")
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
-    migrate_articles()
+    args = parse_args()
+    migrate_articles(args.source, args.full, args.batch_size)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ホストごとのリクエスト制御（ポライトネス）
+robots.txt の Disallow と Crawl-delay を1回の実行につきホストごとに1度だけ読み込み、
+トークンバケットでリクエストの間隔を、AIMD（加算的増加・乗算的減少）で
+リクエストレートと同時リクエスト数を調整します
+
+- 応答が順調な間はレートと同時リクエスト数を少しずつ上げる
+- 429 / 503、タイムアウト、応答時間の悪化を検知したら半分に下げる
+- Crawl-delay（または Request-rate）が指定されていればレートの上限にする
+- robots.txt が 401 / 403 ならそのホスト全体を取得しない（404 などは制限なし）
+"""
+
+import asyncio
+import logging
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+INITIAL_RATE = 1.0          # 開始時のリクエストレート（件/秒）
+MAX_RATE = 10.0             # Crawl-delay がない場合のレートの上限（件/秒）
+MIN_RATE = 0.2              # レートの下限（件/秒）
+RATE_INCREASE = 0.5         # 順調な間、1秒あたりに上げるレート（件/秒）
+INITIAL_CONCURRENCY = 1     # 開始時の同時リクエスト数
+MAX_CONCURRENCY = 8         # 同時リクエスト数の上限
+BACKOFF_FACTOR = 0.5        # 混雑を検知したときにレートと同時リクエスト数に掛ける値
+BACKOFF_STATUSES = frozenset({429, 503})
+LATENCY_BACKOFF_RATIO = 2.0  # 平均応答時間が最短の何倍を超えたら混雑とみなすか
+LATENCY_TOLERANCE = 0.25     # 応答時間の悪化とみなす最小の差（秒）
+ROBOTS_TIMEOUT = aiohttp.ClientTimeout(total=10)
+MAX_HISTORY = 100            # 記録しておく減速の回数
+
+
+def parse_robots(text):
+    """robots.txt の本文を解析する（Crawl-delay は urllib.robotparser と同じく整数秒のみ）"""
+    parser = RobotFileParser()
+    parser.parse(text.splitlines())
+    parser.modified()  # 読み込み済みにしないと crawl_delay() が None を返す
+    return parser
+
+
+def disallow_all_robots():
+    """すべてのURLを許可しない robots.txt（urllib.robotparser と同じく 401 / 403 のときに使う）"""
+    parser = RobotFileParser()
+    parser.disallow_all = True
+    parser.modified()
+    return parser
+
+
+def robots_max_rate(robots, user_agent):
+    """robots.txt の Crawl-delay / Request-rate から許容されるレート（件/秒）を返す（指定がなければ None）"""
+    if robots is None:
+        return None
+    rates = []
+    delay = robots.crawl_delay(user_agent)
+    if delay:
+        rates.append(1.0 / float(delay))
+    request_rate = robots.request_rate(user_agent)
+    if request_rate and request_rate.seconds:
+        rates.append(request_rate.requests / request_rate.seconds)
+    return min(rates) if rates else None
+
+
+class TokenBucket:
+    """一定のレートでトークンを補充し、1リクエストにつき1トークンを消費する"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.paused_until = 0.0  # Retry-After などで指定された再開時刻（ループの時刻）
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def take(self):
+        """トークンが補充されるまで待って1つ消費する（待機は先着順）"""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostScheduler:
+    """1つのホストへのリクエストのレートと同時リクエスト数を管理する"""
+
+    def __init__(self, host, robots=None, user_agent='*', initial_rate=INITIAL_RATE,
+                 max_rate=MAX_RATE, max_concurrency=MAX_CONCURRENCY):
+        self.host = host
+        self.robots = robots
+        self.user_agent = user_agent
+        robots_rate = robots_max_rate(robots, user_agent)
+        self.max_rate = min(max_rate, robots_rate) if robots_rate else max_rate
+        self.rate = min(initial_rate, self.max_rate)
+        self.peak_rate = self.rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(INITIAL_CONCURRENCY, max_concurrency))
+        self.in_flight = 0
+        self.bucket = TokenBucket(self.rate)
+        self.latency = None       # 応答時間の指数移動平均（秒）
+        self.min_latency = None   # 観測した最短の応答時間（秒）
+        self.requests = 0
+        self.throttled = 0        # 429 / 503 / タイムアウトの件数
+        self.history = []         # レートを下げたときの (経過秒, レート, 同時リクエスト数)
+        self._slots = asyncio.Condition()
+        self._hold_until = 0.0    # 減速直後はしばらく増減させない
+        self._started = None
+        self._finished = None
+
+    def allowed(self, url):
+        """robots.txt で取得が許可されているか"""
+        return self.robots is None or self.robots.can_fetch(self.user_agent, url)
+
+    async def acquire(self):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < int(self.concurrency))
+            self.in_flight += 1
+        try:
+            await self.bucket.take()
+        except BaseException:
+            # トークンを待つ間に取り消された場合は、確保した枠を返してから伝える
+            await self._free_slot()
+            raise
+        if self._started is None:
+            self._started = asyncio.get_running_loop().time()
+
+    async def release(self, latency, status=None, failed=False):
+        """リクエストの結果を記録し、レートと同時リクエスト数を調整する"""
+        now = asyncio.get_running_loop().time()
+        self.requests += 1
+        self._finished = now
+        congested = failed or status in BACKOFF_STATUSES
+        if congested:
+            self.throttled += 1
+        elif latency is not None:
+            self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+            self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+            congested = (
+                self.latency > self.min_latency * LATENCY_BACKOFF_RATIO
+                and self.latency - self.min_latency > LATENCY_TOLERANCE
+            )
+
+        if now >= self._hold_until:
+            if congested:
+                self._set_rate(max(MIN_RATE, self.rate * BACKOFF_FACTOR))
+                self.concurrency = max(1.0, self.concurrency * BACKOFF_FACTOR)
+                # 同じ混雑で何度も下げないよう、1往復分は判定を止める
+                self._hold_until = now + max(1.0, self.latency or 0.0)
+                self.history.append((round(now - (self._started or now), 2), round(self.rate, 2), int(self.concurrency)))
+                del self.history[:-MAX_HISTORY]
+                logging.info(
+                    f"{self.host}: 混雑を検知したため減速します"
+                    f"（レート {self.rate:.2f}件/秒, 同時リクエスト数 {int(self.concurrency)}）"
+                )
+            else:
+                # 1秒あたり RATE_INCREASE、1往復あたり同時リクエスト数を1ずつ増やす
+                self._set_rate(min(self.max_rate, self.rate + RATE_INCREASE / self.rate))
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+
+        await self._free_slot()
+
+    async def _free_slot(self):
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    def defer(self, seconds):
+        """Retry-After に従い、このホストへの次のリクエストを seconds 秒後まで待たせる"""
+        bucket = self.bucket
+        bucket.paused_until = max(bucket.paused_until, asyncio.get_running_loop().time() + seconds)
+
+    def _set_rate(self, rate):
+        self.rate = rate
+        self.bucket.rate = rate
+        self.peak_rate = max(self.peak_rate, rate)
+
+    def summary(self):
+        """選んだレートと実際のレートをまとめる"""
+        elapsed = (self._finished - self._started) if self._started and self._finished else 0
+        return {
+            'host': self.host,
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'rate': round(self.rate, 2),
+            'peak_rate': round(self.peak_rate, 2),
+            'max_rate': round(self.max_rate, 2),
+            'effective_rate': round(self.requests / elapsed, 2) if elapsed > 0 else None,
+            'concurrency': int(self.concurrency),
+            'avg_latency': round(self.latency, 3) if self.latency is not None else None,
+            'backoffs': self.history,
+        }
+
+
+class _RequestSlot:
+    """scheduler.request() が返すコンテキスト。status / failed に結果を設定する"""
+
+    def __init__(self, host):
+        self.host = host
+        self.status = None
+        self.failed = False
+        self._start = None
+
+    async def __aenter__(self):
+        await self.host.acquire()
+        self._start = asyncio.get_running_loop().time()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = asyncio.get_running_loop().time() - self._start
+        await self.host.release(latency, self.status, self.failed or exc_type is not None)
+
+
+class PolitenessScheduler:
+    """ホストごとの HostScheduler をまとめる
+
+    Args:
+        user_agent (str): robots.txt の照合に使うユーザーエージェント
+        initial_rate (float): 開始時のリクエストレート（件/秒）
+        max_concurrency (int): ホストごとの同時リクエスト数の上限
+    """
+
+    def __init__(self, user_agent, initial_rate=INITIAL_RATE, max_rate=MAX_RATE,
+                 max_concurrency=MAX_CONCURRENCY):
+        self.user_agent = user_agent
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.hosts = {}
+        self._robots_locks = {}
+
+    def _create_host(self, host, robots=None):
+        self.hosts[host] = HostScheduler(
+            host, robots, self.user_agent, self.initial_rate, self.max_rate, self.max_concurrency
+        )
+        return self.hosts[host]
+
+    async def load_robots(self, session, url):
+        """ホストの robots.txt を読み込む（実行中に1回だけ）"""
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if host in self.hosts:
+            return self.hosts[host]
+
+        lock = self._robots_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            if host in self.hosts:
+                return self.hosts[host]
+
+            robots = None
+            robots_url = f"{parsed.scheme}://{host}/robots.txt"
+            try:
+                async with session.get(robots_url, headers={'User-Agent': self.user_agent},
+                                       timeout=ROBOTS_TIMEOUT) as response:
+                    if response.status == 200:
+                        robots = parse_robots(await response.text(errors='replace'))
+                    elif response.status in (401, 403):
+                        robots = disallow_all_robots()
+                        logging.warning(f"robots.txt へのアクセスが拒否されたため、このホストは取得しません: {robots_url} - ステータスコード: {response.status}")
+                    elif response.status >= 500:
+                        logging.warning(f"robots.txt を取得できませんでした: {robots_url} - ステータスコード: {response.status}")
+            except Exception as e:
+                logging.warning(f"robots.txt を取得できませんでした: {robots_url} - {str(e)}")
+
+            scheduler = self._create_host(host, robots)
+            if robots is not None:
+                logging.info(f"robots.txt を読み込みました: {robots_url}（レート上限 {scheduler.max_rate:.2f}件/秒）")
+            return scheduler
+
+    async def allowed(self, session, url):
+        """robots.txt で取得が許可されているか（未読み込みのホストは先に読み込む）"""
+        return (await self.load_robots(session, url)).allowed(url)
+
+    def request(self, url):
+        """1リクエスト分の枠を確保するコンテキストマネージャーを返す
+
+        async with scheduler.request(url) as slot:
+            ...
+            slot.status = response.status
+        """
+        host = urlparse(url).netloc
+        return _RequestSlot(self.hosts.get(host) or self._create_host(host))
+
+    def defer(self, url, seconds):
+        """URLのホストへの次のリクエストを seconds 秒後まで待たせる"""
+        host = urlparse(url).netloc
+        (self.hosts.get(host) or self._create_host(host)).defer(seconds)
+
+    def summary(self):
+        return [host.summary() for host in self.hosts.values()]
+
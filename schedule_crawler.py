@@ -5,7 +5,6 @@
 set-ten.comの記事を自動収集・データベース更新するスケジューラスクリプト
 """
 
-import os
 import sys
 import subprocess
 import time
@@ -34,16 +33,19 @@ logging.basicConfig(
 logger = logging.getLogger("setten_crawler")
 
 
-def run_crawler():
+def run_crawler(mode="crawl"):
     """クローラーを実行して記事を収集"""
-    logger.info("クローラーを開始します...")
+    logger.info(f"クローラーを開始します（モード: {mode}）...")
 
     try:
         start_time = time.time()
 
         # クローラーの実行
         result = subprocess.run(
-            ["python", CRAWL_SCRIPT], capture_output=True, text=True, check=True
+            ["python", CRAWL_SCRIPT, "--mode", mode],
+            capture_output=True,
+            text=True,
+            check=True,
         )
 
         # 出力を表示
@@ -99,7 +101,7 @@ def display_stats():
         return False
 
 
-def schedule_crawl(interval_hours=24):
+def schedule_crawl(interval_hours=24, mode="crawl"):
     """指定した時間間隔でクローラーを実行"""
     logger.info(
         f"クローラーを{interval_hours}時間おきに実行するスケジュールを開始します"
@@ -108,7 +110,7 @@ def schedule_crawl(interval_hours=24):
     try:
         while True:
             # クローラーとデータベース統計表示の実行
-            success = run_crawler()
+            success = run_crawler(mode)
             if success:
                 display_stats()
 
@@ -143,6 +145,12 @@ def main():
         default=24,
         help="クローラーを実行する間隔（時間単位、デフォルト：24）",
     )
+    parser.add_argument(
+        "--mode",
+        choices=["crawl", "sitemap"],
+        default="crawl",
+        help="クローラーの実行モード（デフォルト：crawl）",
+    )
 
     args = parser.parse_args()
 
@@ -161,12 +169,12 @@ def main():
     if args.run_once:
         # 一度だけ実行
         logger.info("クローラーを一度だけ実行します")
-        success = run_crawler()
+        success = run_crawler(args.mode)
         if success:
             display_stats()
     else:
         # 定期実行
-        schedule_crawl(args.interval)
+        schedule_crawl(args.interval, args.mode)
 
     return 0
 
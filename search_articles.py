@@ -3,6 +3,8 @@
 
 """
 set-ten.comの記事データベースを検索するスクリプト
+タイトル・本文・見出し・タグ・書籍情報の検索は全文検索インデックス（article_search）を使い、
+BM25 の順位で並べて一致箇所の抜粋を表示します
 """
 
 import sqlite3
@@ -12,6 +14,9 @@ import json
 from datetime import datetime
 from tabulate import tabulate
 
+import article_search
+import sqlite_profile
+
 DB_FILE = "setten_articles.db"
 
 def connect_to_db():
@@ -20,7 +25,7 @@ def connect_to_db():
         print(f"エラー: データベースファイル '{DB_FILE}' が見つかりません。")
         return None
         
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite_profile.connect(DB_FILE)
     conn.row_factory = sqlite3.Row  # 辞書形式で結果を取得
     return conn
 
@@ -59,27 +64,36 @@ def search_articles(search_type, keyword, limit=20):
     if not conn:
         return []
         
+    if search_type in article_search.SEARCH_FIELDS:
+        try:
+            article_search.ensure_search_index(conn)
+            results = article_search.search(conn, keyword, search_type, limit)
+            for row in results:
+                row['intro'] = row.pop('snippet')
+            conn.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"検索中にエラーが発生しました: {str(e)}")
+            conn.close()
+            return []
+
     cursor = conn.cursor()
     
     query = """
-    SELECT id, title, url, post_date, category, substr(content_intro, 1, 50) as intro, crawled_at 
+    SELECT id, title, url, post_date, category_path as category, substr(content_intro, 1, 50) as intro, crawled_at 
     FROM articles 
     WHERE {field} LIKE ?
     ORDER BY crawled_at DESC
     LIMIT ?
     """
     
-    field = 'title'  # デフォルト
-    if search_type == 'title':
-        field = 'title'
-    elif search_type == 'category':
-        field = 'category'
+    if search_type == 'category':
+        field = 'category_path'
     elif search_type == 'date':
         field = 'post_date'
-    elif search_type == 'content':
-        field = 'content_intro'
     else:
         print(f"エラー: 無効な検索タイプ '{search_type}'")
+        conn.close()
         return []
     
     try:
@@ -198,6 +212,16 @@ def get_stats():
     conn.close()
     return stats
 
+def rebuild_search_index():
+    """全文検索インデックスを作り直す"""
+    conn = connect_to_db()
+    if not conn:
+        return 0
+    try:
+        return article_search.rebuild_index(conn)
+    finally:
+        conn.close()
+
 def print_stats(stats):
     """統計情報を表示"""
     if not stats:
@@ -236,7 +260,8 @@ def main():
         
         # searchコマンド
         search_parser = subparsers.add_parser('search', help='記事を検索')
-        search_parser.add_argument('type', choices=['title', 'category', 'date', 'content'], help='検索タイプ')
+        search_parser.add_argument('type', choices=[*article_search.SEARCH_FIELDS, 'category', 'date'],
+                                   help='検索タイプ（all はタイトル・本文・見出し・タグ・書籍情報のすべて）')
         search_parser.add_argument('keyword', help='検索キーワード')
         search_parser.add_argument('-n', '--limit', type=int, default=20, help='表示する記事数（デフォルト: 20）')
         search_parser.add_argument('-f', '--format', choices=['table', 'json'], default='table', help='出力形式（デフォルト: table）')
@@ -244,6 +269,9 @@ def main():
         # statsコマンド
         subparsers.add_parser('stats', help='データベース統計を表示')
         
+        # rebuild-indexコマンド
+        subparsers.add_parser('rebuild-index', help='全文検索インデックスを作り直す')
+        
         args = parser.parse_args()
         print(f"コマンド: {args.command if hasattr(args, 'command') else 'なし'}")
     except Exception as e:
@@ -271,6 +299,10 @@ def main():
             stats = get_stats()
             print("統計情報を表示します")
             print_stats(stats)
+        elif args.command == 'rebuild-index':
+            print("全文検索インデックスを作り直しています...")
+            count = rebuild_search_index()
+            print(f"{count}件の記事のインデックスを作り直しました")
     except Exception as e:
         print(f"コマンド実行中にエラーが発生しました: {str(e)}")
 
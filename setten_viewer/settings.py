@@ -80,10 +80,21 @@ WSGI_APPLICATION = "setten_viewer.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# クローラーの書き込み中も読めるよう、接続ごとに sqlite_profile の設定（WAL など）を適用する
+# （articles.apps で connection_created に登録）。書き込むトランザクションは最初から
+# 書き込みロックを取り、読み込みからの昇格で busy_timeout を待たずに失敗しないようにする
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "SQLITE_PROFILE": "viewer",
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+        },
+        # 同時接続のテストのため、テスト用のデータベースもメモリ上ではなくファイルにする
+        "TEST": {
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+XMLサイトマップの解析
+WordPressのサイトマップインデックス（wp-sitemap.xml / sitemap_index.xml）と
+個別のサイトマップを解析し、URLと最終更新日時（lastmod）を取り出します
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+import zlib
+from datetime import datetime
+
+import pytz
+
+JST = pytz.timezone('Asia/Tokyo')
+
+# サイトマップの探索順（WordPress標準 → Yoast等のプラグイン → 汎用）
+SITEMAP_PATHS = ['wp-sitemap.xml', 'sitemap_index.xml', 'sitemap.xml']
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# サイトマップ1ファイルの上限（プロトコルの上限は展開後50MB）
+SITEMAP_MAX_SIZE = 50 * 1024 * 1024
+GUNZIP_CHUNK_SIZE = 1024 * 1024  # gzip を展開するときに1回で取り出す大きさ
+
+
+def _local_name(tag):
+    """名前空間を除いたタグ名を返す"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def gunzip(body, max_size=SITEMAP_MAX_SIZE):
+    """gzip を展開する。展開後の大きさが max_size を超えた場合は None を返す
+
+    圧縮率の極端に高いファイルでメモリを使い果たさないよう、少しずつ展開して大きさを確認する。
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    chunks = []
+    size = 0
+    data = body
+    while not decompressor.eof:
+        chunk = decompressor.decompress(data, GUNZIP_CHUNK_SIZE)
+        data = decompressor.unconsumed_tail
+        if not chunk and not data:
+            break  # 途中で切れたファイル
+        size += len(chunk)
+        if size > max_size:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def parse_sitemap(body, max_size=SITEMAP_MAX_SIZE):
+    """サイトマップ本文を解析する
+
+    Args:
+        body (bytes): サイトマップのXML（gzip圧縮されていてもよい）
+        max_size (int): gzip を展開した後の大きさの上限
+
+    Returns:
+        tuple: (種類, エントリのリスト)
+            種類は 'index'（サイトマップインデックス）または 'urlset'。
+            エントリは (loc, lastmod) のタプルで、lastmod がなければ None。
+    """
+    if body.startswith(GZIP_MAGIC):
+        try:
+            body = gunzip(body, max_size)
+        except zlib.error as e:
+            logging.warning(f"サイトマップの展開に失敗しました: {str(e)}")
+            return None, []
+        if body is None:
+            logging.warning(f"展開後のサイトマップが上限（{max_size}バイト）を超えたため読み込みません")
+            return None, []
+
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        logging.warning(f"サイトマップの解析に失敗しました: {str(e)}")
+        return None, []
+
+    kind = _local_name(root.tag)
+    child_name = 'sitemap' if kind == 'sitemapindex' else 'url'
+
+    entries = []
+    for child in root:
+        if _local_name(child.tag) != child_name:
+            continue
+        loc = None
+        lastmod = None
+        for field in child:
+            name = _local_name(field.tag)
+            if name == 'loc' and field.text:
+                loc = field.text.strip()
+            elif name == 'lastmod' and field.text:
+                lastmod = field.text.strip()
+        if loc:
+            entries.append((loc, lastmod))
+
+    return ('index' if kind == 'sitemapindex' else 'urlset'), entries
+
+
+def parse_lastmod(value):
+    """lastmod（W3C Datetime形式）をタイムゾーン付きdatetimeに変換する"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = JST.localize(parsed)
+    return parsed
+
+
+def is_newer(lastmod, stored):
+    """サイトマップの lastmod が保存済みの日時より新しいかを判定する
+
+    stored が日付のみ（記事の updated_date など）の場合は日単位で比較する。
+    どちらかが不明な場合は再取得が必要とみなす。
+    """
+    lastmod_dt = parse_lastmod(lastmod)
+    if lastmod_dt is None or not stored:
+        return True
+
+    if len(stored.strip()) == 10:  # YYYY-MM-DD
+        return lastmod_dt.astimezone(JST).date().isoformat() > stored.strip()
+
+    stored_dt = parse_lastmod(stored)
+    if stored_dt is None:
+        return True
+    return lastmod_dt > stored_dt
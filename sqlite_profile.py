@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SQLite の接続設定（プロファイル）
+クローラー・CLI・ビューアー（Django）が同じ設定で SQLite に接続するための PRAGMA をまとめます
+
+- journal_mode=WAL: 書き込み中のトランザクションがあっても、読み込みはコミット済みの内容を待たずに読める
+- synchronous=NORMAL: WAL ではコミットごとの fsync を省いてもデータベースは壊れない（電源断で直近のコミットが失われうる）
+- busy_timeout: ロックを取れないときにすぐ "database is locked" にせず、指定したミリ秒まで待つ
+- cache_size: ページキャッシュの大きさ（負の値は KiB 単位）
+- mmap_size: データベースファイルをメモリマップして読む大きさ
+
+journal_mode はデータベースファイルに記録されるため、いずれかの接続で一度 WAL にすれば以降も WAL のまま。
+メモリ上のデータベースは WAL にならない（memory のまま）。
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+
+# すべてのプロファイルに共通の設定
+BASE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16384,  # 16MiB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+PROFILES = {
+    # 記事を一括で書き込むクローラー（大きなキャッシュで索引の更新を速くする）
+    'crawler': {**BASE_PRAGMAS, 'busy_timeout': 30000, 'cache_size': -65536},
+    # 検索・集計などのCLI
+    'cli': dict(BASE_PRAGMAS),
+    # ビューアー（リクエストごとの短い読み込み）
+    'viewer': {**BASE_PRAGMAS, 'cache_size': -32768},
+}
+
+DEFAULT_PROFILE = 'cli'
+
+logger = logging.getLogger(__name__)
+
+
+# データベースファイルに記録される設定（読み込み専用の接続では変更しない）
+PERSISTENT_PRAGMAS = ('journal_mode',)
+
+
+def pragma_statements(profile=DEFAULT_PROFILE, exclude=()):
+    """プロファイルの PRAGMA 文のリスト（busy_timeout を最初に設定する）"""
+    return [f"PRAGMA {name} = {value}" for name, value in PROFILES[profile].items() if name not in exclude]
+
+
+def apply_profile(conn, profile=DEFAULT_PROFILE, exclude=()):
+    """sqlite3 の接続（または DB-API のカーソルを作れる接続）にプロファイルを適用する"""
+    cursor = conn.cursor()
+    try:
+        for statement in pragma_statements(profile, exclude):
+            try:
+                cursor.execute(statement)
+            except sqlite3.OperationalError as e:
+                # 他の接続がロックしていると journal_mode を変更できない（次の接続で再度試みる）
+                logger.warning(f"{statement} を適用できませんでした: {e}")
+    finally:
+        cursor.close()
+    return conn
+
+
+async def apply_profile_async(db, profile=DEFAULT_PROFILE):
+    """aiosqlite の接続にプロファイルを適用する"""
+    for statement in pragma_statements(profile):
+        try:
+            await db.execute(statement)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"{statement} を適用できませんでした: {e}")
+    return db
+
+
+def connect(path, profile=DEFAULT_PROFILE, read_only=False, **kwargs):
+    """プロファイルを適用した sqlite3 の接続を開く
+
+    read_only が True の場合は既存のファイルを読み込み専用で開く（ファイルがなければ作らずにエラーにする）。
+    """
+    kwargs.setdefault('timeout', PROFILES[profile]['busy_timeout'] / 1000)
+    if read_only:
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, **kwargs)
+        return apply_profile(conn, profile, exclude=PERSISTENT_PRAGMAS)
+    return apply_profile(sqlite3.connect(path, **kwargs), profile)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Django の connection_created シグナルで SQLite の接続にプロファイルを適用する
+
+    DATABASES の各接続の SQLITE_PROFILE でプロファイルを指定する（省略時は viewer）。
+    """
+    if connection.vendor != 'sqlite':
+        return
+    apply_profile(connection.connection, connection.settings_dict.get('SQLITE_PROFILE', 'viewer'))
+
+
+def current_settings(conn):
+    """接続に適用されている PRAGMA の値（確認用）"""
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BASE_PRAGMAS}
@@ -0,0 +1,494 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+合成サイトの生成とローカルサーバー
+set-ten.com と同じマークアップ（h1.entry-title, .entry-content, .cat-links, .tags-links,
+article:published_time の meta など）を持つ WordPress 風のサイトを、記事数とシードから決定的に生成し、
+遅延・エラー率・流量制限を設定できるローカルサーバーで配信します
+
+- トップページ・カテゴリー・タグの一覧はページ送り（/page/N/）付き
+- サイトマップ（wp-sitemap.xml とその子サイトマップ）と robots.txt
+- ETag / Last-Modified を返し、条件付きリクエストには 304 を返す
+- 本文には書籍情報（ISBN / Amazonのリンク）・見出し・内部リンク・外部リンクのほか、
+  クローラーが取得しないはずのURL（画像・フィード・?replytocom=）へのリンクも含める
+
+ページは要求されたときに生成するため、記事数が多くてもすぐに起動します。
+同じ記事数とシードであれば、何度生成しても同じ内容になります。
+
+使い方:
+    python synthetic_site.py serve [--articles 10000] [--port 8765] [--latency 0.02] [--error-rate 0.01] [--max-rate 200]
+        合成サイトを配信する（/__stats__ でリクエスト数をJSONで返す）
+    python synthetic_site.py generate OUTPUT_DIR [--articles 1000]
+        合成サイトを静的ファイルとして書き出す
+    python crawl_setten.py --base-url http://127.0.0.1:8765/
+        合成サイトをクロールする
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from html import escape
+
+from book_identifiers import isbn10_to_isbn13
+
+DEFAULT_ARTICLES = 1000
+DEFAULT_SEED = 0
+DEFAULT_PORT = 8765
+POSTS_PER_PAGE = 10          # 一覧1ページあたりの記事数
+SITEMAP_PAGE_SIZE = 2000     # 子サイトマップ1つあたりのURL数（WordPressと同じ）
+ARTICLE_ID_BASE = 10000      # 記事IDの開始番号（URLの最後の部分）
+RELATED_LINKS = 3            # 本文中の関連記事へのリンク数
+PAGE_CACHE_SIZE = 2048       # 生成したページをキャッシュする数
+
+JST = timezone(timedelta(hours=9))
+FIRST_POST = datetime(2020, 1, 1, 9, 0, tzinfo=JST)
+POST_INTERVAL = timedelta(hours=7)
+
+# (スラッグ, 名前, [(サブカテゴリーのスラッグ, 名前)])
+CATEGORIES = [
+    ('programming', 'プログラミング', [('python', 'Python'), ('javascript', 'JavaScript'), ('go', 'Go')]),
+    ('books', '読書', [('business', 'ビジネス書'), ('novel', '小説'), ('tech-books', '技術書')]),
+    ('life', '暮らし', [('money', 'お金'), ('health', '健康'), ('travel', '旅行')]),
+    ('career', 'キャリア', [('engineer', 'エンジニア'), ('study', '勉強法')]),
+]
+
+TAGS = [
+    ('beginner', '初心者向け'), ('review', 'レビュー'), ('tips', 'Tips'), ('django', 'Django'),
+    ('asyncio', 'asyncio'), ('sqlite', 'SQLite'), ('reading-log', '読書記録'), ('productivity', '生産性'),
+    ('investment', '投資'), ('remote-work', 'リモートワーク'), ('book-summary', '要約'), ('tools', 'ツール'),
+]
+
+NOUNS = [
+    'プログラミング', '読書', '習慣', '設計', '開発', '仕事', '時間', '効率', '学習', 'データベース',
+    '非同期処理', 'テスト', '本', '著者', '考え方', '生活', '目標', '計画', '投資', '健康',
+    'エンジニア', 'キャリア', '経験', '知識', '技術', 'コード', 'チーム', '問題', '解決', '方法',
+]
+VERBS = ['学びました', '試しました', '考えました', '続けています', '紹介します', '見直しました', '整理しました', 'まとめました']
+ADJECTIVES = ['大切な', '新しい', '便利な', '難しい', '面白い', 'シンプルな', '実践的な', '身近な']
+AUTHORS = ['山田太郎', '佐藤花子', '鈴木一郎', '田中美咲', '高橋健', '伊藤さくら']
+BOOK_WORDS = ['入門', '実践', '思考法', '習慣', '技術', '教科書', '超整理術', '大全']
+EXTERNAL_SITES = ['https://docs.python.org/ja/3/', 'https://www.example.com/', 'https://developer.mozilla.org/ja/']
+
+
+def _isbn10(rng):
+    """日本の出版社（978-4）の有効なISBN-10を作る"""
+    body = '4' + ''.join(str(rng.randrange(10)) for _ in range(8))
+    check = (11 - sum((10 - i) * int(d) for i, d in enumerate(body)) % 11) % 11
+    return body + ('X' if check == 10 else str(check))
+
+
+def _sentence(rng):
+    return (f"{rng.choice(ADJECTIVES)}{rng.choice(NOUNS)}について、"
+            f"{rng.choice(NOUNS)}の観点から{rng.choice(VERBS)}。")
+
+
+def _http_date(moment):
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+class SyntheticSite:
+    """記事数とシードから決定的に生成される合成サイト
+
+    Args:
+        num_articles (int): 記事数
+        seed (int): 乱数のシード
+        base_url (str): ページ内の絶対URL（サイトマップなど）に使うURL
+    """
+
+    def __init__(self, num_articles=DEFAULT_ARTICLES, seed=DEFAULT_SEED, base_url=f"http://127.0.0.1:{DEFAULT_PORT}/"):
+        self.num_articles = num_articles
+        self.seed = seed
+        self.base_url = base_url.rstrip('/')
+        self._subcategories = [(cat, sub) for cat in CATEGORIES for sub in cat[2]]
+        self._tag_index = None
+        self.render = lru_cache(maxsize=PAGE_CACHE_SIZE)(self._render)
+
+    # --- 記事の属性（本文を生成せずに求められるもの） ---
+
+    def article_path(self, i):
+        (cat_slug, _, _), (sub_slug, _) = self._subcategories[i % len(self._subcategories)]
+        return f"/{cat_slug}/{sub_slug}/{ARTICLE_ID_BASE + i}/"
+
+    def article_index(self, path):
+        """記事のパスから記事番号を返す（記事でなければ None）"""
+        parts = path.strip('/').split('/')
+        if len(parts) != 3 or not parts[2].isdigit():
+            return None
+        i = int(parts[2]) - ARTICLE_ID_BASE
+        if 0 <= i < self.num_articles and self.article_path(i) == path:
+            return i
+        return None
+
+    def published(self, i):
+        return FIRST_POST + POST_INTERVAL * i
+
+    def modified(self, i):
+        # 3記事に1記事は公開後に更新されている
+        rng = random.Random(f"{self.seed}:modified:{i}")
+        return self.published(i) + (timedelta(days=rng.randint(1, 90)) if i % 3 == 0 else timedelta())
+
+    def tags(self, i):
+        rng = random.Random(f"{self.seed}:tags:{i}")
+        return rng.sample(TAGS, rng.randint(1, 3))
+
+    def tag_index(self):
+        """タグのスラッグ -> 記事番号のリスト（新しい順）"""
+        if self._tag_index is None:
+            index = {slug: [] for slug, _ in TAGS}
+            for i in reversed(range(self.num_articles)):
+                for slug, _ in self.tags(i):
+                    index[slug].append(i)
+            self._tag_index = index
+        return self._tag_index
+
+    # --- ページの生成 ---
+
+    def _layout(self, title, body, head=''):
+        nav = ''.join(
+            f'<li><a href="/category/{slug}/">{escape(name)}</a></li>' for slug, name, _ in CATEGORIES
+        )
+        return (
+            '<!DOCTYPE html>\n<html lang="ja"><head><meta charset="utf-8">'
+            f'<title>{escape(title)} | セッテン</title>{head}</head><body>'
+            f'<header><a href="/">セッテン</a><nav><ul>{nav}</ul></nav></header>'
+            f'<main>{body}</main>'
+            '<footer><a href="/privacy-policy/">プライバシーポリシー</a> '
+            '<a href="/contact/">お問い合わせ</a> <a href="/feed/">RSS</a></footer>'
+            '</body></html>'
+        )
+
+    def _article_html(self, i):
+        rng = random.Random(f"{self.seed}:article:{i}")
+        (cat_slug, cat_name, _), (sub_slug, sub_name) = self._subcategories[i % len(self._subcategories)]
+        title = f"{rng.choice(ADJECTIVES)}{rng.choice(NOUNS)}と{rng.choice(NOUNS)}の話（{ARTICLE_ID_BASE + i}）"
+        published = self.published(i)
+        modified = self.modified(i)
+
+        head = (
+            f'<meta property="og:title" content="{escape(title)}">'
+            f'<meta property="article:published_time" content="{published.isoformat()}">'
+            f'<meta property="article:modified_time" content="{modified.isoformat()}">'
+        )
+
+        content = []
+        for _ in range(rng.randint(2, 4)):
+            content.append(f'<p>{"".join(_sentence(rng) for _ in range(rng.randint(2, 5)))}</p>')
+            content.append(f'<h2>{escape(rng.choice(NOUNS))}の{escape(rng.choice(NOUNS))}</h2>')
+            for _ in range(rng.randint(1, 3)):
+                content.append(f'<p>{"".join(_sentence(rng) for _ in range(rng.randint(1, 4)))}</p>')
+            if rng.random() < 0.5:
+                content.append(f'<h3>{escape(rng.choice(NOUNS))}のポイント</h3>')
+                content.append(f'<p>{_sentence(rng)}</p>')
+
+        if cat_slug == 'books' or rng.random() < 0.3:
+            isbn10 = _isbn10(rng)
+            isbn13 = isbn10_to_isbn13(isbn10)
+            book = f"{rng.choice(NOUNS)}{rng.choice(BOOK_WORDS)}"
+            content.append(
+                f'<p><strong>{escape(book)} 著者：{rng.choice(AUTHORS)}</strong></p>'
+                f'<p>ISBN：{isbn13[:3]}-{isbn13[3]}-{isbn13[4:8]}-{isbn13[8:12]}-{isbn13[12]}</p>'
+                f'<p><a href="https://www.amazon.co.jp/dp/{isbn10}/">Amazonで見る</a></p>'
+            )
+
+        related = rng.sample(range(self.num_articles), min(RELATED_LINKS, self.num_articles))
+        links = ''.join(
+            f'<li><a href="{self.article_path(j)}">関連記事 {ARTICLE_ID_BASE + j}</a></li>' for j in related
+        )
+        content.append(f'<h3>関連記事</h3><ul>{links}</ul>')
+        content.append(f'<p>参考: <a href="{rng.choice(EXTERNAL_SITES)}">外部の資料</a></p>')
+        content.append(
+            f'<p><a href="/wp-content/uploads/{published:%Y/%m}/image-{i}.jpg"><img src="/wp-content/uploads/{published:%Y/%m}/image-{i}.jpg" alt=""></a>'
+            f'<a href="{self.article_path(i)}?replytocom={i}">返信</a></p>'
+        )
+
+        tags = ''.join(f'<a href="/tag/{slug}/" rel="tag">{escape(name)}</a>' for slug, name in self.tags(i))
+        body = (
+            f'<article><h1 class="entry-title">{escape(title)}</h1>'
+            f'<div class="entry-meta"><time class="entry-date" datetime="{published.isoformat()}">'
+            f'{published:%Y年%m月%d日}</time>'
+            f'<span class="cat-links"><a href="/category/{cat_slug}/">{escape(cat_name)}</a>'
+            f'<a href="/category/{cat_slug}/{sub_slug}/">{escape(sub_name)}</a></span></div>'
+            f'<div class="entry-content">{"".join(content)}</div>'
+            f'<footer class="entry-footer"><span class="tags-links">{tags}</span></footer></article>'
+        )
+        return self._layout(title, body, head), modified
+
+    def _listing_html(self, title, base_path, articles, page):
+        """記事の一覧（新しい順の記事番号のリスト）のページ。存在しないページは None"""
+        pages = max(1, -(-len(articles) // POSTS_PER_PAGE))
+        if page < 1 or page > pages:
+            return None
+        start = (page - 1) * POSTS_PER_PAGE
+        items = ''.join(
+            f'<article><h2 class="entry-title"><a href="{self.article_path(i)}">記事 {ARTICLE_ID_BASE + i}</a></h2></article>'
+            for i in articles[start:start + POSTS_PER_PAGE]
+        )
+        nav = []
+        if page > 1:
+            prev_path = base_path if page == 2 else f"{base_path}page/{page - 1}/"
+            nav.append(f'<a class="prev page-numbers" href="{prev_path}">前へ</a>')
+        if page < pages:
+            nav.append(f'<a class="next page-numbers" href="{base_path}page/{page + 1}/">次へ</a>')
+        body = f'<h1 class="page-title">{escape(title)}</h1>{items}<nav class="pagination">{"".join(nav)}</nav>'
+        latest = max((self.modified(i) for i in articles[start:start + POSTS_PER_PAGE]), default=FIRST_POST)
+        return self._layout(title, body), latest
+
+    def _listing(self, path):
+        """一覧ページのパスを解釈して (タイトル, 一覧のパス, 記事番号のリスト, ページ番号) を返す"""
+        parts = path.strip('/').split('/')
+        page = 1
+        if len(parts) >= 2 and parts[-2] == 'page' and parts[-1].isdigit():
+            page = int(parts[-1])
+            parts = parts[:-2]
+        newest_first = range(self.num_articles - 1, -1, -1)
+
+        if parts == [''] or not parts:
+            return 'セッテン', '/', newest_first, page
+        if parts[0] == 'category' and len(parts) in (2, 3):
+            for c, (cat, sub) in enumerate(self._subcategories):
+                if cat[0] != parts[1] or (len(parts) == 3 and sub[0] != parts[2]):
+                    continue
+                n = len(self._subcategories)
+                if len(parts) == 3:
+                    members = [i for i in newest_first if i % n == c]
+                    return sub[1], f"/category/{parts[1]}/{parts[2]}/", members, page
+                members = [i for i in newest_first if self._subcategories[i % n][0][0] == parts[1]]
+                return cat[1], f"/category/{parts[1]}/", members, page
+            return None
+        if parts[0] == 'tag' and len(parts) == 2 and parts[1] in self.tag_index():
+            name = dict(TAGS)[parts[1]]
+            return name, f"/tag/{parts[1]}/", self.tag_index()[parts[1]], page
+        return None
+
+    def _sitemaps(self):
+        return -(-self.num_articles // SITEMAP_PAGE_SIZE)
+
+    def _sitemap_index(self):
+        entries = ''.join(
+            f'<sitemap><loc>{self.base_url}/wp-sitemap-posts-post-{n}.xml</loc></sitemap>'
+            for n in range(1, self._sitemaps() + 1)
+        )
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>')
+
+    def _sitemap(self, n):
+        start = (n - 1) * SITEMAP_PAGE_SIZE
+        entries = ''.join(
+            f'<url><loc>{self.base_url}{self.article_path(i)}</loc>'
+            f'<lastmod>{self.modified(i).isoformat()}</lastmod></url>'
+            for i in range(start, min(start + SITEMAP_PAGE_SIZE, self.num_articles))
+        )
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>')
+
+    def _render(self, path):
+        """パスのページを生成する
+
+        Returns:
+            tuple: (Content-Type, 本文のバイト列, 最終更新日時)。ページがなければ None
+        """
+        if path == '/robots.txt':
+            text = f"User-agent: *\nDisallow: /wp-admin/\n\nSitemap: {self.base_url}/wp-sitemap.xml\n"
+            return 'text/plain', text.encode('utf-8'), FIRST_POST
+        if path == '/wp-sitemap.xml':
+            return 'application/xml', self._sitemap_index().encode('utf-8'), self.modified(self.num_articles - 1)
+        if path.startswith('/wp-sitemap-posts-post-') and path.endswith('.xml'):
+            number = path[len('/wp-sitemap-posts-post-'):-len('.xml')]
+            if number.isdigit() and 1 <= int(number) <= self._sitemaps():
+                return 'application/xml', self._sitemap(int(number)).encode('utf-8'), FIRST_POST
+            return None
+        if path.startswith('/wp-content/'):
+            return 'image/jpeg', b'\xff\xd8\xff\xe0' + bytes(2048), FIRST_POST
+        if path.rstrip('/') == '/feed':
+            return 'application/rss+xml', b'<?xml version="1.0"?><rss version="2.0"></rss>', FIRST_POST
+        if path in ('/privacy-policy/', '/contact/'):
+            return 'text/html; charset=utf-8', self._layout('固定ページ', '<p>固定ページ</p>').encode('utf-8'), FIRST_POST
+
+        i = self.article_index(path)
+        if i is not None:
+            html, modified = self._article_html(i)
+            return 'text/html; charset=utf-8', html.encode('utf-8'), modified
+
+        listing = self._listing(path)
+        if listing is not None:
+            page = self._listing_html(*listing)
+            if page is not None:
+                return 'text/html; charset=utf-8', page[0].encode('utf-8'), page[1]
+        return None
+
+    def paths(self):
+        """サイトのすべてのページのパス（静的ファイルへの書き出し用）"""
+        yield '/robots.txt'
+        yield '/wp-sitemap.xml'
+        for n in range(1, self._sitemaps() + 1):
+            yield f'/wp-sitemap-posts-post-{n}.xml'
+        for i in range(self.num_articles):
+            yield self.article_path(i)
+        listings = ['/'] + [f"/category/{slug}/" for slug, _, _ in CATEGORIES]
+        listings += [f"/category/{cat[0]}/{sub[0]}/" for cat, sub in self._subcategories]
+        listings += [f"/tag/{slug}/" for slug, _ in TAGS]
+        for base in listings:
+            listing = self._listing(base)
+            pages = max(1, -(-len(listing[2]) // POSTS_PER_PAGE)) if listing else 0
+            yield base
+            for page in range(2, pages + 1):
+                yield f"{base}page/{page}/"
+
+
+class ServerStats:
+    """合成サイトのサーバーが返した応答の集計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.bytes_sent = 0
+
+    def record(self, status, size=0):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_sent += size
+
+    def as_dict(self):
+        return {'requests': self.requests, 'statuses': self.statuses, 'bytes_sent': self.bytes_sent}
+
+
+def make_app(site, latency=0.0, jitter=0.5, error_rate=0.0, max_rate=None, seed=DEFAULT_SEED, compress=True):
+    """合成サイトを配信する aiohttp のアプリケーションを作る
+
+    Args:
+        site (SyntheticSite): 配信するサイト
+        latency (float): 1リクエストあたりの平均応答時間（秒）
+        jitter (float): 応答時間のばらつき（latency に対する割合）
+        error_rate (float): 500 / 502 / 503 を返す割合
+        max_rate (float): 1秒あたりに処理するリクエスト数の上限。超えた分は 429（Retry-After 付き）を返す
+        seed (int): 応答時間とエラーを決める乱数のシード
+        compress (bool): Accept-Encoding に応じて本文を圧縮する
+    """
+    from aiohttp import web
+
+    rng = random.Random(seed)
+    stats = ServerStats()
+    window = []  # 直近1秒に処理したリクエストの時刻
+
+    async def handle(request):
+        loop = asyncio.get_running_loop()
+        if request.path == '/__stats__':
+            return web.json_response(stats.as_dict())
+
+        if max_rate:
+            now = loop.time()
+            cutoff = bisect_right(window, now - 1.0)
+            del window[:cutoff]
+            if len(window) >= max_rate:
+                stats.record(429)
+                return web.Response(status=429, headers={'Retry-After': '1'})
+            window.append(now)
+
+        if latency:
+            await asyncio.sleep(max(0.0, latency * (1 + rng.uniform(-jitter, jitter))))
+        if error_rate and request.path != '/robots.txt' and rng.random() < error_rate:
+            status = rng.choice((500, 502, 503))
+            stats.record(status)
+            return web.Response(status=status)
+
+        # クローラーは末尾のスラッシュを除いたURLで取得するため、どちらの形でも同じページを返す
+        path = request.path
+        if not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+            path += '/'
+        page = site.render(path)
+        if page is None:
+            stats.record(404)
+            return web.Response(status=404, text='Not Found')
+        content_type, body, modified = page
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        headers = {'ETag': etag, 'Last-Modified': _http_date(modified)}
+
+        if request.headers.get('If-None-Match') == etag:
+            stats.record(304)
+            return web.Response(status=304, headers=headers)
+        since = request.headers.get('If-Modified-Since')
+        if since and 'If-None-Match' not in request.headers:
+            try:
+                if modified.replace(microsecond=0) <= parsedate_to_datetime(since):
+                    stats.record(304)
+                    return web.Response(status=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+
+        headers['Content-Type'] = content_type
+        response = web.Response(body=body, headers=headers)
+        if compress:
+            response.enable_compression()
+        stats.record(200, len(body))
+        return response
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_get('/{tail:.*}', handle)
+    return app
+
+
+def write_site(site, output_dir):
+    """合成サイトを静的ファイルとして書き出す（ディレクトリのパスは index.html にする）"""
+    count = 0
+    for path in site.paths():
+        page = site.render(path)
+        if page is None:
+            continue
+        target = os.path.join(output_dir, path.lstrip('/'))
+        if path.endswith('/'):
+            target = os.path.join(target, 'index.html')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(page[1])
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成サイトの生成とローカルサーバー")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+
+    serve_parser = subparsers.add_parser("serve", help="合成サイトを配信する")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"ポート番号（デフォルト: {DEFAULT_PORT}）")
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="平均応答時間（秒）")
+    serve_parser.add_argument("--jitter", type=float, default=0.5, help="応答時間のばらつき（平均に対する割合）")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="5xxを返す割合")
+    serve_parser.add_argument("--max-rate", type=float, default=None, help="1秒あたりの処理数の上限（超えると429）")
+    serve_parser.add_argument("--no-compress", action="store_true", help="gzip圧縮を行わない")
+
+    generate_parser = subparsers.add_parser("generate", help="合成サイトを静的ファイルとして書き出す")
+    generate_parser.add_argument("output", help="出力先のディレクトリ")
+    generate_parser.add_argument("--base-url", default=f"http://127.0.0.1:{DEFAULT_PORT}/",
+                                 help="サイトマップなどに書き込むURL")
+
+    for sub in (serve_parser, generate_parser):
+        sub.add_argument("--articles", type=int, default=DEFAULT_ARTICLES, help=f"記事数（デフォルト: {DEFAULT_ARTICLES}）")
+        sub.add_argument("--seed", type=int, default=DEFAULT_SEED, help="乱数のシード")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        from aiohttp import web
+
+        site = SyntheticSite(args.articles, args.seed, f"http://{args.host}:{args.port}/")
+        app = make_app(site, args.latency, args.jitter, args.error_rate, args.max_rate, args.seed,
+                       compress=not args.no_compress)
+        print(f"合成サイト（{args.articles}記事）を配信します: http://{args.host}:{args.port}/")
+        web.run_app(app, host=args.host, port=args.port, print=None, access_log=None)
+    elif args.command == "generate":
+        count = write_site(SyntheticSite(args.articles, args.seed, args.base_url), args.output)
+        print(f"{count}ページを {args.output} に書き出しました")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
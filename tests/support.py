@@ -0,0 +1,90 @@
+"""テストで使う合成サイトのサーバーとクローラーの実行"""
+
+import contextlib
+import importlib
+import io
+import os
+import socket
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from synthetic_site import SyntheticSite, make_app
+
+TEST_RATE = 1000.0  # テストではレート制御で待たない
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SiteServer:
+    """合成サイトをローカルで配信する（async with で起動・停止する）"""
+
+    def __init__(self, num_articles=40, **app_options):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}/"
+        self.site = SyntheticSite(num_articles=num_articles, base_url=self.base_url)
+        self.app = make_app(self.site, **app_options)
+        self.app.middlewares.append(self._record)
+        self.server = TestServer(self.app, host='127.0.0.1', port=self.port)
+        self.requests = []  # 受け付けたリクエストのパス
+
+    @web.middleware
+    async def _record(self, request, handler):
+        self.requests.append(request.path)
+        return await handler(request)
+
+    def article_requests(self):
+        """記事ページへのリクエストのパス（末尾のスラッシュ付きに揃える）"""
+        paths = (path if path.endswith('/') else path + '/' for path in self.requests)
+        return [path for path in paths if self.site.article_index(path) is not None]
+
+    @property
+    def stats(self):
+        return self.app['stats']
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
+
+
+def fresh_crawler(base_url):
+    """モジュールの状態（訪問済みURL・検証子など）を初期化したクローラーを返す"""
+    import crawl_setten
+    crawler = importlib.reload(crawl_setten)
+    crawler.configure_site(base_url)
+    crawler.MAX_RATE = crawler.INITIAL_RATE = TEST_RATE
+    return crawler
+
+
+async def run_crawl(base_url, mode='crawl', **options):
+    """新しい状態のクローラーで1回クロールし、(クローラーのモジュール, 実行結果の集計) を返す"""
+    crawler = fresh_crawler(base_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = await crawler.main(mode, **options)
+    return crawler, summary
+
+
+class TempDirMixin:
+    """一時ディレクトリをカレントディレクトリにしてテストを実行する（クローラーは相対パスに書き込む）"""
+
+    def enter_temp_dir(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        return tmp.name
+
+
+class CrawlTestCase(TempDirMixin, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.enter_temp_dir()
@@ -0,0 +1,50 @@
+"""article_extractor の抽出結果のテスト"""
+
+import os
+import unittest
+
+from article_extractor import extract_article
+from html_parser_backend import make_soup
+from synthetic_site import SyntheticSite
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+ARTICLE_URL = 'https://set-ten.com/career-life/lifeshift/763'
+ARTICLE_TITLE = '朝4時半起きで変わるエンジニアの習慣｜早起きで市場価値を高める5つのポイント'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class TitleTests(unittest.TestCase):
+    """タイトルは h1.entry-title から取り、内部リンクのテキストで上書きしない"""
+
+    def test_title_of_set_ten_article(self):
+        article = extract_article(make_soup(load_fixture('set-ten_article.html')), ARTICLE_URL)
+        self.assertEqual(article['title'], ARTICLE_TITLE)
+        # 内部リンクは収集される（最後の内部リンクは画像のリンクでテキストがない）
+        self.assertEqual(article['internal_links'][-1]['text'], '（リンクテキストなし）')
+        self.assertIn(
+            'https://set-ten.com/career-life/lifeshift/621',
+            [link['url'] for link in article['internal_links']],
+        )
+
+    def test_title_of_synthetic_articles(self):
+        site = SyntheticSite(num_articles=20, base_url='https://set-ten.com/')
+        for i in range(site.num_articles):
+            path = site.article_path(i)
+            _, body, _ = site.render(path)
+            soup = make_soup(body)
+            article = extract_article(soup, site.base_url + path)
+            self.assertEqual(article['title'], soup.select_one('h1.entry-title').get_text(), path)
+            self.assertNotEqual(article['title'], '返信')
+
+    def test_page_without_entry_title(self):
+        html = '<html><body><div class="entry-content"><p>本文</p><a href="/a/b/1/">関連記事</a></div></body></html>'
+        article = extract_article(make_soup(html), 'https://set-ten.com/a/b/2/')
+        self.assertEqual(article['title'], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
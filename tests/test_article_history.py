@@ -0,0 +1,167 @@
+"""記事の履歴（差分による版管理）のテスト"""
+
+import sqlite3
+import unittest
+
+from article_history import (
+    DELTA, FULL, HISTORY_FIELDS, HISTORY_SCHEMA_SQL, KEYFRAME_INTERVAL,
+    import_legacy_history, keyframe_version, list_versions, reconstruct, record_versions, snapshot
+)
+from article_upsert import upsert_rows
+from crawl_setten import ARTICLES_TABLE_SQL
+
+URL = 'https://set-ten.com/a/b/1/'
+COLUMNS = ['url', *HISTORY_FIELDS, 'crawled_at']
+
+
+def crawl_time(i):
+    return f'2025-05-{1 + i // 24:02d}T{i % 24:02d}:00:00+09:00'
+
+
+def first_article():
+    article = {field: '' for field in HISTORY_FIELDS}
+    article.update(url=URL, title='早起きの習慣', content_intro='朝の時間を使う。', tags='習慣', word_count=100)
+    return article
+
+
+def edit(article, i):
+    """i 回目の保存で記事の一部のフィールドを変える（None にすることもある）"""
+    article = dict(article)
+    article['word_count'] = 100 + i
+    if i % 3 == 0:
+        article['title'] = f'早起きの習慣（{i}回目の更新）'
+    if i % 5 == 0:
+        article['tags'] = None if i % 10 == 0 else '習慣,朝活'
+    if i % 7 == 0:
+        article['content_intro'] = '朝の時間を使う。' * (i % 4 + 1)
+    return article
+
+
+class VersionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute(ARTICLES_TABLE_SQL)
+        self.conn.executescript(HISTORY_SCHEMA_SQL)
+        self.addCleanup(self.conn.close)
+
+    def save(self, article, crawled_at):
+        """クローラーと同じく、版を書き込んでから articles を更新する"""
+        count = record_versions(self.conn, [article], crawled_at)
+        upsert_rows(self.conn, 'articles', COLUMNS, [tuple({**article, 'crawled_at': crawled_at}[c] for c in COLUMNS)])
+        self.conn.commit()
+        return count
+
+    def test_keyframe_version(self):
+        self.assertEqual([keyframe_version(v) for v in (1, 2, 30, 31, 32, 60, 61)], [1, 1, 1, 31, 31, 31, 61])
+
+    def test_every_version_reconstructs_across_keyframes(self):
+        saves = KEYFRAME_INTERVAL * 2 + 5
+        article = first_article()
+        expected = {}  # 版 -> (記事の内容, 日時)
+        for i in range(saves):
+            if i:
+                article = edit(article, i)
+            if self.save(article, crawl_time(i)):
+                expected[len(expected) + 1] = (snapshot(article), crawl_time(i))
+        self.assertEqual(len(expected), saves)
+        self.assertGreater(len(expected), KEYFRAME_INTERVAL * 2)
+
+        versions = list_versions(self.conn, URL)
+        self.assertEqual([row[0] for row in versions], list(expected))
+        kinds = {version: kind for version, _, kind, _, _ in versions}
+        self.assertEqual([v for v, kind in kinds.items() if kind == FULL], [1, KEYFRAME_INTERVAL + 1, KEYFRAME_INTERVAL * 2 + 1])
+        # 差分の版には変わったフィールドだけが記録される
+        self.assertEqual(kinds[2], DELTA)
+        self.assertEqual(versions[1][3], 'word_count')
+        # 全フィールドを保存し直す版（v31）にも、変わったフィールドは記録される
+        self.assertEqual(versions[KEYFRAME_INTERVAL][3], 'title,tags,word_count')
+
+        for version, (fields, crawled_at) in expected.items():
+            with self.subTest(version=version):
+                self.assertEqual(reconstruct(self.conn, URL, version),
+                                 {'url': URL, 'version': version, 'crawled_at': crawled_at, **fields})
+        self.assertEqual(reconstruct(self.conn, URL)['version'], saves)
+        self.assertIsNone(reconstruct(self.conn, URL, saves + 1))
+        self.assertIsNone(reconstruct(self.conn, 'https://set-ten.com/a/b/2/'))
+
+    def test_unchanged_save_creates_no_version(self):
+        article = first_article()
+        self.assertEqual(self.save(article, crawl_time(0)), 1)
+        self.assertEqual(self.save(dict(article), crawl_time(1)), 0)
+        self.assertEqual(self.save(edit(article, 1), crawl_time(2)), 1)
+        self.assertEqual([(v, crawled_at) for v, crawled_at, *_ in list_versions(self.conn, URL)],
+                         [(1, crawl_time(0)), (2, crawl_time(2))])
+
+    def test_existing_article_without_versions_starts_with_full(self):
+        # 履歴の導入前に保存された記事は、最初の版で全フィールドを保存する
+        article = first_article()
+        upsert_rows(self.conn, 'articles', COLUMNS, [tuple({**article, 'crawled_at': crawl_time(0)}[c] for c in COLUMNS)])
+        self.assertEqual(self.save(edit(article, 1), crawl_time(1)), 1)
+        ((version, _, kind, changed_fields, _),) = list_versions(self.conn, URL)
+        self.assertEqual((version, kind), (1, FULL))
+        self.assertEqual(changed_fields.split(','), list(HISTORY_FIELDS))
+        self.assertEqual(reconstruct(self.conn, URL, 1)['word_count'], 101)
+
+
+class LegacyImportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+
+    def test_without_legacy_table(self):
+        self.assertEqual(import_legacy_history(self.conn), 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM article_versions").fetchone()[0], 0)
+
+    def test_import_legacy_history(self):
+        # 古いスキーマ: category_path ではなく category で、後から追加されたカラムがない
+        self.conn.execute("""
+            CREATE TABLE articles_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT, url TEXT, post_date TEXT, category TEXT,
+                content_intro TEXT, crawled_at TIMESTAMP, tags TEXT
+            )
+        """)
+        other = 'https://set-ten.com/a/b/2/'
+        history = [
+            # (url, title, category, content_intro, crawled_at, tags)。id の順と日時の順をずらしておく
+            (URL, '早起きの習慣（改訂）', '生活/朝', '朝の時間を使う。', crawl_time(2), '習慣'),
+            (URL, '早起きの習慣', '生活', '朝の時間を使う。', crawl_time(0), '習慣'),
+            (other, '読書ノート', '読書', 'ノートにまとめる。', crawl_time(1), ''),
+            (URL, '早起きの習慣', '生活', '朝の時間を使う。', crawl_time(1), '習慣'),  # 変更なし
+        ]
+        history += [
+            (URL, f'早起きの習慣（{i}）', '生活/朝', '朝の時間を使う。', crawl_time(i), '習慣')
+            for i in range(3, KEYFRAME_INTERVAL + 3)
+        ]
+        self.conn.executemany("""
+            INSERT INTO articles_history (url, title, category, content_intro, crawled_at, tags, post_date)
+            VALUES (?, ?, ?, ?, ?, ?, '2025-05-01')
+        """, history)
+        self.conn.commit()
+
+        self.assertEqual(import_legacy_history(self.conn), KEYFRAME_INTERVAL + 3)
+
+        self.assertEqual(len(list_versions(self.conn, other)), 1)
+        versions = list_versions(self.conn, URL)
+        self.assertEqual(len(versions), KEYFRAME_INTERVAL + 2)
+        self.assertEqual([row[1] for row in versions[:3]], [crawl_time(0), crawl_time(2), crawl_time(3)])
+        self.assertEqual(versions[1][3], 'title,category_path')
+        self.assertEqual(versions[KEYFRAME_INTERVAL][2], FULL)
+
+        first = reconstruct(self.conn, URL, 1)
+        self.assertEqual(first['title'], '早起きの習慣')
+        self.assertEqual(first['category_path'], '生活')
+        self.assertEqual(first['post_date'], '2025-05-01')
+        self.assertIsNone(first['book_title'])
+        self.assertEqual(reconstruct(self.conn, URL, 2)['category_path'], '生活/朝')
+        latest = reconstruct(self.conn, URL)
+        self.assertEqual(latest['version'], KEYFRAME_INTERVAL + 2)
+        self.assertEqual(latest['title'], f'早起きの習慣（{KEYFRAME_INTERVAL + 2}）')
+        self.assertEqual(latest['category_path'], '生活/朝')
+        self.assertEqual(latest['crawled_at'], crawl_time(KEYFRAME_INTERVAL + 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
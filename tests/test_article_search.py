@@ -0,0 +1,193 @@
+"""全文検索インデックス（FTS5 trigram）のテスト"""
+
+import sqlite3
+import unittest
+
+from article_search import (
+    FTS_TABLE, HIGHLIGHT, ensure_search_index, match_expression, rebuild_index, search
+)
+from article_upsert import upsert_rows
+from crawl_setten import ARTICLES_TABLE_SQL
+
+COLUMNS = ['title', 'url', 'content_intro', 'headings', 'tags', 'book_title', 'book_author', 'crawled_at']
+
+
+def article(i, title, content_intro='', **fields):
+    row = {
+        'title': title,
+        'url': f'https://set-ten.com/a/b/{i}/',
+        'content_intro': content_intro,
+        'headings': '',
+        'tags': '',
+        'book_title': '',
+        'book_author': '',
+        'crawled_at': '2025-05-24T10:00:00+09:00',
+    }
+    row.update(fields)
+    return tuple(row[column] for column in COLUMNS)
+
+
+ARTICLES = [
+    article(1, '早起きの習慣を作る方法', '朝の時間を有効に使うための工夫を紹介します。', tags='習慣,朝活'),
+    article(2, '読書ノートの書き方', '本を読んだら要点をノートにまとめます。',
+            book_title='知的生産の技術', book_author='梅棹忠夫'),
+    article(3, '手帳で一日を振り返る', '夜に手帳を開いて一日を振り返ります。', headings='振り返りの手順'),
+]
+
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(ARTICLES_TABLE_SQL)
+        self.addCleanup(self.conn.close)
+
+    def upsert(self, rows):
+        result = upsert_rows(self.conn, 'articles', COLUMNS, rows)
+        self.conn.commit()
+        return result
+
+    def indexed_ids(self, term):
+        """インデックスだけを引いて一致した rowid を返す（articles との結合で消えた行を隠さない）"""
+        rows = self.conn.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? ORDER BY rowid",
+            (match_expression([term], ['title', 'content_intro', 'headings', 'tags', 'book_title', 'book_author']),)
+        )
+        return [rowid for rowid, in rows]
+
+    def assertIndexConsistent(self):
+        # 外部コンテンツ表のインデックスが articles の内容と一致しているか FTS5 自身に検査させる
+        self.conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+
+    def titles(self, keyword, field='all'):
+        return [row['title'] for row in search(self.conn, keyword, field)]
+
+
+class TriggerTests(SearchIndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ensure_search_index(self.conn)
+
+    def test_insert_update_delete_are_indexed(self):
+        self.assertEqual(self.upsert(ARTICLES)['inserted'], 3)
+        self.assertEqual(self.indexed_ids('早起き'), [1])
+        self.assertIndexConsistent()
+
+        # 更新すると古い内容は索引から消え、新しい内容で引ける
+        result = self.upsert([article(1, '夜型から朝型に変える方法', '朝の時間を有効に使うための工夫を紹介します。')])
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(self.indexed_ids('早起き'), [])
+        self.assertEqual(self.indexed_ids('朝型に'), [1])
+        self.assertIndexConsistent()
+
+        # 内容が変わらない UPSERT はインデックスに触れない
+        self.assertEqual(self.upsert([ARTICLES[1]])['unchanged'], 1)
+        self.assertEqual(self.indexed_ids('梅棹忠'), [2])
+
+        self.conn.execute("DELETE FROM articles WHERE id = 2")
+        self.conn.commit()
+        self.assertEqual(self.indexed_ids('梅棹忠'), [])
+        self.assertEqual(self.indexed_ids('ノート'), [])
+        self.assertIndexConsistent()
+
+    def test_search_after_upsert_update_and_delete(self):
+        self.upsert(ARTICLES)
+        self.assertEqual(self.titles('一日を'), ['手帳で一日を振り返る'])
+
+        self.upsert([article(3, '日記で一日を振り返る', '夜に日記を書いて一日を振り返ります。', headings='振り返りの手順')])
+        self.assertEqual(self.titles('手帳で'), [])
+        self.assertEqual(self.titles('日記で'), ['日記で一日を振り返る'])
+
+        self.conn.execute("DELETE FROM articles WHERE url = ?", (ARTICLES[2][1],))
+        self.conn.commit()
+        self.assertEqual(self.titles('一日を'), [])
+        self.assertEqual(self.titles('振り返'), [])
+        self.assertEqual(self.titles('ノートに'), ['読書ノートの書き方'])
+
+
+class SearchTests(SearchIndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ensure_search_index(self.conn)
+        self.upsert(ARTICLES)
+
+    def test_trigram_match(self):
+        results = search(self.conn, '振り返')
+        self.assertEqual([row['id'] for row in results], [3])
+        self.assertIsNotNone(results[0]['score'])
+        self.assertIn(HIGHLIGHT[0] + '振り返' + HIGHLIGHT[1], results[0]['snippet'])
+        # 複数の語はすべてを含む記事に一致する
+        self.assertEqual(self.titles('本を読 ノートに'), ['読書ノートの書き方'])
+        self.assertEqual(self.titles('本を読 振り返'), [])
+
+    def test_title_is_ranked_above_content(self):
+        # 本文だけに一致する記事を先に保存しても、タイトルに一致する記事が上に来る
+        self.upsert([
+            article(4, '朝の散歩', '散歩を習慣づくりの第一歩にします。'),
+            article(5, '続ける習慣づくり', '小さく始めて続けます。'),
+        ])
+        self.assertEqual(self.titles('習慣づくり'), ['続ける習慣づくり', '朝の散歩'])
+
+    def test_field(self):
+        self.assertEqual(self.titles('梅棹忠夫', 'book'), ['読書ノートの書き方'])
+        self.assertEqual(self.titles('梅棹忠夫', 'title'), [])
+        self.assertEqual(self.titles('振り返りの', 'headings'), ['手帳で一日を振り返る'])
+
+    def test_symbols_are_not_operators(self):
+        self.assertEqual(self.titles('"OR" NEAR('), [])
+        self.assertEqual(self.titles('"'), [])
+
+    def test_like_fallback_for_short_terms(self):
+        # 2文字以下の語は trigram の索引を引けないため LIKE で探す（新しい順）
+        results = search(self.conn, '朝')
+        self.assertEqual([row['id'] for row in results], [1])
+        self.assertIsNone(results[0]['score'])
+        self.assertEqual(self.titles('手帳'), ['手帳で一日を振り返る'])
+        self.assertEqual(self.titles('習慣', 'tags'), ['早起きの習慣を作る方法'])
+        self.assertEqual(self.titles('習慣', 'content'), [])
+        self.assertEqual([row['id'] for row in search(self.conn, 'の')], [3, 2, 1])
+        # 3文字以上の語と混ざっていても LIKE で両方を含む記事を探す
+        self.assertEqual(self.titles('夜 振り返'), ['手帳で一日を振り返る'])
+        # LIKE のワイルドカードは文字として扱う
+        self.assertEqual(self.titles('%'), [])
+        self.assertEqual(self.titles('_'), [])
+
+    def test_empty_keyword(self):
+        self.assertEqual(search(self.conn, '  '), [])
+
+
+class RebuildTests(SearchIndexTestCase):
+
+    def test_index_created_for_existing_articles(self):
+        # インデックスを作る前に保存した記事も索引される
+        self.upsert(ARTICLES)
+        self.assertTrue(ensure_search_index(self.conn))
+        self.assertFalse(ensure_search_index(self.conn))
+        self.assertEqual(self.titles('早起き'), ['早起きの習慣を作る方法'])
+        self.assertIndexConsistent()
+
+    def test_rebuild(self):
+        ensure_search_index(self.conn)
+        self.upsert(ARTICLES)
+        # トリガーを外して変更し、インデックスを古い状態にする
+        self.conn.execute(f"DROP TRIGGER {FTS_TABLE}_au")
+        self.conn.execute("UPDATE articles SET title = '夜型から朝型に変える方法' WHERE id = 1")
+        self.conn.commit()
+        self.assertEqual(self.indexed_ids('朝型に'), [])
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.assertIndexConsistent()
+
+        self.assertEqual(rebuild_index(self.conn), 3)
+        self.assertEqual(self.indexed_ids('朝型に'), [1])
+        self.assertEqual(self.indexed_ids('早起き'), [])
+        self.assertIndexConsistent()
+        # 外したトリガーも作り直される
+        self.conn.execute("UPDATE articles SET title = '早起きの習慣を作る方法' WHERE id = 1")
+        self.assertEqual(self.indexed_ids('早起き'), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
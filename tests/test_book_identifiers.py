@@ -0,0 +1,72 @@
+"""書籍識別子（ISBN / ASIN）の検出のテスト"""
+
+import unittest
+
+from book_identifiers import (
+    is_valid_isbn10, is_valid_isbn13, isbn10_to_isbn13, normalize_isbn, scan_identifiers
+)
+
+ISBN13 = '9780306406157'
+ISBN10 = '0306406152'  # ISBN13 と同じ本
+
+
+class ChecksumTests(unittest.TestCase):
+
+    def test_isbn13(self):
+        self.assertTrue(is_valid_isbn13(ISBN13))
+        self.assertFalse(is_valid_isbn13('9780306406158'))  # チェックディジットが違う
+        self.assertFalse(is_valid_isbn13('1230306406157'))  # 978 / 979 で始まらない
+        self.assertFalse(is_valid_isbn13(ISBN10))
+
+    def test_isbn10(self):
+        self.assertTrue(is_valid_isbn10(ISBN10))
+        self.assertTrue(is_valid_isbn10('080442957X'))  # チェックディジットが X
+        self.assertFalse(is_valid_isbn10('0306406153'))
+        self.assertFalse(is_valid_isbn10('X306406152'))
+
+    def test_normalize(self):
+        self.assertEqual(isbn10_to_isbn13(ISBN10), ISBN13)
+        self.assertEqual(normalize_isbn('978-0-306-40615-7'), ISBN13)
+        self.assertEqual(normalize_isbn('0-306-40615-2'), ISBN13)
+        self.assertEqual(normalize_isbn('0-8044-2957-X'), '9780804429573')
+        self.assertIsNone(normalize_isbn('978-0-306-40615-8'))
+        self.assertIsNone(normalize_isbn(''))
+
+
+class ScanIdentifiersTests(unittest.TestCase):
+
+    def test_hyphenated_isbn13(self):
+        for text in ('ISBN978-0-306-40615-7', 'ISBN-13：978‐0‐306‐40615‐7', '書籍 978-0-306-40615-7 です'):
+            with self.subTest(text=text):
+                self.assertEqual(scan_identifiers(text), {'isbn': [ISBN13], 'asin': []})
+
+    def test_invalid_checksum_is_rejected(self):
+        self.assertEqual(scan_identifiers('ISBN 978-0-306-40615-8'), {'isbn': [], 'asin': []})
+        self.assertEqual(scan_identifiers('ISBN-10: 0-306-40615-3'), {'isbn': [], 'asin': []})
+
+    def test_labelled_isbn10(self):
+        self.assertEqual(scan_identifiers('ISBN-10: 0-306-40615-2')['isbn'], [ISBN13])
+        self.assertEqual(scan_identifiers('ISBN 080442957X')['isbn'], ['9780804429573'])
+
+    def test_unlabelled_ten_digits_are_ignored(self):
+        # チェックディジットが合っていても「ISBN」の表記がなければ電話番号などとみなす
+        self.assertTrue(is_valid_isbn10(ISBN10))
+        self.assertEqual(scan_identifiers(f'お問い合わせ {ISBN10} まで'), {'isbn': [], 'asin': []})
+
+    def test_amazon_url(self):
+        text = f'https://www.amazon.co.jp/%E6%9C%AC/dp/{ISBN10}/ref=sr_1_1 と https://amazon.com/gp/product/B01N5IB20Q'
+        self.assertEqual(scan_identifiers(text), {'isbn': [ISBN13], 'asin': [ISBN10, 'B01N5IB20Q']})
+
+    def test_asin_label(self):
+        self.assertEqual(scan_identifiers('ASIN: B01N5IB20Q'), {'isbn': [], 'asin': ['B01N5IB20Q']})
+        # B で始まらず ISBN-10 としても無効な値は ASIN とみなさない
+        self.assertEqual(scan_identifiers('ASIN: 0306406153'), {'isbn': [], 'asin': []})
+
+    def test_duplicates_are_merged_in_order(self):
+        # ISBN-10 と ISBN-13 の表記が混在しても同じ本は1件になる
+        text = f'ISBN 9780804429573 / ISBN {ISBN13} / ISBN-10 {ISBN10} / ISBN-10 0-8044-2957-X'
+        self.assertEqual(scan_identifiers(text)['isbn'], ['9780804429573', ISBN13])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""クロール状態のチェックポイントと --resume のテスト"""
+
+import sqlite3
+import unittest
+
+from article_extractor import normalize_url
+from crawl_setten import DB_FILE, FINGERPRINT_PREFIX
+from crawl_state import CrawlState
+from tests.support import CrawlTestCase, SiteServer, run_crawl
+
+
+class CheckpointTests(CrawlTestCase):
+
+    async def test_validators_and_sitemap_lastmods_round_trip(self):
+        state = CrawlState()
+        lastmods = {'https://set-ten.com/a/b/1/': '2025-05-24T10:00:00+09:00'}
+        await state.reset('sitemap', lastmods)
+        validator = ('"etag"', 'Sat, 24 May 2025 01:00:00 GMT', None, lastmods['https://set-ten.com/a/b/1/'],
+                     f'{FINGERPRINT_PREFIX}abc', '[]')
+        state.add_url('https://set-ten.com/a/b/1/')
+        state.add_url('https://set-ten.com/a/b/2/')
+        state.add_validator('https://set-ten.com/a/b/1/', validator)
+        state.add_validator('https://set-ten.com/a/b/2/', validator)
+        await state.checkpoint({})
+
+        loaded = await state.load()
+        self.assertEqual(loaded['sitemap_lastmods'], lastmods)
+        self.assertEqual(set(loaded['validators']), {'https://set-ten.com/a/b/1/', 'https://set-ten.com/a/b/2/'})
+        self.assertEqual(loaded['validators']['https://set-ten.com/a/b/1/'], validator)
+
+        # DBに保存した検証子はチェックポイントから外れる
+        state.mark_validators_saved(['https://set-ten.com/a/b/2/'])
+        await state.checkpoint({})
+        self.assertEqual(list((await state.load())['validators']), ['https://set-ten.com/a/b/1/'])
+
+    async def test_resume_keeps_sitemap_lastmods_and_validators(self):
+        async with SiteServer(num_articles=10) as server:
+            site = server.site
+            urls = [normalize_url(site.base_url + site.article_path(i)) for i in range(10)]
+            lastmods = {url: site.modified(i).isoformat() for i, url in enumerate(urls)}
+
+            # サイトマップモードで1記事目（内容の指紋が一致した記事）まで処理して中断した状態
+            state = CrawlState()
+            await state.reset('sitemap', lastmods)
+            for url in urls:
+                state.add_url(url)
+            state.add_validator(urls[0], ('"etag-0"', None, None, lastmods[urls[0]], f'{FINGERPRINT_PREFIX}abc', '[]'))
+            state.mark_done(urls[0])
+            await state.checkpoint({})
+
+            _, summary = await run_crawl(server.base_url, resume=True)
+
+        self.assertEqual(summary['articles'], 9)
+        with sqlite3.connect(DB_FILE) as conn:
+            rows = {
+                url: (etag, sitemap_lastmod, content_hash)
+                for url, etag, sitemap_lastmod, content_hash in conn.execute(
+                    "SELECT url, etag, sitemap_lastmod, content_hash FROM http_validators"
+                )
+            }
+        self.assertEqual(set(rows), set(urls))
+        # 中断前に取得した記事の検証子も保存される
+        self.assertEqual(rows[urls[0]], ('"etag-0"', lastmods[urls[0]], f'{FINGERPRINT_PREFIX}abc'))
+        # 再開後に取得した記事にもサイトマップの lastmod が残る
+        for url in urls[1:]:
+            self.assertEqual(rows[url][1], lastmods[url])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""HTMLパーサーのバックエンドのテスト"""
+
+import codecs
+import unittest
+
+from article_extractor import extract_article
+from html_parser_backend import DEFAULT_BACKEND, HAS_LXML, detect_charset, make_soup, resolve_backend
+from synthetic_site import SyntheticSite
+from tests.test_article_extractor import ARTICLE_URL, load_fixture
+
+
+class BackendSelectionTests(unittest.TestCase):
+
+    def test_default_is_html_parser(self):
+        # lxml がインストールされていても、指定しなければ html.parser で解析する
+        self.assertEqual(resolve_backend(DEFAULT_BACKEND), 'html.parser')
+        self.assertEqual(resolve_backend(None), 'html.parser')
+
+    @unittest.skipUnless(HAS_LXML, "lxml がインストールされていません")
+    def test_lxml_is_opt_in(self):
+        self.assertEqual(resolve_backend('lxml'), 'lxml')
+        self.assertEqual(resolve_backend('auto'), 'lxml')
+
+
+@unittest.skipUnless(HAS_LXML, "lxml がインストールされていません")
+class BackendEquivalenceTests(unittest.TestCase):
+    """整ったページでは lxml と html.parser の抽出結果が一致する"""
+
+    def assertSameExtraction(self, body, url):
+        expected = extract_article(make_soup(body, 'html.parser'), url)
+        actual = extract_article(make_soup(body, 'lxml'), url)
+        self.assertEqual(actual, expected)
+
+    def test_set_ten_article(self):
+        self.assertSameExtraction(load_fixture('set-ten_article.html'), ARTICLE_URL)
+
+    def test_synthetic_pages(self):
+        site = SyntheticSite(num_articles=30, base_url='https://set-ten.com/')
+        for path in ['/', '/category/books/', '/tag/review/'] + [site.article_path(i) for i in range(30)]:
+            with self.subTest(path=path):
+                _, body, _ = site.render(path)
+                self.assertSameExtraction(body, site.base_url + path)
+
+
+class DetectCharsetTests(unittest.TestCase):
+
+    def test_header_then_meta_then_utf8(self):
+        self.assertEqual(detect_charset(b'<meta charset="shift_jis">', 'euc-jp'), 'euc_jp')
+        self.assertEqual(detect_charset(b'<meta charset="shift_jis">'), 'shift_jis')
+        self.assertEqual(detect_charset(b'<p>text</p>'), 'utf-8')
+
+    def test_bom_takes_priority(self):
+        body = codecs.BOM_UTF8 + '<meta charset="shift_jis"><p>日本語</p>'.encode('utf-8')
+        self.assertEqual(detect_charset(body, 'shift_jis'), 'utf-8')
+        self.assertEqual(make_soup(body, charset='shift_jis').p.string, '日本語')
+        body = codecs.BOM_UTF16_LE + '<p>日本語</p>'.encode('utf-16-le')
+        self.assertEqual(detect_charset(body, 'utf-8'), 'utf-16-le')
+        self.assertEqual(make_soup(body, charset='utf-8').p.string, '日本語')
+
+    def test_meta_charset_after_first_kilobyte(self):
+        # head の長い style の後ろ（先頭1024バイトより後）にある宣言も使う
+        head = b'<head><style>' + b' ' * 2000 + b'</style>'
+        self.assertEqual(detect_charset(head + b'<meta charset="shift_jis">'), 'shift_jis')
+        self.assertEqual(detect_charset(head + b' ' * 4096 + b'<meta charset="shift_jis">'), 'utf-8')
+
+    def test_unknown_charset_falls_back(self):
+        self.assertEqual(detect_charset(b'<meta charset="x-unknown">', 'bogus'), 'utf-8')
+
+
+if __name__ == '__main__':
+    unittest.main()
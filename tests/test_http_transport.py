@@ -0,0 +1,144 @@
+"""再試行（指数バックオフと Retry-After）のテスト
+
+crawl_setten.fetch_page を、429 / 503 などを返すローカルのサーバーに対して実行する。
+"""
+
+import asyncio
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import http_transport
+from http_transport import BACKOFF_BASE, MAX_RETRIES, create_session
+from tests.support import fresh_crawler, free_port
+
+PAGE = '<html><body><p>{path}</p></body></html>'
+
+
+class ScriptedServer:
+    """パスごとに決めた順で失敗の応答を返し、その後は 200 を返すサーバー
+
+    script: パス -> [(ステータス, Retry-After), ...]
+    """
+
+    def __init__(self, script):
+        self.script = {path: list(responses) for path, responses in script.items()}
+        self.times = defaultdict(list)  # パス -> リクエストを受けた時刻
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        self.server = TestServer(app, host='127.0.0.1', port=self.port)
+
+    async def handle(self, request):
+        path = request.path
+        self.times[path].append(asyncio.get_running_loop().time())
+        responses = self.script.get(path)
+        if responses:
+            status, retry_after = responses.pop(0)
+            headers = {'Retry-After': retry_after} if retry_after is not None else {}
+            return web.Response(status=status, headers=headers)
+        return web.Response(text=PAGE.format(path=path), content_type='text/html')
+
+    def gaps(self, path):
+        times = self.times[path]
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
+
+
+class FetchRetryTests(unittest.IsolatedAsyncioTestCase):
+
+    async def fetch(self, server, paths):
+        """新しい状態のクローラーで paths を並行して取得し、(結果のリスト, 再試行の記録) を返す"""
+        crawler = fresh_crawler(server.base_url + '/')
+        self.crawler = crawler
+        delays = []  # (attempt, Retry-After, 待ち時間)
+
+        def record(attempt, retry_after=None):
+            delay = http_transport.retry_delay(attempt, retry_after)
+            delays.append((attempt, retry_after, delay))
+            return delay
+
+        with mock.patch.object(crawler, 'retry_delay', side_effect=record):
+            async with create_session(crawler.HEADERS) as session:
+                results = await asyncio.gather(
+                    *(crawler.fetch_page(session, server.base_url + path) for path in paths)
+                )
+        return results, delays
+
+    async def test_retry_after_is_honoured(self):
+        async with ScriptedServer({'/a': [(429, '1'), (503, '1')]}) as server:
+            (result,), delays = await self.fetch(server, ['/a'])
+
+        self.assertEqual(result.status, 200)
+        self.assertIn('/a', result.body.decode())
+        url = server.base_url + '/a'
+        self.assertEqual(self.crawler.fetch_counts[url], 1)
+        self.assertEqual(self.crawler.retry_counts[url], 2)
+        self.assertEqual([(attempt, retry_after) for attempt, retry_after, _ in delays], [(0, '1'), (1, '1')])
+        for _, _, delay in delays:
+            self.assertGreaterEqual(delay, 1.0)
+            self.assertLessEqual(delay, 1.0 + BACKOFF_BASE)
+        # 実際に Retry-After の秒数以上あけて再試行している
+        for gap, (_, _, delay) in zip(server.gaps('/a'), delays):
+            self.assertGreaterEqual(gap, 1.0)
+            self.assertGreaterEqual(gap, delay - 0.05)
+
+    async def test_exponential_backoff_without_retry_after(self):
+        async with ScriptedServer({'/b': [(503, None), (502, None), (500, None)]}) as server:
+            (result,), delays = await self.fetch(server, ['/b'])
+
+        self.assertEqual(result.status, 200)
+        self.assertEqual(self.crawler.retry_counts[server.base_url + '/b'], 3)
+        self.assertEqual([attempt for attempt, _, _ in delays], [0, 1, 2])
+        for attempt, retry_after, delay in delays:
+            self.assertIsNone(retry_after)
+            self.assertLessEqual(delay, BACKOFF_BASE * 2 ** attempt)
+        for gap, (_, _, delay) in zip(server.gaps('/b'), delays):
+            self.assertGreaterEqual(gap, delay - 0.05)
+
+    async def test_gives_up_after_max_retries(self):
+        async with ScriptedServer({'/c': [(503, '0')] * (MAX_RETRIES + 5)}) as server:
+            (result,), delays = await self.fetch(server, ['/c'])
+
+        self.assertIsNone(result)
+        self.assertEqual(len(server.times['/c']), MAX_RETRIES + 1)
+        self.assertEqual(self.crawler.retry_counts[server.base_url + '/c'], MAX_RETRIES)
+        self.assertIsNone(delays[-1][2])
+
+    async def test_long_retry_after_is_not_waited(self):
+        async with ScriptedServer({'/d': [(429, '600')]}) as server:
+            (result,), delays = await self.fetch(server, ['/d'])
+
+        self.assertIsNone(result)
+        self.assertEqual(len(server.times['/d']), 1)
+        self.assertEqual(delays, [(0, '600', None)])
+
+    async def test_no_item_lost(self):
+        failures = [(503, '0'), (429, '0'), (500, None), (502, None), (504, None)]
+        script = {f'/page/{i}': failures[i % len(failures):i % len(failures) + 1 + i % 2] for i in range(20)}
+        async with ScriptedServer(script) as server:
+            paths = [f'/page/{i}' for i in range(20)]
+            results, delays = await self.fetch(server, paths)
+
+        for path, result in zip(paths, results):
+            self.assertIsNotNone(result, path)
+            self.assertEqual(result.status, 200)
+            self.assertIn(path, result.body.decode())
+        expected_retries = sum(len(responses) for responses in script.values())
+        self.assertEqual(sum(self.crawler.retry_counts.values()), expected_retries)
+        self.assertEqual(len(delays), expected_retries)
+        self.assertEqual(sum(self.crawler.fetch_counts.values()), len(paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
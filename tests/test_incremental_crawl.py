@@ -0,0 +1,29 @@
+"""2回目以降のクロール（条件付きリクエスト）でも同じURLを発見することのテスト"""
+
+import unittest
+
+from tests.support import CrawlTestCase, SiteServer, run_crawl
+
+
+class IncrementalCrawlTests(CrawlTestCase):
+
+    async def test_incremental_run_discovers_same_urls(self):
+        async with SiteServer(num_articles=40) as server:
+            # 解析プロセスが複数でも同じ結果になる
+            full, full_summary = await run_crawl(server.base_url, parse_workers=2)
+            full_urls = set(full.visited_urls)
+
+            incremental, summary = await run_crawl(server.base_url)
+            incremental_urls = set(incremental.visited_urls)
+
+        self.assertEqual(full_summary['articles'], 40)
+        # 2回目はすべての記事が 304 になり、保存したページ内リンクから同じURLを辿る
+        self.assertEqual(summary['not_modified'], 40)
+        self.assertEqual(summary['articles'], 0)
+        self.assertEqual(incremental_urls, full_urls)
+        # 記事からしかリンクされていないタグの一覧も発見している
+        self.assertTrue(any('/tag/' in url for url in incremental_urls))
+
+
+if __name__ == '__main__':
+    unittest.main()
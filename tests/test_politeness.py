@@ -0,0 +1,223 @@
+"""ホストごとのリクエスト制御（AIMD と robots.txt）のテスト"""
+
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from politeness import (
+    BACKOFF_FACTOR, MIN_RATE, RATE_INCREASE, HostScheduler, PolitenessScheduler, parse_robots
+)
+from tests.support import free_port
+
+USER_AGENT = 'setten-test'
+
+
+class AimdTests(unittest.IsolatedAsyncioTestCase):
+    """応答に応じてレートと同時リクエスト数を増減させる"""
+
+    def make_host(self, rate=4.0, max_rate=10.0, concurrency=4):
+        host = HostScheduler('example.com', initial_rate=rate, max_rate=max_rate, max_concurrency=8)
+        host.concurrency = float(concurrency)
+        return host
+
+    async def test_additive_increase(self):
+        host = self.make_host(rate=2.0, concurrency=2)
+        await host.acquire()
+        await host.release(0.01, 200)
+        self.assertAlmostEqual(host.rate, 2.0 + RATE_INCREASE / 2.0)
+        self.assertAlmostEqual(host.bucket.rate, host.rate)
+        self.assertAlmostEqual(host.concurrency, 2.5)
+
+    async def test_increase_is_capped(self):
+        host = self.make_host(rate=9.9, max_rate=10.0, concurrency=8)
+        for _ in range(5):
+            await host.release(0.01, 200)
+        self.assertEqual(host.rate, 10.0)
+        self.assertEqual(host.concurrency, 8)
+
+    async def test_multiplicative_decrease_on_throttling(self):
+        for status, failed in ((429, False), (503, False), (None, True)):
+            with self.subTest(status=status, failed=failed):
+                host = self.make_host(rate=4.0, concurrency=4)
+                await host.release(0.01, status, failed=failed)
+                self.assertAlmostEqual(host.rate, 4.0 * BACKOFF_FACTOR)
+                self.assertAlmostEqual(host.bucket.rate, host.rate)
+                self.assertEqual(host.concurrency, 4 * BACKOFF_FACTOR)
+                self.assertEqual(host.throttled, 1)
+                self.assertEqual(len(host.history), 1)
+
+    async def test_hold_after_backoff_then_recovery(self):
+        host = self.make_host(rate=4.0, concurrency=4)
+        await host.release(0.01, 429)
+        self.assertAlmostEqual(host.rate, 2.0)
+
+        # 同じ混雑で続けて下げず、減速直後は上げもしない
+        await host.release(0.01, 429)
+        await host.release(0.01, 200)
+        self.assertAlmostEqual(host.rate, 2.0)
+        self.assertEqual(host.concurrency, 2.0)
+        self.assertEqual(host.throttled, 2)
+        self.assertEqual(len(host.history), 1)
+
+        # 1秒たてば順調な応答でまた上げる
+        await asyncio.sleep(1.05)
+        for _ in range(4):
+            await host.release(0.01, 200)
+        self.assertGreater(host.rate, 2.0)
+        self.assertGreater(host.concurrency, 2.0)
+        self.assertEqual(host.peak_rate, 4.0)
+
+    async def test_floor(self):
+        host = self.make_host(rate=0.3, concurrency=1)
+        await host.release(0.01, 503)
+        self.assertEqual(host.rate, MIN_RATE)
+        self.assertEqual(host.concurrency, 1.0)
+
+    async def test_latency_increase_is_congestion(self):
+        host = self.make_host(rate=4.0, concurrency=4)
+        for _ in range(3):
+            await host.release(0.01, 200)
+        rate = host.rate
+        await host.release(3.0, 200)
+        self.assertAlmostEqual(host.rate, rate * BACKOFF_FACTOR)
+        self.assertEqual(host.throttled, 0)
+
+    async def test_defer_pauses_bucket(self):
+        host = self.make_host(rate=1000.0)
+        host.defer(0.3)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await host.bucket.take()
+        self.assertGreaterEqual(loop.time() - start, 0.29)
+
+    async def test_cancel_while_waiting_for_token_frees_slot(self):
+        host = self.make_host(rate=1.0, concurrency=2)
+        await host.acquire()
+        # 2つ目は枠を確保してトークンの補充を待ち、3つ目は枠が空くのを待つ
+        waiting = asyncio.create_task(host.acquire())
+        await asyncio.sleep(0.05)
+        self.assertEqual(host.in_flight, 2)
+        queued = asyncio.create_task(host.acquire())
+        await asyncio.sleep(0.05)
+        self.assertFalse(queued.done())
+
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        # 取り消した分の枠は返され、待っていたリクエストが使う
+        await asyncio.wait_for(queued, timeout=2.0)
+        self.assertEqual(host.in_flight, 2)
+        await host.release(0.01, 200)
+        await host.release(0.01, 200)
+        self.assertEqual(host.in_flight, 0)
+
+
+class RateLimitedServer:
+    """1秒あたり capacity 件を超えると 429 を返すサーバー"""
+
+    def __init__(self, capacity, robots='User-agent: *\nDisallow: /private/\n', robots_status=200):
+        self.capacity = capacity
+        self.robots = robots
+        self.robots_status = robots_status
+        self.recent = []
+        self.paths = []
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        self.server = TestServer(app, host='127.0.0.1', port=self.port)
+
+    async def handle(self, request):
+        self.paths.append(request.path)
+        if request.path == '/robots.txt':
+            return web.Response(status=self.robots_status, text=self.robots)
+        now = asyncio.get_running_loop().time()
+        self.recent[:] = [t for t in self.recent if now - t < 1.0]
+        if len(self.recent) >= self.capacity:
+            return web.Response(status=429)
+        self.recent.append(now)
+        return web.Response(text='ok')
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
+
+
+class SchedulerTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_adapts_to_server_capacity(self):
+        capacity, total = 20, 60
+        async with RateLimitedServer(capacity) as server:
+            scheduler = PolitenessScheduler(USER_AGENT, initial_rate=capacity, max_rate=capacity * 4)
+            statuses = []
+            urls = [f"{server.base_url}/page/{i}" for i in range(total)]
+            urls.append(f"{server.base_url}/private/secret")
+
+            async with aiohttp.ClientSession() as session:
+                async def fetch(url):
+                    if not await scheduler.allowed(session, url):
+                        return
+                    async with scheduler.request(url) as slot:
+                        async with session.get(url) as response:
+                            slot.status = response.status
+                            statuses.append(response.status)
+
+                await asyncio.gather(*(fetch(url) for url in urls))
+
+        (summary,) = scheduler.summary()
+        self.assertEqual(server.paths.count('/robots.txt'), 1)
+        self.assertNotIn('/private/secret', server.paths)
+        self.assertEqual(summary['requests'], total)
+        # 許容量を超えて 429 を受けたら減速し、上限まで上げ続けない
+        self.assertGreater(summary['throttled'], 0)
+        self.assertTrue(summary['backoffs'])
+        self.assertLess(summary['rate'], capacity * 4)
+        # 429 は一部にとどまる
+        self.assertGreater(statuses.count(200), total // 2)
+
+
+class RobotsTests(unittest.IsolatedAsyncioTestCase):
+
+    async def load(self, status, robots='User-agent: *\nDisallow: /private/\nCrawl-delay: 2\n'):
+        async with RateLimitedServer(100, robots=robots, robots_status=status) as server:
+            scheduler = PolitenessScheduler(USER_AGENT)
+            async with aiohttp.ClientSession() as session:
+                allowed = {
+                    path: await scheduler.allowed(session, server.base_url + path)
+                    for path in ('/', '/page/1', '/private/secret')
+                }
+            return allowed, scheduler.summary()[0]
+
+    async def test_rules_and_crawl_delay(self):
+        allowed, summary = await self.load(200)
+        self.assertEqual(allowed, {'/': True, '/page/1': True, '/private/secret': False})
+        self.assertEqual(summary['max_rate'], 0.5)
+
+    async def test_unauthorized_or_forbidden_disallows_all(self):
+        for status in (401, 403):
+            with self.subTest(status=status):
+                with self.assertLogs(level='WARNING'):
+                    allowed, _ = await self.load(status)
+                self.assertEqual(allowed, {'/': False, '/page/1': False, '/private/secret': False})
+
+    async def test_missing_or_unavailable_allows_all(self):
+        for status in (404, 500):
+            with self.subTest(status=status):
+                allowed, summary = await self.load(status)
+                self.assertEqual(allowed, {'/': True, '/page/1': True, '/private/secret': True})
+                self.assertEqual(summary['max_rate'], 10.0)
+
+    def test_parse_robots_request_rate(self):
+        robots = parse_robots('User-agent: *\nRequest-rate: 3/1\n')
+        host = HostScheduler('example.com', robots, USER_AGENT, max_rate=10.0)
+        self.assertEqual(host.max_rate, 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""サイトマップの解析とサイトマップモードのテスト"""
+
+import gzip
+import unittest
+from datetime import timedelta
+
+from sitemap_parser import parse_sitemap
+from tests.support import CrawlTestCase, SiteServer, run_crawl
+
+URLSET = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    b'<url><loc>https://set-ten.com/a/b/1/</loc><lastmod>2025-05-24T10:00:00+09:00</lastmod></url>'
+    b'<url><loc>https://set-ten.com/a/b/2/</loc></url>'
+    b'</urlset>'
+)
+
+
+class ParseSitemapTests(unittest.TestCase):
+
+    def test_gzip_sitemap(self):
+        self.assertEqual(parse_sitemap(gzip.compress(URLSET)), parse_sitemap(URLSET))
+        self.assertEqual(parse_sitemap(URLSET), ('urlset', [
+            ('https://set-ten.com/a/b/1/', '2025-05-24T10:00:00+09:00'),
+            ('https://set-ten.com/a/b/2/', None),
+        ]))
+
+    def test_gzip_over_max_size_is_rejected(self):
+        body = gzip.compress(URLSET + b' ' * 4096)
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(parse_sitemap(body, max_size=1024), (None, []))
+
+    def test_truncated_gzip(self):
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(parse_sitemap(gzip.compress(URLSET)[:30]), (None, []))
+
+
+class SitemapModeTests(CrawlTestCase):
+    """サイトマップモードは lastmod が前回より新しい記事だけを取得する"""
+
+    async def test_only_newer_lastmod_entries_are_fetched(self):
+        async with SiteServer(num_articles=30) as server:
+            site = server.site
+            crawler, first = await run_crawl(server.base_url, mode='sitemap')
+            self.assertEqual(first['articles'], 30)
+            # サイトマップの探索とクロールは同じスケジューラーを使い、終了時に破棄する
+            self.assertEqual(server.requests.count('/robots.txt'), 1)
+            self.assertIsNone(crawler.scheduler)
+            self.assertEqual(sorted(server.article_requests()), sorted(site.article_path(i) for i in range(30)))
+
+            # 何も更新されていなければ記事は取得しない
+            server.requests.clear()
+            _, unchanged = await run_crawl(server.base_url, mode='sitemap')
+            self.assertEqual(server.article_requests(), [])
+            self.assertEqual(unchanged['articles'], 0)
+
+            # 2記事を更新する（サイトマップの lastmod と記事の modified_time が新しくなる）
+            updated = {4, 17}
+            modified = site.modified
+            site.modified = lambda i: modified(i) + (timedelta(days=1) if i in updated else timedelta())
+            site.render.cache_clear()
+
+            server.requests.clear()
+            _, second = await run_crawl(server.base_url, mode='sitemap')
+            self.assertEqual(sorted(server.article_requests()), sorted(site.article_path(i) for i in updated))
+            self.assertEqual(second['articles'], len(updated))
+
+
+if __name__ == '__main__':
+    unittest.main()
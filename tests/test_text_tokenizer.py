@@ -0,0 +1,75 @@
+"""形態素解析による頻出語の集計のテスト（MeCab と unidic-lite が必要）"""
+
+import json
+import unittest
+
+try:
+    import text_tokenizer
+    from text_tokenizer import STOP_WORDS, extract_terms, frequent_words_json, get_tagger, term_frequencies
+    HAS_MECAB = True
+except ImportError:
+    HAS_MECAB = False
+
+
+@unittest.skipUnless(HAS_MECAB, "MeCab がインストールされていません")
+class ExtractTermsTests(unittest.TestCase):
+
+    def test_content_words_only(self):
+        # 助詞・助動詞・記号・数詞・副詞・代名詞は数えない
+        self.assertEqual(extract_terms('彼は本を3冊、とても静かに読んだ。'), ['本', '読む'])
+        self.assertEqual(extract_terms('東京の記事を書く。'), ['東京', '記事', '書く'])
+
+    def test_verbs_and_adjectives_use_lemma(self):
+        self.assertEqual(extract_terms('早起きの習慣を作った。'), ['早起き', '習慣', '作る'])
+        self.assertEqual(extract_terms('面白かったので、楽しく読んで'), ['面白い', '楽しい', '読む'])
+
+    def test_stop_words(self):
+        for word in ('こと', 'もの', '場合', '思う', '言う'):
+            self.assertIn(word, STOP_WORDS)
+        self.assertEqual(extract_terms('大事なことは、そう思う場合に言うものだ。'), [])
+        # 英語のストップワードも除く
+        self.assertEqual(extract_terms('the testを書く'), ['test', '書く'])
+
+    def test_single_letters_are_dropped_but_single_kanji_is_kept(self):
+        self.assertEqual(extract_terms('本と猫'), ['本', '猫'])
+        # 1文字の英字は名詞として解析されても数えない
+        self.assertEqual(extract_terms('xとyを比べる'), ['比べる'])
+        self.assertEqual(extract_terms('プランAとプランB'), ['プラン', 'プラン'])
+
+    def test_empty(self):
+        self.assertEqual(extract_terms(''), [])
+        self.assertEqual(extract_terms(None), [])
+        self.assertEqual(frequent_words_json(''), '{}')
+
+    def test_tagger_is_reused(self):
+        self.assertIs(get_tagger(), get_tagger())
+        self.assertIs(get_tagger(), text_tokenizer._tagger)
+
+
+@unittest.skipUnless(HAS_MECAB, "MeCab がインストールされていません")
+class FrequentWordsTests(unittest.TestCase):
+
+    TEXT = '早起きの習慣を作る。早起きは大事。習慣を続けると早起きが楽になる。'
+
+    def test_term_frequencies(self):
+        self.assertEqual(term_frequencies(self.TEXT), {'早起き': 3, '習慣': 2, '作る': 1, '楽': 1})
+        self.assertEqual(term_frequencies(self.TEXT, limit=2), {'早起き': 3, '習慣': 2})
+
+    def test_json_shape(self):
+        # Article.get_frequent_words が読み込む形式: 語 -> 出現回数の JSON オブジェクト（多い順）
+        value = frequent_words_json(self.TEXT)
+        words = json.loads(value)
+        self.assertIsInstance(words, dict)
+        self.assertEqual(list(words.items()), list(term_frequencies(self.TEXT).items()))
+        self.assertTrue(all(isinstance(word, str) and isinstance(count, int) for word, count in words.items()))
+        self.assertEqual(list(words.values()), sorted(words.values(), reverse=True))
+        # 日本語はエスケープせずに保存する
+        self.assertIn('早起き', value)
+
+    def test_limit(self):
+        text = '、'.join(f'{word}{word}' for word in ('猫', '犬', '鳥', '魚', '馬'))
+        self.assertEqual(len(json.loads(frequent_words_json(text, limit=3))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
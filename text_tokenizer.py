@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+日本語テキストの形態素解析と頻出語の集計
+MeCab（unidic-lite 辞書）で本文を分かち書きし、内容語（名詞・動詞・形容詞）だけを数えます
+
+MeCab.Tagger の生成は辞書の読み込みを伴い重いため、プロセスごとに1つだけ作って使い回します。
+クローラーでは ProcessPoolExecutor の解析ワーカーごとに1つの Tagger になります。
+複数の本文を連結して1回で解析しても速くならないため、本文は1件ずつ解析します。
+
+使い方:
+    python text_tokenizer.py bench page1.html page2.html ... [-r 20]
+        記事本文の形態素解析の処理速度（トークン/秒）を計測する
+    python text_tokenizer.py words page.html
+        記事本文の頻出語を表示する
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+
+import MeCab
+
+FREQUENT_WORDS_LIMIT = 20  # 頻出語として保存する語数
+
+# unidic-lite の出力形式（output-format-type = unidic）の列
+# 表層形, 発音, 語彙素読み, 語彙素, 品詞（ハイフン区切り）, 活用型, 活用形, アクセント
+_SURFACE, _LEMMA, _POS = 0, 3, 4
+
+# 数える品詞（前方一致）。動詞と形容詞は語彙素（終止形）で数える
+CONTENT_POS_PREFIXES = ('名詞-普通名詞', '名詞-固有名詞', '動詞-一般', '形容詞-一般')
+BASE_FORM_POS_PREFIXES = ('動詞', '形容詞')
+
+STOP_WORDS = frozenset({
+    # 形式名詞・汎用的な名詞
+    'こと', 'もの', 'よう', 'ため', 'とき', 'ところ', 'ほう', 'わけ', 'はず', 'つもり',
+    '事', '物', '時', '方', '為', '所', '中', '上', '下', '前', '後', '等', '的', '感じ',
+    '場合', '自分', '今回', '前回', '以下', '以上', '部分', '内容', '必要', '一つ', '二つ',
+    # 意味の薄い動詞・形容詞
+    'する', 'ある', 'いる', 'なる', 'できる', 'おる', 'くる', '来る', 'いう', '言う', '思う',
+    'みる', 'しまう', 'いく', '行く', 'やる', 'くれる', 'もらう', 'おく', 'れる', 'られる',
+    'ない', 'よい', '良い', 'いい',
+    # 英語
+    'the', 'and', 'for', 'with', 'this', 'that', 'from', 'The',
+})
+
+_tagger = None
+
+
+def get_tagger():
+    """このプロセス用の MeCab.Tagger を返す（初回呼び出し時に生成）"""
+    global _tagger
+    if _tagger is None:
+        _tagger = MeCab.Tagger()
+    return _tagger
+
+
+def _is_single_kana_or_symbol(word):
+    # 1文字の漢字（「本」など）は残し、1文字のかな・英数字は除く
+    return len(word) == 1 and not ('一' <= word <= '鿿')
+
+
+def extract_terms(text):
+    """テキストを形態素解析し、数える対象の語を出現順に返す"""
+    if not text:
+        return []
+
+    terms = []
+    for line in get_tagger().parse(text).split('\n'):
+        fields = line.split('\t')
+        if len(fields) <= _POS:
+            continue  # EOS や空行
+        pos = fields[_POS]
+        if not pos.startswith(CONTENT_POS_PREFIXES):
+            continue
+        word = fields[_LEMMA] if pos.startswith(BASE_FORM_POS_PREFIXES) else fields[_SURFACE]
+        if word in STOP_WORDS or _is_single_kana_or_symbol(word):
+            continue
+        terms.append(word)
+    return terms
+
+
+def term_frequencies(text, limit=FREQUENT_WORDS_LIMIT):
+    """頻出語と出現回数の dict を出現回数の多い順に返す"""
+    return dict(Counter(extract_terms(text)).most_common(limit))
+
+
+def frequent_words_json(text, limit=FREQUENT_WORDS_LIMIT):
+    """頻出語を Article.get_frequent_words が読み込める JSON 文字列で返す"""
+    return json.dumps(term_frequencies(text, limit), ensure_ascii=False)
+
+
+def _load_texts(paths):
+    """HTMLファイルから記事本文のテキストを取り出す"""
+    from html_parser_backend import make_soup
+
+    texts = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = make_soup(f.read()).select_one('.entry-content')
+        texts.append(content.get_text() if content else '')
+    return texts
+
+
+def benchmark(paths, repeat):
+    texts = _load_texts(paths)
+    get_tagger()  # 辞書の読み込みは計測に含めない
+
+    tokens = sum(len(get_tagger().parse(text).split('\n')) - 2 for text in texts)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            extract_terms(text)
+    elapsed = time.perf_counter() - start
+
+    articles = repeat * len(texts)
+    print(f"{len(texts)}記事 × {repeat}回（1回あたり {tokens} トークン）")
+    print(f"{tokens * repeat / elapsed:,.0f} トークン/秒")
+    print(f"{elapsed / articles * 1000:.3f} ms/記事（{articles / elapsed:,.0f} 記事/秒）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日本語テキストの形態素解析ツール")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+
+    bench_parser = subparsers.add_parser("bench", help="形態素解析の処理速度を計測")
+    bench_parser.add_argument("files", nargs="+", help="HTMLファイル")
+    bench_parser.add_argument("-r", "--repeat", type=int, default=20, help="繰り返し回数（デフォルト: 20）")
+
+    words_parser = subparsers.add_parser("words", help="記事本文の頻出語を表示")
+    words_parser.add_argument("file", help="HTMLファイル")
+    words_parser.add_argument("-n", "--limit", type=int, default=FREQUENT_WORDS_LIMIT, help="表示する語数")
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        benchmark(args.files, args.repeat)
+    elif args.command == "words":
+        for word, count in term_frequencies(_load_texts([args.file])[0], args.limit).items():
+            print(f"{count:5d}  {word}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
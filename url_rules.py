@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+URLの分類
+事前にコンパイルした規則でURLを記事（article）・一覧（listing）・取得しない（skip）に分けます
+
+- skip: 画像やPDFなどのアップロードファイル、フィード、管理画面、コメントへの返信リンク
+  （?replytocom=）など、記事もリンクも得られないURL。取得せずに捨てる
+- article: 記事ページ。記事情報を抽出する
+- listing: トップページ・カテゴリー・タグ・ページ送りなど。リンクの発見のために取得する
+
+記事の判定は従来の is_article_page と同じく、3階層以上のパスで最後の部分に数字を含み、
+URLのどこにも除外する語（page, tag, date など）を含まないものとします。
+
+使い方:
+    python url_rules.py classify URL ...
+        URLの分類を表示する（URLを省略すると標準入力から1行1URLで読む）
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+ARTICLE = 'article'
+LISTING = 'listing'
+SKIP = 'skip'
+
+URL_CACHE_SIZE = 4096  # 分類結果をキャッシュするURLの数
+ARTICLE_MIN_DEPTH = 3  # 記事URLのパスの階層数（例: /programming/python/12345/）
+
+# 取得しないパス（パスの区切りごとに一致）
+SKIP_PATH_SEGMENTS = (
+    'wp-content', 'wp-admin', 'wp-includes', 'wp-json', 'feed', 'comments',
+    'trackback', 'embed', 'wp-login.php', 'xmlrpc.php',
+)
+
+# 取得しない拡張子（HTML以外のファイル）
+SKIP_EXTENSIONS = (
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'ico', 'bmp', 'avif',
+    'pdf', 'zip', 'gz', 'rar', '7z', 'tar', 'dmg', 'exe',
+    'mp3', 'mp4', 'm4a', 'mov', 'avi', 'wav', 'webm',
+    'css', 'js', 'json', 'txt', 'xml', 'rss', 'atom',
+    'woff', 'woff2', 'ttf', 'eot', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'csv',
+)
+
+# 取得しないクエリパラメータ（同じ記事の別表示や操作用のURL）
+SKIP_QUERY_PARAMS = ('replytocom', 'share', 'like_comment', 'amp', 'print', 'preview', 'feed')
+
+# 記事ではないページの目印。URLのどこかに含まれていれば記事として扱わない
+NON_ARTICLE_PATTERNS = (
+    'privacy-policy', 'profile', 'contact',
+    'page', 'author', 'category', 'tag', 'date',
+    'feed', 'wp-content', 'wp-admin', 'wp-includes',
+    'comments', 'trackback', 'login', 'register',
+    'admin', 'search', 'archive',
+)
+
+_SKIP_PATH = re.compile(
+    r'(?:^|/)(?:' + '|'.join(map(re.escape, SKIP_PATH_SEGMENTS)) + r')(?:/|$)'
+    r'|\.(?:' + '|'.join(SKIP_EXTENSIONS) + r')$',
+    re.IGNORECASE,
+)
+_SKIP_QUERY = re.compile(r'(?:^|&)(?:' + '|'.join(SKIP_QUERY_PARAMS) + r')(?:=|&|$)')
+_NON_ARTICLE = re.compile('|'.join(map(re.escape, NON_ARTICLE_PATTERNS)))
+_DIGIT = re.compile(r'\d')
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def classify(url):
+    """URLを ARTICLE / LISTING / SKIP のいずれかに分類する"""
+    if not url:
+        return SKIP
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return SKIP
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return SKIP
+    if _SKIP_PATH.search(parts.path) or (parts.query and _SKIP_QUERY.search(parts.query)):
+        return SKIP
+
+    path_parts = parts.path.strip('/').split('/')
+    if (
+        len(path_parts) >= ARTICLE_MIN_DEPTH
+        and _DIGIT.search(path_parts[-1])
+        and not _NON_ARTICLE.search(url)
+    ):
+        return ARTICLE
+    return LISTING
+
+
+def is_skipped(url):
+    """取得しないURLかどうか"""
+    return classify(url) == SKIP
+
+
+def main():
+    parser = argparse.ArgumentParser(description="URLの分類")
+    subparsers = parser.add_subparsers(dest="command", help="実行コマンド")
+    classify_parser = subparsers.add_parser("classify", help="URLの分類を表示")
+    classify_parser.add_argument("urls", nargs="*", help="URL（省略時は標準入力から読む）")
+    args = parser.parse_args()
+
+    if args.command == "classify":
+        urls = args.urls or [line.strip() for line in sys.stdin if line.strip()]
+        counts = Counter()
+        for url in urls:
+            kind = classify(url)
+            counts[kind] += 1
+            print(f"{kind:8s} {url}")
+        print(f"article: {counts[ARTICLE]}, listing: {counts[LISTING]}, skip: {counts[SKIP]}", file=sys.stderr)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()